@@ -1,6 +1,8 @@
 from django.utils.deprecation import MiddlewareMixin
 from apps.participants.models import PersonProfile
+from apps.core import metrics
 from .logger import logger
+from .snapshot import get_version, load_profile, store_snapshot
 
 class AuthenticationMiddleware(MiddlewareMixin):
     def process_request(self, request):
@@ -8,7 +10,15 @@ class AuthenticationMiddleware(MiddlewareMixin):
             user_id = request.session.get('user_id')
             if user_id:
                 try:
-                    profile = PersonProfile.objects.get(id=int(user_id))
+                    user_id = int(user_id)
+                    # Обычно профиль собирается из снимка в сессии без запроса к БД.
+                    # Версия читается до загрузки профиля (как в get_access)
+                    version = get_version(user_id)
+                    profile = load_profile(request.session, user_id, version)
+                    metrics.cache_lookup("profile_snapshot", profile is not None)
+                    if profile is None:
+                        profile = PersonProfile.objects.get(id=user_id)
+                        store_snapshot(request.session, profile, version)
                     request.user_profile = profile
                 except (PersonProfile.DoesNotExist, ValueError, TypeError) as e:
                     logger.warning(f"Invalid session or missing profile for user_id={user_id}")
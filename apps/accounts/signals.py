@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.snapshot import bump_version
+from apps.participants.models import PersonProfile
+
+
+@receiver(post_save, sender=PersonProfile)
+@receiver(post_delete, sender=PersonProfile)
+def invalidate_profile_snapshot(sender, instance, **kwargs):
+    # Снимки профиля в сессиях становятся устаревшими и перечитываются из БД
+    bump_version(instance.id)
@@ -0,0 +1,55 @@
+"""
+Снимок профиля в сессии.
+
+Middleware не читает PersonProfile из БД на каждый запрос: в сессии хранится
+компактный снимок (id, iin, full_name, email, role) и версия профиля. Из снимка
+собирается экземпляр модели, остальные поля отложены (deferred) и подгружаются
+из БД только при первом обращении.
+
+Версия профиля хранится в кэше (apps/core/cache_versions.py) и меняется при
+сохранении/удалении профиля (см. apps/accounts/signals.py) — снимки во всех
+сессиях становятся устаревшими. Если ключ версии вытеснен, создается новая
+версия, и ни один снимок с ней не совпадает.
+QuerySet.update() сигналы не вызывает: после массовых изменений профилей
+нужно вызвать bump_version() для затронутых id.
+"""
+from apps.core import cache_versions
+from apps.participants.models import PersonProfile
+
+SESSION_KEY = "profile_snapshot"
+SNAPSHOT_FIELDS = ("id", "iin", "full_name", "email", "role")
+VERSION_KEY = "accounts:profile_version:{profile_id}"
+
+
+def get_version(profile_id):
+    return cache_versions.get_version(VERSION_KEY.format(profile_id=profile_id))
+
+
+def bump_version(profile_id):
+    cache_versions.bump_version(VERSION_KEY.format(profile_id=profile_id))
+
+
+def store_snapshot(session, profile, version):
+    """
+    version нужно прочитать до загрузки profile из БД: если профиль сохранят
+    между загрузкой и чтением версии, устаревший снимок получит новую версию
+    и будет считаться актуальным
+    """
+    snapshot = {field: getattr(profile, field) for field in SNAPSHOT_FIELDS}
+    snapshot["version"] = version
+    session[SESSION_KEY] = snapshot
+
+
+def load_profile(session, user_id, version):
+    """Профиль из снимка в сессии, если он совпадает с текущей версией, иначе None"""
+    snapshot = session.get(SESSION_KEY)
+    if not snapshot or snapshot.get("id") != user_id:
+        return None
+    if snapshot.get("version") != version:
+        return None
+    # Экземпляр «как из БД»: поля вне снимка отложены и загрузятся лениво
+    return PersonProfile.from_db(
+        "default",
+        list(SNAPSHOT_FIELDS),
+        [snapshot[field] for field in SNAPSHOT_FIELDS],
+    )
@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin
+from unfold.contrib.filters.admin import AutocompleteSelectFilter, RangeDateFilter, RangeDateTimeFilter
 from .models import Attendance, TrustLog
+from apps.core.pagination import EstimatedCountPaginator
+from apps.core.replica import ReplicaChangeListMixin
+from apps.core.search import IndexedSearchAdminMixin
 
 @admin.register(Attendance)
-class AttendanceAdmin(ModelAdmin):
+class AttendanceAdmin(IndexedSearchAdminMixin, ReplicaChangeListMixin, ModelAdmin):
     list_display = (
         "profile",
         "session",
@@ -17,20 +21,28 @@ class AttendanceAdmin(ModelAdmin):
         "entry_marked_by_trainer",
         "exit_marked_by_trainer",
     )
+    # Связанные объекты из list_display — одним запросом на страницу
+    list_select_related = ("profile", "session__group", "marked_entry_by_trainer", "marked_exit_by_trainer")
+    # Фильтры по связям — автодополнение вместо списка всех значений
     list_filter = (
         "trust_level",
         "arrived_status",
         "left_status",
-        "session__group__code",
-        "session__date",
-        "marked_entry_by_trainer",
-        "marked_exit_by_trainer",
+        ("session__group", AutocompleteSelectFilter),
+        ("session__date", RangeDateFilter),
+        ("marked_entry_by_trainer", AutocompleteSelectFilter),
+        ("marked_exit_by_trainer", AutocompleteSelectFilter),
     )
+    list_filter_submit = True
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     search_fields = (
         "profile__iin",
         "profile__full_name",
         "session__group__code",
     )
+    # Сначала id найденных профилей и групп, затем фильтр по внешним ключам
+    search_index = {"profile": "profile", "session__group": "group"}
     readonly_fields = (
         "session",
         "profile",
@@ -96,7 +108,12 @@ class AttendanceAdmin(ModelAdmin):
 
 
 @admin.register(TrustLog)
-class TrustLogAdmin(ModelAdmin):
+class TrustLogAdmin(ReplicaChangeListMixin, ModelAdmin):
     list_display = ("fingerprint", "reason", "delta", "created_at")
+    list_select_related = ("fingerprint__profile",)
     search_fields = ("reason", "fingerprint__fingerprint_hash")
-    list_filter = ("created_at",)
+    list_filter = (("created_at", RangeDateTimeFilter),)
+    list_filter_submit = True
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    ordering = ("-created_at",)
@@ -1,41 +1,43 @@
 from django import forms
 from apps.participants.models import PersonProfile
-from apps.groups.models import Session
+from apps.groups import access
 from apps.attendance.models import Attendance
 from django.utils import timezone
 
 class ManualMarkForm(forms.Form):
-    profile = forms.ModelChoiceField(queryset=PersonProfile.objects.none(), label="Участник")
-    session = forms.ModelChoiceField(queryset=Session.objects.none(), label="Сессия")
+    # Участник выбирается через автодополнение (attendance:roster_search),
+    # поэтому список профилей в форму не выводится
+    profile = forms.ModelChoiceField(
+        queryset=PersonProfile.objects.all(),
+        widget=forms.HiddenInput,
+        label="Участник",
+        error_messages={"required": "Выберите участника."},
+    )
     mark_type = forms.ChoiceField(
         choices=[("entry", "Отметка входа"), ("exit", "Отметка выхода")],
         label="Тип отметки"
     )
 
-    def __init__(self, *args, trainer=None, **kwargs):
+    def __init__(self, *args, trainer=None, session=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.trainer = trainer
-
-        if trainer:
-            today = timezone.localdate()
-            self.fields["session"].queryset = Session.objects.filter(group__trainers=trainer, date=today)
-            self.fields["profile"].queryset = PersonProfile.objects.filter(
-                groups__in=trainer.trainer_groups.all(),
-                role=PersonProfile.Role.PARTICIPANT
-            ).distinct()
+        self.session = session
 
     def clean(self):
         cleaned_data = super().clean()
-        session = cleaned_data.get("session")
+        session = self.session
         profile = cleaned_data.get("profile")
         mark_type = cleaned_data.get("mark_type")
 
         if not session or not profile:
             return cleaned_data
 
-        if self.trainer and session.group not in self.trainer.trainer_groups.all():
+        if self.trainer and not access.is_trainer(self.trainer, session.group_id):
             raise forms.ValidationError("Вы не можете отмечать участников в этой сессии.")
 
+        if not access.is_participant(profile, session.group_id):
+            raise forms.ValidationError("Участник не входит в эту группу.")
+
         if session.date != timezone.localdate():
             raise forms.ValidationError("Можно отмечать только сегодняшние сессии.")
 
@@ -0,0 +1,129 @@
+"""
+Живое обновление таблицы посещаемости для тренера.
+
+Отметка публикует в Redis только изменившуюся ячейку (участник, сессия,
+статусы и время) — браузер обновляет ее без перезапроса всей матрицы:
+- LIVE_SSE=1 (по умолчанию в ASGI_MODE): pub/sub, SSE-представление держит
+  соединение и пересылает события;
+- иначе (WSGI, gthread): событие дописывается в Redis Stream группы, а
+  страница раз в LIVE_POLL_MS забирает новые события коротким запросом.
+  Бесконечный SSE-ответ под WSGI буферизуется целиком и навсегда занимает
+  поток воркера, поэтому там он не подключается.
+"""
+import logging
+import re
+
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.utils.timezone import localtime
+from django_redis import get_redis_connection
+
+from apps.core import fastjson
+
+logger = logging.getLogger("attendance")
+
+CHANNEL_PREFIX = "orleuqr:attendance:group"
+LOG_PREFIX = "orleuqr:attendance:log"
+CURSOR_RE = re.compile(r"^\d+-\d+$")
+
+
+def group_channel(group_id) -> str:
+    return f"{CHANNEL_PREFIX}:{group_id}"
+
+
+def group_log(group_id) -> str:
+    return f"{LOG_PREFIX}:{group_id}"
+
+
+def build_event(attendance) -> dict:
+    """Дельта для одной ячейки таблицы (те же ключи, что и в attendance_json_view)"""
+    return {
+        "participant_id": attendance.profile_id,
+        "session_id": attendance.session_id,
+        "arrived_at": localtime(attendance.arrived_at).strftime("%H:%M") if attendance.arrived_at else None,
+        "left_at": localtime(attendance.left_at).strftime("%H:%M") if attendance.left_at else None,
+        "arrived_status": attendance.arrived_status,
+        "left_status": attendance.left_status,
+        "marked_entry": bool(attendance.marked_entry_by_trainer_id),
+        "marked_exit": bool(attendance.marked_exit_by_trainer_id),
+    }
+
+
+def publish_attendance(attendance):
+    """Публикует изменение отметки. Ошибки Redis не должны ломать саму отметку."""
+    group_id = attendance.session.group_id
+    data = fastjson.dumps(build_event(attendance))
+    try:
+        client = get_redis_connection("default")
+        if settings.LIVE_SSE:
+            client.publish(group_channel(group_id), data)
+        else:
+            pipe = client.pipeline(transaction=False)
+            pipe.xadd(group_log(group_id), {"data": data}, maxlen=settings.LIVE_LOG_MAXLEN, approximate=True)
+            pipe.expire(group_log(group_id), settings.LIVE_LOG_TTL)
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"[Live] Не удалось опубликовать отметку id={attendance.pk}: {e}")
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def last_event_id(group_id):
+    """Курсор на последнее событие группы — с него страница начинает опрос"""
+    try:
+        entries = get_redis_connection("default").xrevrange(group_log(group_id), count=1)
+    except Exception as e:
+        logger.warning(f"[Live] Журнал событий группы {group_id} недоступен: {e}")
+        return "0-0"
+    return _decode(entries[0][0]) if entries else "0-0"
+
+
+def events_after(group_id, cursor):
+    """(события после курсора, новый курсор) для короткого опроса"""
+    if not CURSOR_RE.match(cursor or ""):
+        cursor = "0-0"
+    try:
+        entries = get_redis_connection("default").xrange(
+            group_log(group_id), min=cursor, count=settings.LIVE_POLL_BATCH + 1
+        )
+    except Exception as e:
+        logger.warning(f"[Live] Журнал событий группы {group_id} недоступен: {e}")
+        return [], cursor
+
+    events = []
+    for entry_id, fields in entries:
+        entry_id = _decode(entry_id)
+        # XRANGE включает границу — событие с id курсора уже отдано
+        if entry_id == cursor:
+            continue
+        events.append(fastjson.loads(fields[b"data"] if b"data" in fields else fields["data"]))
+        cursor = entry_id
+    return events, cursor
+
+
+async def stream_group_events(group_id):
+    """Асинхронный генератор SSE-сообщений для группы"""
+    client = aioredis.from_url(settings.REDIS_URL)
+    pubsub = client.pubsub()
+    await pubsub.subscribe(group_channel(group_id))
+    try:
+        yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=settings.LIVE_KEEPALIVE_SECONDS,
+            )
+            if message is None:
+                # Комментарий SSE держит соединение открытым через прокси
+                yield ": keepalive\n\n"
+                continue
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode()
+            yield f"event: attendance\ndata: {data}\n\n"
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await client.aclose()
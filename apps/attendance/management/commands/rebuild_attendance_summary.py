@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.summary import rebuild_group
+from apps.groups.models import Group
+
+
+class Command(BaseCommand):
+    help = "Пересборка сводок посещаемости (по сессиям и участникам) из отметок"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", action="append", help="Код группы, можно указать несколько раз (по умолчанию все)")
+
+    def handle(self, *args, **options):
+        groups = Group.objects.all()
+        if options["group"]:
+            groups = groups.filter(code__in=options["group"])
+            missing = set(options["group"]) - set(groups.values_list("code", flat=True))
+            if missing:
+                raise CommandError(f"Группы не найдены: {', '.join(sorted(missing))}")
+
+        count = 0
+        for group in groups.iterator():
+            rebuild_group(group)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Сводки пересобраны для групп: {count}"))
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Помесячные секции TrustLog (PostgreSQL): преобразование таблицы, "
+        "создание секций наперед, отсоединение и архивирование старых"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert", action="store_true",
+            help="Преобразовать обычную таблицу в секционированную (однократно, блокирует запись)",
+        )
+        parser.add_argument(
+            "--ahead", type=int, default=settings.TRUSTLOG_PARTITIONS_AHEAD,
+            help="Сколько месяцев вперед создавать секции",
+        )
+        parser.add_argument(
+            "--detach-older-than", type=int, metavar="MONTHS",
+            nargs="?", const=settings.TRUSTLOG_RETENTION_MONTHS,
+            help="Отсоединить секции старше MONTHS месяцев (без значения — TRUSTLOG_RETENTION_MONTHS)",
+        )
+        parser.add_argument(
+            "--archive", action="store_true",
+            help="Выгрузить отсоединенные секции в ARCHIVE_ROOT/trustlog",
+        )
+        parser.add_argument(
+            "--drop", action="store_true",
+            help="Удалить отсоединенные секции из БД",
+        )
+
+    def handle(self, *args, **options):
+        if not partitions.supported():
+            self.stdout.write(self.style.WARNING("Секционирование доступно только на PostgreSQL — пропускаем"))
+            return
+
+        if not partitions.is_partitioned():
+            if not options["convert"]:
+                raise CommandError("Таблица TrustLog не секционирована. Запустите с --convert")
+            copied = partitions.convert(options["ahead"])
+            self.stdout.write(self.style.SUCCESS(f"Таблица преобразована, перенесено строк: {copied}"))
+
+        created = partitions.ensure_partitions(options["ahead"])
+        for name in created:
+            self.stdout.write(f"Создана секция {name}")
+
+        months = options["detach_older_than"]
+        if months is not None:
+            if options["drop"] and not options["archive"]:
+                self.stdout.write(self.style.WARNING("Секции удаляются без архива"))
+            for name, path in partitions.detach_older_than(months, options["archive"], options["drop"]):
+                self.stdout.write(f"Отсоединена секция {name}" + (f" → {path}" if path else ""))
+
+        existing = partitions.list_partitions()
+        self.stdout.write(self.style.SUCCESS(
+            f"Секций: {len(existing)}"
+            + (f" ({existing[0][1]:%m.%Y} — {existing[-1][1]:%m.%Y})" if existing else "")
+        ))
@@ -86,9 +86,12 @@ class Attendance(BaseModel):
         verbose_name = _("Отметка посещения")
         verbose_name_plural = _("Отметки посещения")
         unique_together = ("session", "profile")
+        # (session, profile) уже покрыт индексом unique_together
         indexes = [
-            models.Index(fields=["session", "profile"]),
-            models.Index(fields=["fingerprint_hash"]),
+            # Отметки участника по его группам (participant_groups_view)
+            models.Index(fields=["profile", "session"], name="attendance_profile_session_idx"),
+            # Отметки за день (home_view, счетчики)
+            models.Index(fields=["created"], name="attendance_created_idx"),
         ]
         ordering = ["-arrived_at"]
 
@@ -121,6 +124,90 @@ class Attendance(BaseModel):
         return cls.objects.filter(session__group=group).select_related("profile", "session")
 
 
+class AttendanceSummary(BaseModel):
+    """
+    Сводка посещаемости сессии. Поддерживается инкрементально при каждой
+    отметке (apps/attendance/summary.py) и пересобирается командой
+    rebuild_attendance_summary. Имена полей счетчиков повторяют значения
+    Attendance.TimeStatus и Attendance.TrustLevel.
+    """
+    group = models.ForeignKey(
+        "groups.Group",
+        on_delete=models.CASCADE,
+        related_name="attendance_summaries",
+        verbose_name=_("Группа"),
+    )
+    session = models.OneToOneField(
+        Session,
+        on_delete=models.CASCADE,
+        related_name="attendance_summary",
+        verbose_name=_("Сессия"),
+    )
+
+    arrived_count = models.PositiveIntegerField(_("Отметили вход"), default=0)
+    left_count = models.PositiveIntegerField(_("Отметили выход"), default=0)
+
+    # Вход по статусам
+    arrived_by_trainer = models.PositiveIntegerField(default=0)
+    arrived_too_early = models.PositiveIntegerField(default=0)
+    arrived_on_time = models.PositiveIntegerField(default=0)
+    arrived_too_late = models.PositiveIntegerField(default=0)
+    arrived_unknown = models.PositiveIntegerField(default=0)
+
+    # Выход по статусам
+    left_by_trainer = models.PositiveIntegerField(default=0)
+    left_too_early = models.PositiveIntegerField(default=0)
+    left_on_time = models.PositiveIntegerField(default=0)
+    left_too_late = models.PositiveIntegerField(default=0)
+    left_unknown = models.PositiveIntegerField(default=0)
+
+    # Уровень доверия отметок входа
+    trust_trusted = models.PositiveIntegerField(default=0)
+    trust_suspicious = models.PositiveIntegerField(default=0)
+    trust_blocked = models.PositiveIntegerField(default=0)
+    trust_manual_by_trainer = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Сводка по сессии")
+        verbose_name_plural = _("Сводки по сессиям")
+        indexes = [
+            models.Index(fields=["group"], name="summary_group_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.session} — {self.arrived_count}"
+
+
+class ParticipantSummary(BaseModel):
+    """Сводка участника по группе: сколько сессий посещено и завершено"""
+    group = models.ForeignKey(
+        "groups.Group",
+        on_delete=models.CASCADE,
+        related_name="participant_summaries",
+        verbose_name=_("Группа"),
+    )
+    profile = models.ForeignKey(
+        PersonProfile,
+        on_delete=models.CASCADE,
+        related_name="attendance_summaries",
+        verbose_name=_("Профиль участника"),
+    )
+    sessions_arrived = models.PositiveIntegerField(_("Сессий с отметкой входа"), default=0)
+    # Завершенная сессия: есть выход, а если выход не отслеживается — вход
+    sessions_completed = models.PositiveIntegerField(_("Завершенных сессий"), default=0)
+
+    class Meta:
+        verbose_name = _("Сводка по участнику")
+        verbose_name_plural = _("Сводки по участникам")
+        unique_together = ("group", "profile")
+
+    def __str__(self):
+        return f"{self.profile.full_name} — {self.group.code}"
+
+    def completion_ratio(self, sessions_count):
+        return self.sessions_completed / sessions_count if sessions_count else 0.0
+
+
 class TrustLog(models.Model):
     fingerprint = models.ForeignKey("participants.BrowserFingerprint", on_delete=models.CASCADE, null=True, blank=True)
     attendance = models.ForeignKey("attendance.Attendance", on_delete=models.SET_NULL, null=True, blank=True)
@@ -128,6 +215,14 @@ class TrustLog(models.Model):
     delta = models.SmallIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # На PostgreSQL таблица может быть секционирована по месяцам
+        # (apps/attendance/partitions.py) — индексы наследуются секциями
+        indexes = [
+            models.Index(fields=["created_at"], name="trustlog_created_idx"),
+            models.Index(fields=["fingerprint", "created_at"], name="trustlog_fp_created_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.fingerprint and not self.attendance:
             raise ValueError("TrustLog must be linked to either fingerprint or attendance.")
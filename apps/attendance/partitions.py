@@ -0,0 +1,199 @@
+"""
+Помесячное секционирование TrustLog (только PostgreSQL).
+
+Таблица attendance_trustlog превращается в секционированную по created_at
+(PARTITION BY RANGE) с секцией на каждый месяц и секцией DEFAULT для строк
+вне диапазонов. Для Django это по-прежнему одна таблица: ORM, админка и
+отчеты работают без изменений, а фильтры по created_at затрагивают только
+нужные секции.
+
+Attendance не секционируется: уникальность (session, profile), на которой
+держится идемпотентная отметка (создание в савепоинте, а при IntegrityError —
+чтение строки, вставленной параллельной отметкой), и внешний ключ из TrustLog
+требуют, чтобы ключ секционирования входил во все уникальные ограничения —
+для отметки это не так.
+
+Управление — командой trustlog_partitions (и задачей ensure_trustlog_partitions).
+"""
+import gzip
+import json
+import logging
+import os
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from apps.attendance.models import Attendance, TrustLog
+from apps.participants.models import BrowserFingerprint
+
+logger = logging.getLogger(__name__)
+
+TABLE = TrustLog._meta.db_table
+
+
+def supported():
+    return connection.vendor == "postgresql"
+
+
+def month_start(value, shift=0):
+    month = value.month - 1 + shift
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(start):
+    return f"{TABLE}_p{start:%Y_%m}"
+
+
+def is_partitioned():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace",
+            [TABLE],
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions():
+    """Секции [(имя, начало месяца)] по возрастанию; DEFAULT не включается"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            ORDER BY child.relname
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    partitions = []
+    prefix = f"{TABLE}_p"
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        year, month = name[len(prefix):].split("_")
+        partitions.append((name, date(int(year), int(month), 1)))
+    return partitions
+
+
+def _create_partition(cursor, start):
+    end = month_start(start, 1)
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(start)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [start.isoformat(), end.isoformat()],
+    )
+
+
+def ensure_partitions(ahead=3, today=None):
+    """Создает секции с текущего месяца на ahead месяцев вперед. Возвращает созданные имена"""
+    today = today or date.today()
+    existing = {name for name, _ in list_partitions()}
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for shift in range(ahead + 1):
+            start = month_start(today, shift)
+            if partition_name(start) not in existing:
+                _create_partition(cursor, start)
+                created.append(partition_name(start))
+    return created
+
+
+def convert(ahead=3):
+    """
+    Однократное преобразование обычной таблицы в секционированную.
+    Строки копируются в новую таблицу внутри одной транзакции, на время
+    которой запись в TrustLog блокируется. Старая таблица удаляется до создания
+    ключей и индексов: их имена в схеме должны освободиться.
+    """
+    legacy = f"{TABLE}_legacy"
+    fingerprint_table = BrowserFingerprint._meta.db_table
+    attendance_table = Attendance._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING IDENTITY) '
+            f"PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(f'CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT')
+
+        cursor.execute(f'SELECT min(created_at) FROM "{legacy}"')
+        oldest = cursor.fetchone()[0]
+        start = month_start(oldest.date() if oldest else date.today())
+        last = month_start(date.today(), ahead)
+        while start <= last:
+            _create_partition(cursor, start)
+            start = month_start(start, 1)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{legacy}"')
+        copied = cursor.rowcount
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE((SELECT max(id) FROM \"{TABLE}\"), 1))",
+            [TABLE],
+        )
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        # Уникальность секционированной таблицы обязана включать ключ секционирования
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD FOREIGN KEY (fingerprint_id) '
+            f'REFERENCES "{fingerprint_table}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD FOREIGN KEY (attendance_id) '
+            f'REFERENCES "{attendance_table}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+
+        # Индексы FK и Meta.indexes — с теми же именами, что создал бы Django;
+        # на родительской таблице они распространяются на все секции
+        with connection.schema_editor() as schema_editor:
+            for statement in schema_editor._model_indexes_sql(TrustLog):
+                schema_editor.execute(statement)
+    return copied
+
+
+def archive_partition(name):
+    """Выгружает секцию в ARCHIVE_ROOT/trustlog/<имя>.ndjson.gz, возвращает путь"""
+    directory = os.path.join(settings.ARCHIVE_ROOT, "trustlog")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.ndjson.gz")
+
+    with connection.cursor() as cursor, gzip.open(path, "wt", encoding="utf-8") as f:
+        cursor.execute(f'SELECT row_to_json(t)::text FROM "{name}" t ORDER BY id')
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for (row,) in rows:
+                f.write(row)
+                f.write("\n")
+    return path
+
+
+def detach_older_than(months, archive=False, drop=False, today=None):
+    """
+    Отсоединяет секции, закончившиеся раньше, чем months месяцев назад.
+    Отсоединенная таблица остается в БД (запросы к TrustLog ее больше не видят),
+    с archive — выгружается в файл, с drop — удаляется.
+    """
+    cutoff = month_start(today or date.today(), -months)
+    processed = []
+    for name, start in list_partitions():
+        if month_start(start, 1) > cutoff:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+        path = archive_partition(name) if archive else None
+        if drop:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE "{name}"')
+        logger.info(json.dumps({"partition": name, "archived": path, "dropped": drop}))
+        processed.append((name, path))
+    return processed
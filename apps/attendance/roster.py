@@ -0,0 +1,37 @@
+"""
+Поиск участников для ручной отметки.
+
+Форма ручной отметки не выводит список всех участников: поле участника
+заполняется через автодополнение, которое ищет только в составе группы
+выбранной сессии — по подстроке ФИО, ИИН или email (apps/core/search.py).
+Выборка ограничена составом одной группы (индекс по group_id
+through-таблицы) и ROSTER_SEARCH_LIMIT строками, поэтому время ответа
+не зависит ни от числа групп тренера, ни от размера таблицы профилей.
+"""
+from django.conf import settings
+
+from apps.attendance.models import Attendance
+from apps.core import search
+from apps.participants.models import PersonProfile
+
+
+def search_roster(session, query="", limit=None):
+    """
+    Участники группы сессии, подходящие под запрос, с состоянием отметки
+    в этой сессии: [{"id", "full_name", "iin", "arrived_at", "left_at"}].
+    """
+    limit = settings.ROSTER_SEARCH_LIMIT if limit is None else limit
+    profiles = search.search("profile", query, PersonProfile.objects.filter(groups=session.group_id))
+    rows = list(profiles.order_by("full_name").values("id", "full_name", "iin")[:limit])
+
+    marks = {
+        profile_id: (arrived_at, left_at)
+        for profile_id, arrived_at, left_at in Attendance.objects
+        .filter(session=session, profile_id__in=[row["id"] for row in rows])
+        .values_list("profile_id", "arrived_at", "left_at")
+    }
+    for row in rows:
+        arrived_at, left_at = marks.get(row["id"], (None, None))
+        row["arrived_at"] = arrived_at.isoformat() if arrived_at else None
+        row["left_at"] = left_at.isoformat() if left_at else None
+    return rows
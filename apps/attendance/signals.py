@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete
+from django.dispatch import Signal, receiver
+
+# Отправляется после успешной отметки входа/выхода (по QR или тренером).
+# Аргументы: attendance, mode ("entry" | "exit"), created (bool)
+attendance_marked = Signal()
+
+# Пакетная отметка одной сессии (manual_mark_batch) вместо attendance_marked на
+# каждый элемент. Аргументы: marks — список (attendance, mode, created)
+attendance_marked_bulk = Signal()
+
+
+@receiver(attendance_marked)
+def publish_live_update(sender, attendance, mode, **kwargs):
+    from apps.attendance.live import publish_attendance
+
+    publish_attendance(attendance)
+
+
+@receiver(attendance_marked)
+def update_attendance_summary(sender, attendance, mode, **kwargs):
+    from apps.attendance.summary import record_mark
+
+    record_mark(attendance, mode)
+
+
+@receiver(attendance_marked_bulk)
+def publish_live_updates(sender, marks, **kwargs):
+    from apps.attendance.live import publish_attendance
+
+    for attendance, mode, created in marks:
+        publish_attendance(attendance)
+
+
+@receiver(attendance_marked_bulk)
+def update_attendance_summary_bulk(sender, marks, **kwargs):
+    from apps.attendance.summary import record_marks
+
+    record_marks([(attendance, mode) for attendance, mode, created in marks])
+
+
+@receiver(post_delete, sender="attendance.Attendance")
+def subtract_attendance_summary(sender, instance, **kwargs):
+    from apps.attendance.summary import record_delete
+
+    record_delete(instance)
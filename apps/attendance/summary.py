@@ -0,0 +1,300 @@
+"""
+Материализованные сводки посещаемости (AttendanceSummary, ParticipantSummary).
+
+Отчеты и API читают готовые счетчики — O(сессий) вместо O(отметок).
+Счетчики увеличиваются атомарным UPDATE ... SET x = x + 1 на каждой отметке
+(сигнал attendance_marked, для пакетов — attendance_marked_bulk) и уменьшаются
+при удалении отметки. Если строки сводки еще нет, она собирается агрегатом
+по отметкам.
+
+Пересборка целиком: python manage.py rebuild_attendance_summary
+(нужна, например, после смены track_exit у группы — меняется смысл «завершена»).
+"""
+import logging
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from apps.attendance.models import Attendance, AttendanceSummary, ParticipantSummary
+
+logger = logging.getLogger(__name__)
+
+
+def _session_aggregates():
+    arrived = Q(arrived_at__isnull=False)
+    left = Q(arrived_at__isnull=False, left_at__isnull=False)
+    aggregates = {
+        "arrived_count": Count("id", filter=arrived),
+        "left_count": Count("id", filter=left),
+    }
+    for status in Attendance.TimeStatus.values:
+        aggregates[f"arrived_{status}"] = Count("id", filter=arrived & Q(arrived_status=status))
+        aggregates[f"left_{status}"] = Count("id", filter=left & Q(left_status=status))
+    for level in Attendance.TrustLevel.values:
+        aggregates[f"trust_{level}"] = Count("id", filter=arrived & Q(trust_level=level))
+    return aggregates
+
+
+def rebuild_session(session):
+    counts = Attendance.objects.filter(session=session).aggregate(**_session_aggregates())
+    summary, _ = AttendanceSummary.objects.update_or_create(
+        session=session,
+        defaults={"group_id": session.group_id, **counts},
+    )
+    return summary
+
+
+def rebuild_participants(group, profile_ids=None):
+    """Пересобирает сводки участников группы (или только указанных)"""
+    completed = Q(left_at__isnull=False) if group.track_exit else Q(arrived_at__isnull=False)
+    rows = (
+        Attendance.objects
+        .filter(session__group=group, arrived_at__isnull=False)
+        .values("profile_id")
+        .annotate(arrived=Count("id"), completed=Count("id", filter=completed))
+    )
+    if profile_ids is not None:
+        rows = rows.filter(profile_id__in=profile_ids)
+    counts = {row["profile_id"]: row for row in rows}
+
+    if profile_ids is None:
+        profile_ids = list(group.participants.values_list("id", flat=True))
+        ParticipantSummary.objects.filter(group=group).exclude(profile_id__in=profile_ids).delete()
+
+    for profile_id in profile_ids:
+        row = counts.get(profile_id, {})
+        ParticipantSummary.objects.update_or_create(
+            group=group,
+            profile_id=profile_id,
+            defaults={
+                "sessions_arrived": row.get("arrived", 0),
+                "sessions_completed": row.get("completed", 0),
+            },
+        )
+
+
+def rebuild_group(group):
+    for session in group.sessions.all():
+        rebuild_session(session)
+    rebuild_participants(group)
+
+
+def _bulk_create(model, objs, batch_size):
+    objs = iter(objs)
+    while batch := list(islice(objs, batch_size)):
+        model.objects.bulk_create(batch)
+
+
+def rebuild_groups_bulk(groups, batch_size=5000):
+    """
+    Пересборка сводок множества групп (queryset) двумя агрегатами и bulk_create —
+    для массовой загрузки, где rebuild_group по строке слишком медленный.
+    Строки создаются только для сессий и участников с отметками, недостающие
+    соберутся при первой отметке.
+    """
+    AttendanceSummary.objects.filter(group__in=groups).delete()
+    ParticipantSummary.objects.filter(group__in=groups).delete()
+
+    sessions = (
+        Attendance.objects
+        .filter(session__group__in=groups)
+        .values("session_id", "session__group_id")
+        .annotate(**_session_aggregates())
+        .order_by()
+    )
+    _bulk_create(AttendanceSummary, (
+        AttendanceSummary(session_id=row.pop("session_id"), group_id=row.pop("session__group_id"), **row)
+        for row in sessions.iterator()
+    ), batch_size)
+
+    completed = Q(session__group__track_exit=False) | Q(left_at__isnull=False)
+    participants = (
+        Attendance.objects
+        .filter(session__group__in=groups, arrived_at__isnull=False)
+        .values("session__group_id", "profile_id")
+        .annotate(arrived=Count("id"), completed=Count("id", filter=completed))
+        .order_by()
+    )
+    _bulk_create(ParticipantSummary, (
+        ParticipantSummary(
+            group_id=row["session__group_id"],
+            profile_id=row["profile_id"],
+            sessions_arrived=row["arrived"],
+            sessions_completed=row["completed"],
+        )
+        for row in participants.iterator()
+    ), batch_size)
+
+
+def _increment(model, lookup, deltas, rebuild):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = model.objects.filter(**lookup).update(**{f: F(f) + d for f, d in deltas.items()})
+    if updated or rebuild is None:
+        return
+    # Строки еще нет — собираем агрегатом (текущая отметка уже в БД)
+    try:
+        with transaction.atomic():
+            rebuild()
+    except IntegrityError:
+        # Параллельный запрос успел создать строку. Учел ли его агрегат нашу
+        # отметку, неизвестно (она уже зафиксирована, ATOMIC_REQUESTS выключен),
+        # поэтому не прибавляем, а пересобираем строку из зафиксированных отметок:
+        # rebuild — update_or_create, и теперь он обновит существующую строку
+        try:
+            with transaction.atomic():
+                rebuild()
+        except IntegrityError as e:
+            logger.error(f"Summary row {model.__name__} {lookup} not rebuilt after a concurrent insert: {e}")
+
+
+def _deltas(attendance, group, arrived, left, sign):
+    """Изменения счетчиков (сессии, участника) от одной отметки"""
+    session_deltas = {}
+    participant_deltas = {}
+    if arrived:
+        session_deltas["arrived_count"] = sign
+        session_deltas[f"arrived_{attendance.arrived_status}"] = sign
+        session_deltas[f"trust_{attendance.trust_level}"] = sign
+        participant_deltas["sessions_arrived"] = sign
+        if not group.track_exit:
+            participant_deltas["sessions_completed"] = sign
+    if left:
+        session_deltas["left_count"] = sign
+        session_deltas[f"left_{attendance.left_status}"] = sign
+        if group.track_exit:
+            participant_deltas["sessions_completed"] = sign
+    return session_deltas, participant_deltas
+
+
+def _apply(attendance, arrived, left, sign):
+    session = attendance.session
+    group = session.group
+    session_deltas, participant_deltas = _deltas(attendance, group, arrived, left, sign)
+
+    # При удалении строку сводки не создаем: она могла быть удалена каскадом
+    # вместе с сессией или группой
+    _increment(
+        AttendanceSummary, {"session_id": session.id}, session_deltas,
+        (lambda: rebuild_session(session)) if sign > 0 else None,
+    )
+    _increment(
+        ParticipantSummary, {"group_id": group.id, "profile_id": attendance.profile_id}, participant_deltas,
+        (lambda: rebuild_participants(group, [attendance.profile_id])) if sign > 0 else None,
+    )
+
+
+def record_mark(attendance, mode):
+    """Учитывает новую отметку входа или выхода"""
+    try:
+        with transaction.atomic():
+            _apply(attendance, arrived=mode == "entry", left=mode == "exit", sign=1)
+    except Exception as e:
+        # Сводка восстановима командой, отметка важнее
+        logger.error(f"Failed to update attendance summary for attendance id={attendance.pk}: {e}")
+
+
+def record_marks(marks):
+    """
+    Учитывает пакет отметок (attendance, mode) одной сессии: одно обновление
+    сводки сессии и по одному на группу участников с одинаковыми изменениями
+    """
+    if not marks:
+        return
+    session = marks[0][0].session
+    group = session.group
+
+    session_deltas = {}
+    participant_deltas = {}
+    for attendance, mode in marks:
+        one_session, one_participant = _deltas(attendance, group, mode == "entry", mode == "exit", 1)
+        for field, delta in one_session.items():
+            session_deltas[field] = session_deltas.get(field, 0) + delta
+        deltas = participant_deltas.setdefault(attendance.profile_id, {})
+        for field, delta in one_participant.items():
+            deltas[field] = deltas.get(field, 0) + delta
+
+    by_deltas = {}
+    for profile_id, deltas in participant_deltas.items():
+        if deltas:
+            by_deltas.setdefault(tuple(sorted(deltas.items())), []).append(profile_id)
+
+    try:
+        with transaction.atomic():
+            _increment(
+                AttendanceSummary, {"session_id": session.id}, session_deltas,
+                lambda: rebuild_session(session),
+            )
+            for deltas, profile_ids in by_deltas.items():
+                lookup = {"group_id": group.id, "profile_id__in": profile_ids}
+                updated = ParticipantSummary.objects.filter(**lookup).update(
+                    **{f: F(f) + d for f, d in deltas}
+                )
+                if updated < len(profile_ids):
+                    # Строк части участников еще нет — собираем их агрегатом
+                    existing = set(ParticipantSummary.objects.filter(**lookup).values_list("profile_id", flat=True))
+                    rebuild_participants(group, [pid for pid in profile_ids if pid not in existing])
+    except Exception as e:
+        logger.error(f"Failed to update attendance summary for session id={session.id} batch: {e}")
+
+
+def record_delete(attendance):
+    """Вычитает удаленную отметку из сводок"""
+    try:
+        with transaction.atomic():
+            _apply(
+                attendance,
+                arrived=bool(attendance.arrived_at),
+                left=bool(attendance.arrived_at and attendance.left_at),
+                sign=-1,
+            )
+    except Exception as e:
+        logger.error(f"Failed to update attendance summary for deleted attendance id={attendance.pk}: {e}")
+
+
+def group_summary(group):
+    """Сводка группы для отчетов и API: строки по сессиям и по участникам"""
+    participants = list(group.participants.order_by("full_name").values("id", "full_name"))
+    participants_total = len(participants)
+    sessions = list(group.sessions.select_related("attendance_summary").order_by("date"))
+    sessions_count = len(sessions)
+
+    session_rows = []
+    for session in sessions:
+        summary = getattr(session, "attendance_summary", None) or AttendanceSummary(session=session)
+        row = {
+            "session_id": session.id,
+            "date": session.date.strftime("%Y-%m-%d"),
+            "participants_total": participants_total,
+            "arrived_count": summary.arrived_count,
+            "left_count": summary.left_count,
+            "arrived_status": {s: getattr(summary, f"arrived_{s}") for s in Attendance.TimeStatus.values},
+            "left_status": {s: getattr(summary, f"left_{s}") for s in Attendance.TimeStatus.values},
+            "trust_level": {t: getattr(summary, f"trust_{t}") for t in Attendance.TrustLevel.values},
+            "attendance_rate": summary.arrived_count / participants_total if participants_total else 0.0,
+        }
+        session_rows.append(row)
+
+    summaries = {
+        s.profile_id: s for s in ParticipantSummary.objects.filter(group=group)
+    }
+    participant_rows = []
+    for participant in participants:
+        summary = summaries.get(participant["id"]) or ParticipantSummary()
+        participant_rows.append({
+            "participant_id": participant["id"],
+            "participant": participant["full_name"],
+            "sessions_arrived": summary.sessions_arrived,
+            "sessions_completed": summary.sessions_completed,
+            "completion_ratio": summary.completion_ratio(sessions_count),
+        })
+
+    return {
+        "group_id": group.id,
+        "sessions_count": sessions_count,
+        "participants_total": participants_total,
+        "sessions": session_rows,
+        "participants": participant_rows,
+    }
@@ -0,0 +1,18 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from apps.attendance import partitions
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def ensure_trustlog_partitions():
+    """Создает секции TrustLog наперед (по расписанию CELERY_BEAT_SCHEDULE)"""
+    if not partitions.supported() or not partitions.is_partitioned():
+        return
+    created = partitions.ensure_partitions(settings.TRUSTLOG_PARTITIONS_AHEAD)
+    if created:
+        logger.info(f"Created TrustLog partitions: {', '.join(created)}")
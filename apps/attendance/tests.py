@@ -1,3 +1,98 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.attendance import summary
+from apps.attendance.models import Attendance, AttendanceSummary, ParticipantSummary
+from apps.groups.models import Group, Session
+from apps.participants.models import PersonProfile
+
+# Тесты не зависят от Redis: кэш и счетчики — в памяти процесса
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SummaryIncrementTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.group = Group.objects.create(
+            external_id=1, code="G1", course_name="Курс", supervisor_name="Тренер",
+            supervisor_iin="100000000009", start_date=today, end_date=today,
+        )
+        cls.profiles = [
+            PersonProfile.objects.create(iin=f"10000000000{i}", full_name=f"Участник {i}")
+            for i in range(2)
+        ]
+        cls.group.participants.add(*cls.profiles)
+        # QR-файлы при создании сессии тестам не нужны
+        with mock.patch("apps.groups.signals.generate_session_qr_files"):
+            cls.session = Session.objects.create(group=cls.group, date=today)
+
+    def mark(self, profile, status=Attendance.TimeStatus.ON_TIME):
+        attendance = Attendance.objects.create(
+            session=self.session, profile=profile, arrived_at=timezone.now(), arrived_status=status,
+        )
+        summary.record_mark(attendance, "entry")
+        return attendance
+
+    def test_first_mark_builds_row_and_next_marks_increment(self):
+        self.mark(self.profiles[0])
+        row = AttendanceSummary.objects.get(session=self.session)
+        self.assertEqual((row.arrived_count, row.arrived_on_time), (1, 1))
+
+        self.mark(self.profiles[1], Attendance.TimeStatus.TOO_LATE)
+        row.refresh_from_db()
+        self.assertEqual((row.arrived_count, row.arrived_on_time, row.arrived_too_late), (2, 1, 1))
+        self.assertEqual(ParticipantSummary.objects.get(profile=self.profiles[1]).sessions_arrived, 1)
+
+    def test_delete_subtracts_mark(self):
+        self.mark(self.profiles[0])
+        attendance = self.mark(self.profiles[1])
+
+        attendance.delete()
+        row = AttendanceSummary.objects.get(session=self.session)
+        self.assertEqual((row.arrived_count, row.arrived_on_time), (1, 1))
+        self.assertEqual(ParticipantSummary.objects.get(profile=self.profiles[1]).sessions_arrived, 0)
+
+    def record_with_concurrent_insert(self, attendance, counted):
+        """
+        record_mark, когда строку сводки между нашим UPDATE (0 строк) и нашей
+        вставкой создал параллельный запрос: его агрегат насчитал counted отметок
+        """
+        rebuild_session = summary.rebuild_session
+        calls = []
+
+        def rebuild(session):
+            calls.append(session)
+            if len(calls) == 1:
+                raise IntegrityError("duplicate key value violates unique constraint")
+            AttendanceSummary.objects.get_or_create(
+                session=session,
+                defaults={"group": self.group, "arrived_count": counted, "arrived_unknown": counted},
+            )
+            return rebuild_session(session)
+
+        with mock.patch.object(summary, "rebuild_session", side_effect=rebuild):
+            summary.record_mark(attendance, "entry")
+        self.assertEqual(len(calls), 2)
+
+    def test_concurrent_insert_without_our_mark_is_rebuilt(self):
+        Attendance.objects.create(session=self.session, profile=self.profiles[0], arrived_at=timezone.now())
+        attendance = Attendance.objects.create(session=self.session, profile=self.profiles[1], arrived_at=timezone.now())
+
+        self.record_with_concurrent_insert(attendance, counted=1)
+
+        row = AttendanceSummary.objects.get(session=self.session)
+        self.assertEqual((row.arrived_count, row.arrived_unknown), (2, 2))
+
+    def test_concurrent_insert_with_our_mark_is_not_incremented_twice(self):
+        Attendance.objects.create(session=self.session, profile=self.profiles[0], arrived_at=timezone.now())
+        attendance = Attendance.objects.create(session=self.session, profile=self.profiles[1], arrived_at=timezone.now())
+
+        self.record_with_concurrent_insert(attendance, counted=2)
+
+        row = AttendanceSummary.objects.get(session=self.session)
+        self.assertEqual((row.arrived_count, row.arrived_unknown), (2, 2))
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import manual_mark_view
+from .views import manual_mark_batch_view, manual_mark_form_view, manual_mark_view, roster_search_view
 
 app_name = "attendance"
 
 urlpatterns = [
     path("manual-mark/", manual_mark_view, name="manual_mark"),
+    path("manual-mark/batch/", manual_mark_batch_view, name="manual_mark_batch"),
+    path("manual-mark/session/<int:session_id>/", manual_mark_form_view, name="manual_mark_form"),
+    path("manual-mark/session/<int:session_id>/roster/", roster_search_view, name="roster_search"),
 ]
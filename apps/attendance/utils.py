@@ -3,6 +3,8 @@ from apps.participants.models import PersonProfile, BrowserFingerprint
 from apps.attendance.models import Attendance
 import logging
 
+from apps.core import metrics
+
 logger = logging.getLogger("attendance")
 
 
@@ -38,6 +40,7 @@ def check_fingerprint_usage_conflicts(fingerprint, profile, session):
         group_ids = other.groups.values_list("id", flat=True)
         in_same_group = session.group_id in group_ids
 
+        metrics.fingerprint_conflict("trainer" if is_trainer else "same_group" if in_same_group else "other_group")
         if is_trainer:
             delta = -40
             reason = f"Отпечаток также используется тренером {other.full_name} ({other.iin})"
@@ -1,14 +1,21 @@
-import json
 import logging
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-from django.http import JsonResponse
+from django.contrib import messages
+from django.http import HttpResponseForbidden
 from django.utils.timezone import now, localdate
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, redirect, render
 
 from apps.accounts.decorators import sso_login_required
-from apps.qr.services import manual_mark_entry
+from apps.attendance.forms import ManualMarkForm
+from apps.attendance.roster import search_roster
+from apps.core import fastjson
+from apps.core.concurrency import db_sync_to_async
+from apps.core.fastjson import FastJsonResponse
+from apps.qr.services import manual_mark_batch, manual_mark_entry
 from apps.participants.models import PersonProfile
+from apps.groups import access
 from apps.groups.models import Session
 
 logger = logging.getLogger("attendance")
@@ -19,17 +26,17 @@ logger = logging.getLogger("attendance")
 @sso_login_required
 def manual_mark_view(request):
     try:
-        data = json.loads(request.body)
+        data = fastjson.loads(request.body)
         mark_type = data.get("type")
         session_id = data.get("session_id")
         participant_id = data.get("participant_id")
 
         if not session_id or not participant_id or mark_type not in ("entry", "exit"):
-            return JsonResponse({"error": "Недостаточно данных"}, status=400)
+            return FastJsonResponse({"error": "Недостаточно данных"}, status=400)
 
         session = get_object_or_404(Session, id=session_id)
         if session.date != localdate():
-            return JsonResponse({"error": "Можно отмечать только текущую дату"}, status=403)
+            return FastJsonResponse({"error": "Можно отмечать только текущую дату"}, status=403)
 
         participant = get_object_or_404(PersonProfile, id=participant_id)
         trainer = request.user_profile
@@ -43,10 +50,94 @@ def manual_mark_view(request):
 
         if success:
             logger.info(f"[ManualMark] {trainer.full_name} отметил {mark_type} участника {participant.full_name}")
-            return JsonResponse({"ok": True})
+            return FastJsonResponse({"ok": True})
         else:
-            return JsonResponse({"error": str(result)}, status=400)
+            return FastJsonResponse({"error": str(result)}, status=400)
 
     except Exception as e:
         logger.exception("[ManualMark] Ошибка при отметке")
-        return JsonResponse({"error": str(e)}, status=500)
+        return FastJsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@require_POST
+@sso_login_required
+def manual_mark_batch_view(request):
+    """
+    Пакетная отметка одной сессии (список участников тренера или офлайн-очередь киоска):
+    {"session_id": 1, "marks": [{"participant_id": 2, "type": "entry", "marked_at": "..."}]}
+    """
+    try:
+        data = fastjson.loads(request.body)
+        session_id = data.get("session_id")
+        marks = data.get("marks")
+
+        if not session_id or not isinstance(marks, list) or not marks:
+            return FastJsonResponse({"error": "Недостаточно данных"}, status=400)
+        if len(marks) > settings.MANUAL_MARK_BATCH_MAX:
+            return FastJsonResponse(
+                {"error": f"Не более {settings.MANUAL_MARK_BATCH_MAX} отметок за запрос"}, status=400
+            )
+        if not all(isinstance(item, dict) for item in marks):
+            return FastJsonResponse({"error": "Некорректный формат отметок"}, status=400)
+
+        session = get_object_or_404(Session.objects.select_related("group"), id=session_id)
+        if session.date != localdate():
+            return FastJsonResponse({"error": "Можно отмечать только текущую дату"}, status=403)
+
+        trainer = request.user_profile
+        results = manual_mark_batch(trainer_profile=trainer, session=session, marks=marks)
+
+        marked = sum(1 for result in results if result["ok"])
+        logger.info(f"[ManualMark] {trainer.full_name} пакетно отметил {marked} из {len(results)} (сессия {session.id})")
+        return FastJsonResponse({"ok": marked == len(results), "marked": marked, "results": results})
+
+    except Exception as e:
+        logger.exception("[ManualMark] Ошибка при пакетной отметке")
+        return FastJsonResponse({"error": str(e)}, status=500)
+
+
+@sso_login_required
+def manual_mark_form_view(request, session_id):
+    """Страница ручной отметки по одной сессии; участник выбирается автодополнением"""
+    trainer = request.user_profile
+    session = get_object_or_404(Session.objects.select_related("group"), id=session_id)
+    if not access.is_trainer(trainer, session.group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
+
+    form = ManualMarkForm(request.POST or None, trainer=trainer, session=session)
+    if request.method == "POST" and form.is_valid():
+        participant = form.cleaned_data["profile"]
+        success, result = manual_mark_entry(
+            trainer_profile=trainer,
+            participant_profile=participant,
+            session=session,
+            mark_type=form.cleaned_data["mark_type"],
+        )
+        if success:
+            logger.info(f"[ManualMark] {trainer.full_name} отметил {form.cleaned_data['mark_type']} участника {participant.full_name}")
+            messages.success(request, f"Отметка для {participant.full_name} сохранена.")
+            return redirect("attendance:manual_mark_form", session_id=session.id)
+        messages.error(request, str(result))
+
+    return render(request, "attendance/manual_mark.html", {
+        "form": form,
+        "session": session,
+    })
+
+
+def _roster_search(trainer, session_id, query):
+    session = Session.objects.filter(id=session_id).only("id", "group_id").first()
+    if session is None or not access.is_trainer(trainer, session.group_id):
+        return None
+    return search_roster(session, query)
+
+
+@sso_login_required
+async def roster_search_view(request, session_id):
+    """Автодополнение участника: ?q=<начало ФИО или ИИН>, только состав группы сессии"""
+    query = request.GET.get("q", "")[:100]
+    results = await db_sync_to_async(_roster_search)(request.user_profile, session_id, query)
+    if results is None:
+        return FastJsonResponse({"error": "Нет доступа к сессии"}, status=403)
+    return FastJsonResponse({"results": results})
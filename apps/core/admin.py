@@ -5,9 +5,10 @@ from unfold.admin import ModelAdmin
 from unfold.contrib.filters.admin import RangeDateFilter
 from unfold.decorators import display
 from .models import APIToken
+from .replica import ReplicaChangeListMixin
 
 @admin.register(APIToken)
-class APITokenAdmin(ModelAdmin):
+class APITokenAdmin(ReplicaChangeListMixin, ModelAdmin):
     list_display = [
         'name', 
         'prefix_display', 
@@ -1,8 +1,8 @@
 import logging
 from functools import wraps
-from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
 from django.utils.translation import gettext as _
+from .fastjson import FastJsonResponse
 from .models import APIToken
 
 logger = logging.getLogger(__name__)
@@ -121,7 +121,7 @@ class APITokenMiddleware(MiddlewareMixin):
         """
         Возвращает ответ об ошибке аутентификации
         """
-        return JsonResponse({
+        return FastJsonResponse({
             'error': 'Authentication failed',
             'message': message
         }, status=401)
@@ -141,7 +141,7 @@ def api_token_required(permission_level=None):
         def _wrapped_view(request, *args, **kwargs):
             # Проверяем наличие аутентификации
             if not getattr(request, 'api_authenticated', False):
-                return JsonResponse({
+                return FastJsonResponse({
                     'error': 'Authentication required',
                     'message': 'API токен обязателен для этого эндпоинта'
                 }, status=401)
@@ -150,7 +150,7 @@ def api_token_required(permission_level=None):
             if permission_level:
                 api_token = getattr(request, 'api_token', None)
                 if not api_token or not _check_permission(api_token, permission_level):
-                    return JsonResponse({
+                    return FastJsonResponse({
                         'error': 'Insufficient permissions',
                         'message': f'Требуется уровень доступа: {permission_level}'
                     }, status=403)
@@ -198,7 +198,7 @@ def authenticate_api_token(request):
     """
     auth_header = request.META.get('HTTP_AUTHORIZATION', '')
     if not auth_header:
-        return None, JsonResponse({
+        return None, FastJsonResponse({
             'error': 'Authentication required',
             'message': 'Отсутствует заголовок Authorization'
         }, status=401)
@@ -206,7 +206,7 @@ def authenticate_api_token(request):
     # Извлекаем токен
     parts = auth_header.split()
     if len(parts) != 2 or parts[0].lower() not in ['bearer', 'token']:
-        return None, JsonResponse({
+        return None, FastJsonResponse({
             'error': 'Invalid authentication format',
             'message': 'Используйте формат: Bearer <token>'
         }, status=401)
@@ -226,7 +226,7 @@ def authenticate_api_token(request):
                 # Проверяем IP
                 client_ip = get_client_ip(request)
                 if not api_token.check_ip_access(client_ip):
-                    return None, JsonResponse({
+                    return None, FastJsonResponse({
                         'error': 'Access denied',
                         'message': 'Доступ с вашего IP адреса запрещен'
                     }, status=403)
@@ -235,14 +235,14 @@ def authenticate_api_token(request):
                 api_token.update_last_used()
                 return api_token, None
         
-        return None, JsonResponse({
+        return None, FastJsonResponse({
             'error': 'Invalid token',
             'message': 'Недействительный токен'
         }, status=401)
         
     except Exception as e:
         logger.error(f"Error in authenticate_api_token: {str(e)}")
-        return None, JsonResponse({
+        return None, FastJsonResponse({
             'error': 'Authentication error',
             'message': 'Ошибка при проверке токена'
         }, status=500)
@@ -1,5 +1,6 @@
 import json
-from django.http import JsonResponse
+import os
+from django.http import FileResponse, Http404, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
@@ -11,7 +12,11 @@ from .api_auth import (
     require_admin_access,
     authenticate_api_token
 )
+from . import fastjson, metrics, profiling
+from .fastjson import FastJsonResponse
 from .models import APIToken
+from .pagination import EstimatedCountPagination
+from .replica import ReadReplicaMixin
 from apps.participants.models import PersonProfile
 from apps.groups.models import Group, Session
 from apps.attendance.models import Attendance
@@ -23,7 +28,6 @@ from datetime import timedelta
 from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import BasePermission
 from django.utils.timezone import now
 
@@ -122,14 +126,14 @@ class GroupSerializer(serializers.ModelSerializer):
         ).data
 
 
-class MyGroupsPagination(PageNumberPagination):
+class MyGroupsPagination(EstimatedCountPagination):
     """Пагинация для API групп"""
     page_size = 10
     page_size_query_param = 'per_page'
     max_page_size = 100
 
 
-class MyGroupsViewSet(viewsets.ReadOnlyModelViewSet):
+class MyGroupsViewSet(ReadReplicaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для получения групп участника с посещаемостью
     """
@@ -227,7 +231,8 @@ class MyGroupsViewSet(viewsets.ReadOnlyModelViewSet):
                     'page': int(request.query_params.get('page', 1)),
                     'per_page': int(request.query_params.get('per_page', 10)),
                     'total_pages': paginated_response.data['count'] // int(request.query_params.get('per_page', 10)) + 1,
-                    'total_items': paginated_response.data['count']
+                    'total_items': paginated_response.data['count'],
+                    'count_estimated': paginated_response.data['count_estimated'],
                 },
                 'filter_options': self._get_filter_options(),
                 'participant_info': {
@@ -298,7 +303,7 @@ def api_health_check(request):
     """
     api_token = getattr(request, 'api_token', None)
     
-    return JsonResponse({
+    return FastJsonResponse({
         'status': 'healthy',
         'message': 'API работает корректно',
         'authenticated_service': api_token.name if api_token else None,
@@ -318,7 +323,7 @@ def api_health_check(request):
         
         # Проверяем права администратора
         if api_token.permissions != 'admin':
-            return JsonResponse({
+            return FastJsonResponse({
                 'error': 'Insufficient permissions',
                 'message': 'Требуются права администратора'
             }, status=403)
@@ -329,18 +334,18 @@ def api_health_check(request):
     def post(self, request):
         """Создание нового API токена"""
         try:
-            data = json.loads(request.body)
+            data = fastjson.loads(request.body)
             
             name = data.get('name')
             if not name:
-                return JsonResponse({
+                return FastJsonResponse({
                     'error': 'Missing required field',
                     'message': 'Поле name обязательно'
                 }, status=400)
             
             permissions = data.get('permissions', 'read_only')
             if permissions not in ['read_only', 'read_write', 'admin']:
-                return JsonResponse({
+                return FastJsonResponse({
                     'error': 'Invalid permissions',
                     'message': 'Допустимые значения: read_only, read_write, admin'
                 }, status=400)
@@ -358,7 +363,7 @@ def api_health_check(request):
             
             api_token, token = APIToken.create_token(name, **token_params)
             
-            return JsonResponse({
+            return FastJsonResponse({
                 'success': True,
                 'message': 'Токен успешно создан',
                 'token': {
@@ -371,12 +376,12 @@ def api_health_check(request):
             }, status=201)
             
         except json.JSONDecodeError:
-            return JsonResponse({
+            return FastJsonResponse({
                 'error': 'Invalid JSON',
                 'message': 'Некорректный формат JSON'
             }, status=400)
         except Exception as e:
-            return JsonResponse({
+            return FastJsonResponse({
                 'error': 'Internal server error',
                 'message': str(e)
             }, status=500)
@@ -388,18 +393,47 @@ def api_health_check(request):
             token_name = token.name
             token.delete()
             
-            return JsonResponse({
+            return FastJsonResponse({
                 'success': True,
                 'message': f'Токен {token_name} успешно удален'
             })
             
         except APIToken.DoesNotExist:
-            return JsonResponse({
+            return FastJsonResponse({
                 'error': 'Token not found',
                 'message': f'Токен с ID {token_id} не найден'
             }, status=404)
         except Exception as e:
-            return JsonResponse({
+            return FastJsonResponse({
                 'error': 'Internal server error',
                 'message': str(e)
-            }, status=500) 
\ No newline at end of file
+            }, status=500) 
+
+
+@require_http_methods(["GET"])
+@require_admin_access
+def metrics_view(request):
+    """
+    Метрики Prometheus (apps/core/metrics.py)
+    Требует административный доступ (admin)
+    """
+    body, content_type = metrics.render_metrics()
+    return HttpResponse(body, content_type=content_type)
+
+
+@require_http_methods(["GET"])
+@require_admin_access
+def profile_download_view(request, profile_id, fmt):
+    """
+    Сохраненный профиль запроса (apps/core/profiling.py): отчет .json или cProfile .prof
+    Требует административный доступ (admin)
+    """
+    path = profiling.profile_path(profile_id, fmt)
+    if not path or not os.path.exists(path):
+        raise Http404("Профиль не найден")
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=fmt == "prof",
+        filename=f"{profile_id}.{fmt}",
+        content_type=profiling.FORMATS[fmt],
+    )
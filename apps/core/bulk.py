@@ -0,0 +1,20 @@
+from django.db import connection
+
+
+def raw_delete(queryset):
+    """
+    DELETE ... WHERE pk IN (подзапрос) одним запросом, без сигналов и каскадов.
+
+    QuerySet.delete() при наличии post_delete-получателей выбирает каждую строку
+    и шлет сигнал (сводки, счетчики) — на миллионах отметок это часы. Зависимые
+    строки удаляет вызывающий код (в порядке внешних ключей), счетчики и сводки
+    он же пересчитывает после. Возвращает число удаленных строк.
+    """
+    sql, params = queryset.values("pk").query.sql_with_params()
+    model = queryset.model
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(model._meta.db_table)} WHERE {qn(model._meta.pk.column)} IN ({sql})", params
+        )
+        return cursor.rowcount
@@ -0,0 +1,31 @@
+"""
+Версии для инвалидации записей кэша.
+
+Версия — случайная строка, а не счетчик: если ключ версии вытеснен из кэша
+(Redis maxmemory) или истек, на его месте появляется новая случайная версия,
+которая не совпадет ни с одной ранее сохраненной записью. Счетчик в этом
+случае начинался бы заново с 0 и снова совпадал со старыми записями.
+"""
+import uuid
+
+from django.core.cache import cache
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def get_version(key):
+    """Текущая версия; если ключа нет — создает новую (cache.add, без гонки с соседями)"""
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, None):
+            # Параллельный запрос успел создать версию — используем ее
+            version = cache.get(key) or version
+    return version
+
+
+def bump_version(key):
+    """Новая версия: все записи со старой перестают совпадать"""
+    cache.set(key, _new_version(), None)
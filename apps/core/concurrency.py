@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+# Ограниченный пул потоков для работы с БД из async-представлений.
+# Размер пула задает верхнюю границу одновременных соединений на процесс.
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS,
+    thread_name_prefix="orleuqr-db",
+)
+
+
+def _with_connection_cleanup(func):
+    @wraps(func)
+    def inner(*args, **kwargs):
+        # Потоки пула живут дольше запроса, поэтому сами следим за CONN_MAX_AGE
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return inner
+
+
+def db_sync_to_async(func):
+    """
+    Выполняет синхронный код с ORM в ограниченном пуле потоков.
+    В отличие от sync_to_async(thread_sensitive=True) не сериализует все
+    запросы процесса в одном потоке.
+    """
+    return sync_to_async(_with_connection_cleanup(func), thread_sensitive=False, executor=_db_executor)
@@ -0,0 +1,125 @@
+"""
+Счетчики главной страницы (home_view) в Redis.
+
+Вместо COUNT-запросов на каждый просмотр дашборд читает все значения одним
+cache.get_many(). Счетчики увеличиваются из путей отметки и импорта
+(см. apps/core/signals.py), а задача reconcile_counters периодически сверяет
+их с БД. Отсутствующее значение вычисляется запросом и кладется в кэш,
+поэтому потеря ключа (рестарт Redis, вытеснение) только замедляет один просмотр.
+
+incr() не создает ключ: без базового значения из БД счетчик был бы неверным.
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.core import metrics
+
+from apps.attendance.models import Attendance
+from apps.groups.models import Group, Session
+from apps.participants.models import PersonProfile
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "counters"
+
+
+def _key(name, *parts):
+    return ":".join([KEY_PREFIX, name, *map(str, parts)])
+
+
+def _attendance_for_day(day, **filters):
+    # Диапазон по created вместо created__date, чтобы работал индекс
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = start + timedelta(days=1)
+    return Attendance.objects.filter(created__gte=start, created__lt=end, **filters).count()
+
+
+# Имя счетчика -> функция пересчета из БД (аргументы — части ключа)
+COUNTERS = {
+    "groups_total": lambda: Group.objects.count(),
+    "participants_total": lambda: PersonProfile.objects.filter(role=PersonProfile.Role.PARTICIPANT).count(),
+    "visits_today": lambda day: _attendance_for_day(day),
+    "sessions_today": lambda day: Session.objects.filter(date=day).count(),
+    "trainer_groups": lambda profile_id: Group.objects.filter(trainers=profile_id).count(),
+    "participant_groups": lambda profile_id: Group.objects.filter(participants=profile_id).count(),
+    "participant_visits_today": lambda profile_id, day: _attendance_for_day(day, profile_id=profile_id),
+}
+
+# Глобальные счетчики сверяются задачей reconcile_counters,
+# счетчики профилей просто живут недолго
+GLOBAL_COUNTERS = ("groups_total", "participants_total", "visits_today", "sessions_today")
+PROFILE_COUNTERS = ("trainer_groups", "participant_groups", "participant_visits_today")
+DAILY_COUNTERS = ("visits_today", "sessions_today", "participant_visits_today")
+
+
+def _parts(name, profile_id=None):
+    parts = [profile_id] if name in PROFILE_COUNTERS else []
+    if name in DAILY_COUNTERS:
+        parts.append(timezone.localdate())
+    return parts
+
+
+def _timeout(name):
+    if name in GLOBAL_COUNTERS:
+        return settings.COUNTERS_TTL
+    return settings.COUNTERS_PROFILE_TTL
+
+
+def get_counters(names, profile_id=None):
+    """Значения счетчиков одним get_many; недостающие пересчитываются из БД"""
+    keys = {name: _key(name, *_parts(name, profile_id)) for name in names}
+    try:
+        cached = cache.get_many(list(keys.values()))
+    except Exception as e:
+        logger.warning(f"Counters cache unavailable: {e}")
+        cached = {}
+    metrics.cache_lookup("counters", True, count=len(cached))
+    metrics.cache_lookup("counters", False, count=len(keys) - len(cached))
+
+    values = {}
+    for name, key in keys.items():
+        if key in cached:
+            values[name] = cached[key]
+            continue
+        values[name] = COUNTERS[name](*_parts(name, profile_id))
+        try:
+            cache.set(key, values[name], _timeout(name))
+        except Exception as e:
+            logger.warning(f"Counters cache unavailable: {e}")
+    return values
+
+
+def incr(name, profile_id=None, delta=1):
+    try:
+        cache.incr(_key(name, *_parts(name, profile_id)), delta)
+    except ValueError:
+        # Ключа нет — значение будет вычислено при следующем чтении
+        pass
+    except Exception as e:
+        logger.warning(f"Counters cache unavailable: {e}")
+
+
+def invalidate(name, profile_id=None):
+    try:
+        cache.delete(_key(name, *_parts(name, profile_id)))
+    except Exception as e:
+        logger.warning(f"Counters cache unavailable: {e}")
+
+
+def reconcile():
+    """Пересчитывает глобальные счетчики из БД. Возвращает расхождения {имя: (было, стало)}"""
+    keys = {name: _key(name, *_parts(name)) for name in GLOBAL_COUNTERS}
+    cached = cache.get_many(list(keys.values()))
+
+    fresh = {name: COUNTERS[name](*_parts(name)) for name in GLOBAL_COUNTERS}
+    cache.set_many({keys[name]: value for name, value in fresh.items()}, settings.COUNTERS_TTL)
+
+    return {
+        name: (cached.get(keys[name]), value)
+        for name, value in fresh.items()
+        if cached.get(keys[name]) != value
+    }
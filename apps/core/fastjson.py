@@ -0,0 +1,97 @@
+"""
+Сериализация JSON через orjson.
+
+orjson в несколько раз быстрее json из стандартной библиотеки на больших
+ответах (таблица посещаемости группы, /api/my-groups/) и сам сериализует
+datetime, date, time и UUID. Формат совпадает с DRF JSONRenderer:
+ISO 8601 с микросекундами, UTC как «Z»; ключи-числа становятся строками,
+как в json.dumps. Остальные типы Django/DRF (Decimal, ленивые строки
+перевода, timedelta, QuerySet) — в _default.
+
+Отличия от JsonResponse: кириллица пишется как UTF-8, а не \\uXXXX, и
+datetime не обрезается до миллисекунд.
+
+Подключено:
+- FastJsonResponse вместо django.http.JsonResponse во всех представлениях;
+- ORJSONRenderer и ORJSONParser в REST_FRAMEWORK.
+Сравнение со стандартным json: python manage.py json_benchmark
+"""
+import datetime
+import decimal
+
+import orjson
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.utils.duration import duration_iso_string
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return duration_iso_string(obj)
+    if isinstance(obj, (QuerySet, set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(data, indent=False):
+    """JSON в байтах (UTF-8)"""
+    options = OPTIONS | orjson.OPT_INDENT_2 if indent else OPTIONS
+    return orjson.dumps(data, default=_default, option=options)
+
+
+def loads(data):
+    """Разбор JSON; ошибка — orjson.JSONDecodeError (подкласс json.JSONDecodeError)"""
+    return orjson.loads(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """JsonResponse на orjson: те же аргументы, кроме encoder и json_dumps_params"""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Отступ по запросу клиента: Accept: application/json; indent=2
+        indent = False
+        if accepted_media_type:
+            params = dict(
+                part.strip().split("=", 1) for part in accepted_media_type.split(";")[1:] if "=" in part
+            )
+            indent = "indent" in params
+        return dumps(data, indent=indent)
+
+
+class ORJSONParser(BaseParser):
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -0,0 +1,172 @@
+"""
+Неблокирующее структурированное логирование.
+
+Логгеры пишут только в QueueLogHandler: запись кладется в очередь в памяти,
+а файлы и консоль пишет единственный поток QueueListener процесса. Запрос
+не ждет диска. Поток запускается при первой записи в процессе — после fork
+воркера gunicorn (preload_app) у каждого воркера свой писатель.
+
+Файлы открываются WatchedFileHandler: несколько процессов дописывают один
+файл (O_APPEND), а ротацию делает logrotate — файл переоткрывается, когда
+его переместили. Встроенная ротация (Rotating/TimedRotating) из нескольких
+процессов гоняется за переименованием файла и теряет записи.
+
+Записи в файлах — JSON по строке (JsonFormatter), поля из extra= попадают в
+запись как есть. SamplingFilter пропускает только долю записей ниже WARNING
+для шумных логгеров (LOG_SAMPLING в settings); доля пишется в поле
+sample_rate. Если очередь переполнена, записи отбрасываются, а число
+отброшенных попадает в лог следующим предупреждением.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.utils.module_loading import import_string
+
+# Атрибуты LogRecord, которые не считаются дополнительными полями (extra=)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in data:
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает долю записей ниже WARNING для логгеров из rates
+    ({имя логгера: доля}, действует и на дочерние логгеры).
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def _rate(self, name):
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate is None:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+def _build_target(spec):
+    spec = dict(spec)
+    cls = import_string(spec.pop("class", "logging.handlers.WatchedFileHandler"))
+    level = spec.pop("level", "INFO")
+    logger_name = spec.pop("logger", None)
+    fmt = spec.pop("format", "json")
+    if "filename" in spec:
+        os.makedirs(os.path.dirname(spec["filename"]), exist_ok=True)
+        spec.setdefault("encoding", "utf-8")
+    if cls is logging.StreamHandler and isinstance(spec.get("stream"), str):
+        spec["stream"] = import_string(spec["stream"])
+
+    handler = cls(**spec)
+    handler.setLevel(level)
+    if logger_name:
+        handler.addFilter(logging.Filter(logger_name))
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(fmt, style="{"))
+    return handler
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Очередь записей и один поток-писатель на процесс.
+    targets — описания конечных обработчиков: {"class", "level", "logger",
+    "format" ("json" или строка формата в стиле {}), остальное — аргументы класса}.
+    """
+
+    def __init__(self, targets, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.targets = targets
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # После fork поток родителя в процессе не существует — очередь и писатель свои
+            self.queue = queue.Queue(self.queue.maxsize)
+            handlers = [_build_target(spec) for spec in self.targets]
+            self._listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self._listener.stop)
+
+    def prepare(self, record):
+        # Текст сообщения и трейсбек вычисляются здесь: аргументы и exc_info
+        # могут ссылаться на объекты, которые к моменту записи изменятся
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped:
+            dropped, self.dropped = self.dropped, 0
+            warning = logging.LogRecord(
+                "apps.core.log", logging.WARNING, __file__, 0,
+                f"Log queue overflow: {dropped} records dropped", None, None,
+            )
+            try:
+                self.queue.put_nowait(warning)
+            except queue.Full:
+                self.dropped += dropped
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.groups.models import Session
+from apps.qr.loadtest import percentile
+
+# Пример: python manage.py db_connect_benchmark 42 --iterations 500
+
+
+class Command(BaseCommand):
+    help = "Сравнение запросов сканирования QR с новым соединением к БД и с постоянным (CONN_MAX_AGE/пул)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("session_id", type=int, help="ID сессии, по токену которой идут запросы")
+        parser.add_argument("--iterations", type=int, default=200, help="Сколько раз повторить запросы")
+
+    def handle(self, *args, **options):
+        try:
+            session = Session.objects.select_related("group").get(id=options["session_id"])
+        except Session.DoesNotExist:
+            raise CommandError(f"Сессия {options['session_id']} не найдена")
+
+        profile_id = session.group.participants.values_list("id", flat=True).first()
+        if profile_id is None:
+            raise CommandError("В группе сессии нет участников")
+
+        def scan_queries():
+            # Те же запросы, что выполняет отметка до записи: сессия по токену и членство
+            s = Session.objects.select_related("group").get(qr_token_entry=session.qr_token_entry)
+            s.group.participants.filter(id=profile_id).exists()
+
+        iterations = options["iterations"]
+        results = {}
+        for name, reconnect in (("new connection", True), ("persistent", False)):
+            connection.close()
+            scan_queries()  # прогрев
+            timings = []
+            for _ in range(iterations):
+                if reconnect:
+                    # Как при CONN_MAX_AGE=0: соединение закрывается после каждого запроса
+                    connection.close()
+                started = time.perf_counter()
+                scan_queries()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            results[name] = {
+                "mean": sum(timings) / len(timings),
+                "p95": percentile(timings, 95),
+                "max": timings[-1],
+            }
+
+        self.stdout.write(f"Вендор БД: {connection.vendor}, итераций: {iterations}")
+        self.stdout.write(f"{'режим':<16}{'mean, мс':>12}{'p95, мс':>12}{'max, мс':>12}")
+        for name, row in results.items():
+            self.stdout.write(f"{name:<16}{row['mean']:>12.2f}{row['p95']:>12.2f}{row['max']:>12.2f}")
+
+        overhead = results["new connection"]["mean"] - results["persistent"]["mean"]
+        self.stdout.write(self.style.SUCCESS(f"Накладные расходы на соединение: {overhead:.2f} мс на запрос"))
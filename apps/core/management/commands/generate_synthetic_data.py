@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import synthetic
+
+# Пример: ~2,6 млн отметок для подбора размера БД и проверки индексов
+# python manage.py generate_synthetic_data --groups 20000 --participants 200000
+
+
+class Command(BaseCommand):
+    help = (
+        "Синтетические группы, участники, сессии и история отметок (bulk_create) "
+        "для нагрузочных тестов. Удалить: --purge"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--groups", type=int, default=100, help="Число групп с историей")
+        parser.add_argument("--participants", type=int, default=3000, help="Размер пула участников")
+        parser.add_argument("--group-size", type=int, default=25, help="Средний размер группы (5–60)")
+        parser.add_argument("--history-days", type=int, default=365, help="Глубина истории в днях")
+        parser.add_argument(
+            "--today-group-size",
+            type=int,
+            default=0,
+            help="Дополнительно создать группу с сессией на сегодня (для scan_burst_scenario)",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--skip-summaries",
+            action="store_true",
+            help="Не пересчитывать сводки посещаемости и счетчики (быстрее для очень больших объемов)",
+        )
+        parser.add_argument("--purge", action="store_true", help="Удалить все синтетические данные и выйти")
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            deleted = synthetic.purge()
+            self.stdout.write(self.style.SUCCESS(
+                "Удалено: " + ", ".join(f"{name} {count}" for name, count in deleted.items())
+            ))
+            return
+
+        started = time.perf_counter()
+        totals, today_session_id = synthetic.generate(
+            groups=options["groups"],
+            participants=options["participants"],
+            group_size=options["group_size"],
+            history_days=options["history_days"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            today_group_size=options["today_group_size"],
+            stdout=self.stdout,
+        )
+        if not options["skip_summaries"]:
+            self.stdout.write("Пересчет сводок посещаемости...")
+            synthetic.finalize(batch_size=options["batch_size"])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {elapsed:.1f} с: профилей {totals['profiles']}, групп {totals['groups']}, "
+            f"участий {totals['memberships']}, сессий {totals['sessions']}, отметок {totals['attendance']}"
+        ))
+        if today_session_id:
+            self.stdout.write(f"Сессия на сегодня: {today_session_id} (python manage.py scan_burst_scenario {today_session_id})")
@@ -0,0 +1,101 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.attendance.models import Attendance
+from apps.groups.models import Group, Session
+from apps.participants.models import BrowserFingerprint, PersonProfile
+
+# Строки плана с полным просмотром таблицы. В SQLite «SCAN» — всегда полный
+# просмотр (таблицы или индекса целиком), поиск по индексу выглядит как «SEARCH».
+SEQ_SCAN_PATTERNS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"\bSCAN (\w+)"),
+}
+
+
+def query_catalogue():
+    """
+    Формы запросов из горячих путей проекта. Значения параметров берутся
+    из существующих строк, чтобы план совпадал с реальным.
+    """
+    profile = PersonProfile.objects.order_by("id").first()
+    session = Session.objects.order_by("id").first()
+    fingerprint = BrowserFingerprint.objects.order_by("id").first()
+
+    profile_id = profile.id if profile else 1
+    group_id = session.group_id if session else 1
+    session_id = session.id if session else 1
+    qr_token = session.qr_token_entry if session else "00000000-0000-0000-0000-000000000000"
+    fp_hash = fingerprint.fingerprint_hash if fingerprint else "0" * 64
+
+    today = timezone.localdate()
+    day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+
+    return [
+        ("qr: сессия по токену", Session.objects.filter(qr_token_entry=qr_token)),
+        ("qr: членство в группе", Group.participants.through.objects.filter(group_id=group_id, personprofile_id=profile_id)),
+        ("qr: отметка участника в сессии", Attendance.objects.filter(session_id=session_id, profile_id=profile_id)),
+        (
+            "qr: другие владельцы отпечатка",
+            BrowserFingerprint.objects.filter(fingerprint_hash=fp_hash).exclude(profile_id=profile_id).values("profile_id"),
+        ),
+        (
+            "groups: отметки участника по группам",
+            Attendance.objects.filter(profile_id=profile_id, session__group__in=Group.objects.filter(participants=profile_id)),
+        ),
+        ("groups: группы тренера", Group.objects.filter(trainers=profile_id, end_date__gte=today)),
+        ("groups: отметки группы", Attendance.objects.filter(session__group_id=group_id)),
+        ("home: отметки за день", Attendance.objects.filter(created__gte=day_start, created__lt=day_end)),
+        (
+            "home: отметки участника за день",
+            Attendance.objects.filter(profile_id=profile_id, created__gte=day_start, created__lt=day_end),
+        ),
+        ("home: сессии за день", Session.objects.filter(date=today)),
+    ]
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN для каталога реальных запросов проекта: отчет о полных просмотрах таблиц"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verbose", action="store_true", help="Печатать полный план каждого запроса")
+        parser.add_argument(
+            "--no-seqscan",
+            action="store_true",
+            help="Postgres: SET enable_seqscan = off — проверить, что индекс есть, даже на маленьких таблицах",
+        )
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.stderr.write(self.style.WARNING(f"Разбор планов для {connection.vendor} не поддерживается"))
+
+        problems = 0
+        with transaction.atomic():
+            if options["no_seqscan"] and connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for name, queryset in query_catalogue():
+                plan = queryset.explain()
+                scans = sorted(set(pattern.findall(plan))) if pattern else []
+
+                if scans:
+                    problems += 1
+                    self.stdout.write(self.style.ERROR(f"SEQ SCAN  {name}: {', '.join(scans)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK        {name}"))
+
+                if options["verbose"] or scans:
+                    for line in plan.splitlines():
+                        self.stdout.write(f"          {line}")
+
+        if problems:
+            self.stdout.write(self.style.WARNING(f"Запросов с полным просмотром таблиц: {problems}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Все запросы используют индексы"))
@@ -0,0 +1,115 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from apps.attendance.summary import group_summary
+from apps.core import fastjson
+from apps.core.api_views import GroupSerializer
+from apps.groups.models import Group
+from apps.groups.services import attendance_matrix
+from apps.participants.models import PersonProfile
+
+# Пример: python manage.py json_benchmark --iterations 100
+# Данные для больших ответов: python manage.py generate_synthetic_data
+
+
+def _timed(func, iterations):
+    func()  # прогрев
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def _django_dumps(data):
+    # Как django.http.JsonResponse
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнение сериализации самых больших JSON-ответов: стандартный json "
+        "(JsonResponse, DRF JSONRenderer) против orjson (apps/core/fastjson.py)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", help="Код группы (по умолчанию самая большая: участники × сессии)")
+        parser.add_argument("--iterations", type=int, default=50)
+
+    def _payloads(self, group_code):
+        groups = Group.objects.all()
+        if group_code:
+            group = groups.filter(code=group_code).first()
+            if group is None:
+                raise CommandError(f"Группа {group_code} не найдена")
+        else:
+            group = (
+                groups
+                .annotate(
+                    participants_count=Count("participants", distinct=True),
+                    sessions_count=Count("sessions", distinct=True),
+                )
+                .order_by("-participants_count", "-sessions_count")
+                .first()
+            )
+        if group is None:
+            raise CommandError("В базе нет групп")
+
+        group = Group.objects.prefetch_related("sessions", "participants").get(id=group.id)
+        payloads = [
+            ("attendance_json", {"data": attendance_matrix(group)}, _django_dumps),
+            ("attendance_summary", group_summary(group), _django_dumps),
+        ]
+
+        participant = (
+            PersonProfile.objects
+            .filter(role=PersonProfile.Role.PARTICIPANT)
+            .annotate(groups_count=Count("groups"))
+            .order_by("-groups_count")
+            .first()
+        )
+        if participant is not None:
+            # Тот же набор, что отдает MyGroupsViewSet (без фильтра по дате окончания)
+            my_groups = (
+                Group.objects.filter(participants=participant)
+                .prefetch_related(
+                    "sessions",
+                    "sessions__attendances",
+                    "sessions__attendances__profile",
+                    "sessions__attendances__marked_entry_by_trainer",
+                    "sessions__attendances__marked_exit_by_trainer",
+                )
+                .order_by("start_date")
+            )
+            data = GroupSerializer(my_groups, many=True, context={"participant": participant}).data
+            payloads.append(("my_groups", {"count": len(data), "results": data}, JSONRenderer().render))
+        return group, payloads
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        group, payloads = self._payloads(options["group"])
+        self.stdout.write(f"Группа {group.code}, итераций: {iterations}")
+        self.stdout.write(
+            f"{'ответ':<20}{'КБ':>8}{'json, мс':>11}{'orjson, мс':>12}{'x':>6}"
+            f"{'loads, мс':>11}{'orjson, мс':>12}{'x':>6}"
+        )
+
+        for name, data, stdlib_dumps in payloads:
+            standard = stdlib_dumps(data)
+            fast = fastjson.dumps(data)
+            if json.loads(standard) != fastjson.loads(fast):
+                raise CommandError(f"{name}: результат orjson отличается от стандартного json")
+
+            dumps_std = _timed(lambda: stdlib_dumps(data), iterations)
+            dumps_fast = _timed(lambda: fastjson.dumps(data), iterations)
+            loads_std = _timed(lambda: json.loads(standard), iterations)
+            loads_fast = _timed(lambda: fastjson.loads(fast), iterations)
+            self.stdout.write(
+                f"{name:<20}{len(fast) / 1024:>8.1f}{dumps_std:>11.3f}{dumps_fast:>12.3f}"
+                f"{dumps_std / dumps_fast if dumps_fast else 0:>6.1f}"
+                f"{loads_std:>11.3f}{loads_fast:>12.3f}{loads_std / loads_fast if loads_fast else 0:>6.1f}"
+            )
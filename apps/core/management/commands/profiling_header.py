@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.core import profiling
+
+
+class Command(BaseCommand):
+    help = "Подписанное значение заголовка X-Profile для профилирования запроса (apps/core/profiling.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("label", help="Для кого/зачем — попадет в отчет профиля")
+
+    def handle(self, *args, **options):
+        value = profiling.make_header_value(options["label"])
+        minutes = settings.PROFILING_HEADER_MAX_AGE // 60
+        self.stdout.write(self.style.SUCCESS(f"X-Profile: {value}"))
+        self.stdout.write(f"Действует {minutes} мин. Id профиля вернется в заголовке {profiling.RESPONSE_HEADER}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.core import counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики главной страницы из БД и показывает расхождения"
+
+    def handle(self, *args, **options):
+        drift = counters.reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Счетчики совпадают с БД"))
+            return
+        for name, (cached, actual) in drift.items():
+            self.stdout.write(self.style.WARNING(f"{name}: в кэше {cached}, в БД {actual}"))
+        self.stdout.write(self.style.SUCCESS("Счетчики обновлены"))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.core import search
+
+
+def _index_name(table, column):
+    return f"{table}_{column}_trgm"[:63]
+
+
+class Command(BaseCommand):
+    help = (
+        "GIN-индексы pg_trgm для поиска подстроки (apps/core/search.py): "
+        "по UPPER(поле::text), как в icontains. Создаются CONCURRENTLY, без блокировки записи"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drop", action="store_true", help="Удалить индексы поиска")
+
+    def handle(self, *args, **options):
+        if not search.uses_trigram_indexes():
+            self.stdout.write(self.style.WARNING(
+                "Индексы pg_trgm нужны только на PostgreSQL — на этой СУБД используется n-граммный индекс в процессе"
+            ))
+            return
+
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            if not options["drop"]:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+            for model, fields in search.SPECS.values():
+                table = model._meta.db_table
+                for field in fields:
+                    column = model._meta.get_field(field).column
+                    name = _index_name(table, column)
+                    if options["drop"]:
+                        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {qn(name)}")
+                        self.stdout.write(f"Удален индекс {name}")
+                        continue
+                    cursor.execute(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {qn(name)} "
+                        f"ON {qn(table)} USING gin ((UPPER({qn(column)}::text)) gin_trgm_ops)"
+                    )
+                    self.stdout.write(f"Индекс {name}: {table}.{column}")
+
+            if not options["drop"]:
+                for model, _ in search.SPECS.values():
+                    cursor.execute(f"ANALYZE {qn(model._meta.db_table)}")
+
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,190 @@
+"""
+Метрики Prometheus.
+
+Отдаются на /metrics (только с API-токеном уровня admin). Собираются:
+- длительность запросов по имени URL (MetricsMiddleware);
+- число и суммарное время запросов к БД на запрос по имени URL —
+  через connection.execute_wrapper, без DEBUG и без логирования SQL;
+- попадания/промахи наших кэшей (снимок профиля, доступ к группам, счетчики);
+- исходы сканирования QR (mark_attendance) и конфликты отпечатков;
+- глубина очередей Celery — считается в момент опроса.
+
+Gunicorn запускает несколько воркеров, поэтому метрики пишутся в
+мультипроцессном режиме prometheus_client: каталог задает переменная
+окружения PROMETHEUS_MULTIPROC_DIR (выставляется в gunicorn_config.py до
+импорта Django), при опросе значения всех воркеров суммируются. Воркер
+Celery (отметки из очереди, process_scan_ticket) пишет в тот же каталог
+(см. orleuqr/celery_app.py), поэтому должен работать на том же хосте или
+видеть каталог через общий том; иначе его исходы сканирования в /metrics
+не попадают. Без переменной (runserver, shell) метрики живут в памяти процесса.
+
+В async-представлениях запросы к БД выполняются в пуле потоков
+(db_sync_to_async) и в счетчики запросов к БД не попадают.
+"""
+import logging
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+from kombu.exceptions import ChannelError
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "orleuqr_request_duration_seconds",
+    "Длительность обработки запроса",
+    ["view", "method", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_QUERIES = Counter(
+    "orleuqr_db_queries_total",
+    "Запросы к БД",
+    ["view"],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "orleuqr_db_queries_per_request",
+    "Число запросов к БД на один HTTP-запрос",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "orleuqr_db_time_per_request_seconds",
+    "Суммарное время запросов к БД на один HTTP-запрос",
+    ["view"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+CACHE_LOOKUPS = Counter(
+    "orleuqr_cache_lookups_total",
+    "Чтения из кэша: result=hit|miss",
+    ["cache", "result"],
+)
+SCAN_OUTCOMES = Counter(
+    "orleuqr_scan_outcomes_total",
+    "Исходы сканирования QR",
+    ["mode", "outcome"],
+)
+FINGERPRINT_CONFLICTS = Counter(
+    "orleuqr_fingerprint_conflicts_total",
+    "Отпечаток браузера уже использовался другим профилем",
+    ["kind"],
+)
+
+
+def cache_lookup(cache_name, hit, count=1):
+    CACHE_LOOKUPS.labels(cache_name, "hit" if hit else "miss").inc(count)
+
+
+def scan_outcome(mode, outcome):
+    SCAN_OUTCOMES.labels(mode, outcome).inc()
+
+
+def fingerprint_conflict(kind):
+    FINGERPRINT_CONFLICTS.labels(kind).inc()
+
+
+def _queue_depth(connection, queue):
+    """Сообщений в очереди. Пустую очередь Redis-брокер удаляет, и пассивное
+    объявление отвечает NOT_FOUND — это глубина 0, а не ошибка опроса."""
+    # Отдельный канал на очередь: AMQP закрывает канал после NOT_FOUND
+    with connection.channel() as channel:
+        try:
+            return channel.queue_declare(queue=queue, passive=True).message_count
+        except ChannelError as e:
+            if str(getattr(e, "reply_code", "")) == "404":
+                return 0
+            raise
+
+
+class QueueDepthCollector:
+    """Длина очередей Celery в брокере на момент опроса"""
+
+    def collect(self):
+        gauge = GaugeMetricFamily("orleuqr_celery_queue_depth", "Сообщений в очереди Celery", labels=["queue"])
+        if not settings.CELERY_BROKER_URL:
+            return
+        from kombu import Connection
+
+        try:
+            with Connection(settings.CELERY_BROKER_URL, connect_timeout=2) as connection:
+                for queue in settings.METRICS_CELERY_QUEUES:
+                    gauge.add_metric([queue], _queue_depth(connection, queue))
+        except Exception as e:
+            logger.warning(f"Celery queue depth unavailable: {e}")
+            return
+        yield gauge
+
+
+def render_metrics():
+    """(тело, content-type) для ответа /metrics"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    queues = CollectorRegistry()
+    queues.register(QueueDepthCollector())
+    return generate_latest(registry) + generate_latest(queues), CONTENT_TYPE_LATEST
+
+
+class _QueryCollector:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Время запроса и запросы к БД по имени URL"""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_request(self, request):
+        request._metrics_started = time.perf_counter()
+        request._metrics_queries = _QueryCollector()
+        request._metrics_stack = ExitStack()
+        for connection in connections.all():
+            request._metrics_stack.enter_context(connection.execute_wrapper(request._metrics_queries))
+
+    def process_response(self, request, response):
+        started = getattr(request, "_metrics_started", None)
+        if started is None:
+            return response
+        request._metrics_stack.close()
+
+        match = request.resolver_match
+        # Для нерезолвленных путей (404) метка общая, иначе число рядов неограничено
+        view = match.view_name if match else "<unresolved>"
+        queries = request._metrics_queries
+
+        REQUEST_LATENCY.labels(view, request.method, f"{response.status_code // 100}xx").observe(
+            time.perf_counter() - started
+        )
+        DB_QUERIES.labels(view).inc(queries.count)
+        DB_QUERIES_PER_REQUEST.labels(view).observe(queries.count)
+        DB_TIME_PER_REQUEST.labels(view).observe(queries.duration)
+        return response
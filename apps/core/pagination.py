@@ -0,0 +1,139 @@
+"""
+Пагинация с оценочным количеством строк для больших таблиц.
+
+Точный COUNT(*) на Attendance/TrustLog с миллионами строк обходит всю таблицу.
+На PostgreSQL сначала берется оценка планировщика: reltuples из pg_class для
+запроса без фильтров или «Plan Rows» из EXPLAIN для запроса с фильтрами.
+Если оценка меньше PAGINATION_ESTIMATE_THRESHOLD, считаем точно — на малых
+выборках COUNT дешевый, а оценка планировщика там грубее всего.
+На других СУБД всегда точный COUNT.
+
+EstimatedCountPaginator подключается в админку (ModelAdmin.paginator),
+EstimatedCountPagination — в DRF (pagination_class); ответ DRF содержит
+флаг count_estimated. Оценка может быть занижена, поэтому при оценочном
+количестве страницы за последней не отклоняются заранее: EmptyPage (404 в DRF,
+?e=1 в админке) только если срез действительно пуст.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_count(queryset):
+    """Оценка планировщика PostgreSQL или None, если оценить нельзя"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where and not queryset.query.distinct:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                # -1 — таблица еще ни разу не анализировалась
+                if row and row[0] >= 0:
+                    return row[0]
+                return None
+
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"Count estimate failed for {queryset.model._meta.label}: {e}")
+        return None
+
+
+def smart_count(queryset, threshold=None):
+    """(количество, оценочное ли оно)"""
+    threshold = settings.PAGINATION_ESTIMATE_THRESHOLD if threshold is None else threshold
+    estimate = estimate_count(queryset)
+    if estimate is not None and estimate >= threshold:
+        return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedPage(Page):
+    """Страница, у которой следующая определяется по строкам, а не по оценке"""
+
+    has_more = None
+
+    def has_next(self):
+        if self.has_more is not None:
+            return self.has_more
+        return super().has_next()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который на больших выборках берет оценку вместо COUNT(*)"""
+
+    count_estimated = False
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        count, self.count_estimated = smart_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Номер за последней страницей оценки: строки там могут быть,
+            # пустоту проверит page() по самому срезу
+            number = int(number)
+            if self.count_estimated and number > 1:
+                return number
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_estimated:
+            return super().page(number)
+        # Срез не обрезается по оценке, иначе последняя страница теряет строки;
+        # лишняя строка показывает, есть ли следующая страница
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        page = self._get_page(object_list[:self.per_page], number, self)
+        page.has_more = len(object_list) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs):
+        return EstimatedPage(*args, **kwargs)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """PageNumberPagination с EstimatedCountPaginator и флагом count_estimated в ответе"""
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        return Response({
+            "count": self.page.paginator.count,
+            "count_estimated": self.page.paginator.count_estimated,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_estimated"] = {"type": "boolean", "example": False}
+        return response_schema
@@ -0,0 +1,247 @@
+"""
+Профилирование отдельного запроса в продакшене.
+
+Запрос профилируется, только если в нем есть заголовок X-Profile и он
+разрешен одним из способов:
+- X-Profile: 1 вместе с API-токеном уровня admin в Authorization
+  (токен проверяет APITokenMiddleware);
+- X-Profile: <подписанное значение> — выдает команда
+  python manage.py profiling_header, действует PROFILING_HEADER_MAX_AGE секунд.
+  Так можно профилировать страницу в браузере тренера (через расширение,
+  добавляющее заголовок), не передавая ему API-токен.
+
+Без заголовка middleware делает одну проверку словаря META и ничего не
+включает — накладных расходов нет.
+
+Для профилируемого запроса собираются:
+- профиль cProfile (файл .prof для snakeviz/pstats и топ функций в отчете);
+- SQL-запросы с временем, без параметров (в них персональные данные),
+  и повторы — одинаковый SQL несколько раз за запрос (типичный N+1);
+- время рендеринга шаблонов (накопленное время Template.render по профилю).
+
+Результат пишется в PROFILING_ROOT/<id>.json и <id>.prof, id возвращается
+в заголовке ответа X-Profile-Id. Скачать: /api/profiles/<id>.json|.prof
+(API-токен admin). Хранится не больше PROFILING_MAX_FILES последних профилей.
+
+В процессе одновременно профилируется только один запрос: с Python 3.12
+cProfile построен на sys.monitoring — это один инструмент на весь
+интерпретатор, второй enable() падает. Если профилировщик занят, запрос
+выполняется без профиля, а в ответе стоит X-Profile-Skipped: busy.
+По той же причине на 3.12+ профиль охватывает весь процесс: в него попадают
+и функции других потоков воркера, выполнявшихся в это время. SQL и время
+шаблонов считаются только для профилируемого запроса.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.template.base import Template
+from django.utils import timezone
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger(__name__)
+
+HEADER = "HTTP_X_PROFILE"
+RESPONSE_HEADER = "X-Profile-Id"
+SKIPPED_HEADER = "X-Profile-Skipped"
+SALT = "apps.core.profiling"
+FORMATS = {"json": "application/json", "prof": "application/octet-stream"}
+TOP_FUNCTIONS = 40
+
+# Один профилируемый запрос на процесс (см. docstring модуля)
+_profiling_lock = threading.Lock()
+
+
+def make_header_value(label):
+    """Подписанное значение заголовка X-Profile"""
+    return signing.TimestampSigner(salt=SALT).sign(label)
+
+
+def _header_allowed(request):
+    value = request.META[HEADER]
+    api_token = getattr(request, "api_token", None)
+    if value == "1":
+        return api_token is not None and api_token.permissions == "admin"
+    try:
+        label = signing.TimestampSigner(salt=SALT).unsign(value, max_age=settings.PROFILING_HEADER_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    request._profiling_label = label
+    return True
+
+
+def profile_path(profile_id, fmt):
+    # id генерируем сами (uuid4 hex), но из URL приходит строка — не даем выйти из каталога
+    if fmt not in FORMATS or not profile_id.isalnum():
+        return None
+    return os.path.join(settings.PROFILING_ROOT, f"{profile_id}.{fmt}")
+
+
+class _QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "alias": context["connection"].alias,
+                "sql": sql,
+                "many": many,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+    def report(self):
+        by_sql = defaultdict(list)
+        for query in self.queries:
+            by_sql[query["sql"]].append(query["ms"])
+        duplicates = sorted(
+            (
+                {"sql": sql, "count": len(timings), "total_ms": round(sum(timings), 3)}
+                for sql, timings in by_sql.items() if len(timings) > 1
+            ),
+            key=lambda item: item["count"],
+            reverse=True,
+        )
+        return {
+            "count": len(self.queries),
+            "total_ms": round(sum(query["ms"] for query in self.queries), 3),
+            "duplicates": duplicates,
+            "queries": self.queries,
+        }
+
+
+def _template_ms(stats):
+    # Накопленное время учитывает вложенные include без двойного счета
+    code = Template.render.__code__
+    entry = stats.stats.get((code.co_filename, code.co_firstlineno, code.co_name))
+    return round(entry[3] * 1000, 3) if entry else 0.0
+
+
+def _top_functions(stats):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def _prune():
+    files = sorted(
+        (entry for entry in os.scandir(settings.PROFILING_ROOT) if entry.name.endswith(".json")),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in files[:max(0, len(files) - settings.PROFILING_MAX_FILES)]:
+        for fmt in FORMATS:
+            path = profile_path(entry.name[:-len(".json")], fmt)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+def _save(request, response, profiler, recorder, duration):
+    profile_id = uuid.uuid4().hex
+    os.makedirs(settings.PROFILING_ROOT, exist_ok=True)
+
+    profiler.dump_stats(profile_path(profile_id, "prof"))
+    stats = pstats.Stats(profiler)
+    match = request.resolver_match
+    report = {
+        "id": profile_id,
+        "label": getattr(request, "_profiling_label", None)
+                 or getattr(getattr(request, "api_token", None), "name", None),
+        "created_at": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else None,
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "template_ms": _template_ms(stats),
+        "sql": recorder.report(),
+        "functions": _top_functions(stats),
+    }
+    with open(profile_path(profile_id, "json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+    _prune()
+    logger.info(
+        f"Profiled {request.method} {request.path}: {report['duration_ms']} ms, "
+        f"{report['sql']['count']} queries, id={profile_id}"
+    )
+    return profile_id
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """cProfile, SQL и шаблоны для одного запроса по заголовку X-Profile"""
+
+    def process_request(self, request):
+        if HEADER not in request.META or not _header_allowed(request):
+            return None
+        if not _profiling_lock.acquire(blocking=False):
+            request._profiling_skipped = True
+            return None
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Профилировщик уже включен чем-то другим (sys.setprofile/sys.monitoring)
+            _profiling_lock.release()
+            logger.warning(f"Profiling unavailable for {request.path}: {e}")
+            request._profiling_skipped = True
+            return None
+
+        # Обертки SQL подключаются только после успешного enable(): иначе их
+        # некому снять, и они копят запросы соединения этого потока
+        stack = ExitStack()
+        recorder = _QueryRecorder()
+        try:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+        except BaseException:
+            profiler.disable()
+            stack.close()
+            _profiling_lock.release()
+            raise
+        request._profiling = (stack, recorder, profiler, time.perf_counter())
+        return None
+
+    def process_response(self, request, response):
+        if getattr(request, "_profiling_skipped", False):
+            response[SKIPPED_HEADER] = "busy"
+            return response
+        state = getattr(request, "_profiling", None)
+        if state is None:
+            return response
+
+        stack, recorder, profiler, started = state
+        try:
+            profiler.disable()
+            duration = time.perf_counter() - started
+            stack.close()
+        finally:
+            del request._profiling
+            _profiling_lock.release()
+
+        try:
+            response[RESPONSE_HEADER] = _save(request, response, profiler, recorder, duration)
+        except Exception as e:
+            # Профилирование не должно ломать сам запрос
+            logger.warning(f"Failed to store profile for {request.path}: {e}")
+        return response
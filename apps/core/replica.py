@@ -0,0 +1,112 @@
+"""
+Чтение с реплики БД.
+
+Отчеты и списки (таблица посещаемости тренера, API групп, списки в админке)
+читают с реплики, чтобы в пик сканирований не конкурировать с записью отметок
+на основной БД. Реплика включается только явно — декоратором/контекстом
+read_replica(), ReadReplicaMixin для DRF или ReplicaChangeListMixin для админки;
+все остальное, как и раньше, работает с default.
+
+Запросы, которые только что писали (POST/PUT/PATCH/DELETE), и следующие за ними
+в течение REPLICA_PIN_SECONDS запросы того же клиента читают с основной БД,
+чтобы пользователь увидел свои изменения несмотря на задержку репликации.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_primary_pin"
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+_use_replica = ContextVar("use_replica", default=False)
+_pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.databases
+
+
+class ReplicaRouter:
+    """Читает с реплики внутри read_replica(), пишет всегда в default"""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _pinned_to_primary.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплики приходит с основной БД через репликацию
+        return db != REPLICA_ALIAS
+
+
+@contextmanager
+def read_replica():
+    """Контекст и декоратор: чтения внутри идут на реплику (если она настроена)"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaMixin:
+    """Для DRF ViewSet: GET/HEAD-запросы читают с реплики"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        with read_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            # Ответ рендерится здесь же, пока действует контекст реплики
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+            return response
+
+
+def is_changelist(request):
+    """Запрос к списку объектов админки (а не к форме, удалению или автодополнению)"""
+    match = request.resolver_match
+    return bool(match and match.url_name and match.url_name.endswith("_changelist"))
+
+
+class ReplicaChangeListMixin:
+    """Для ModelAdmin: список объектов (GET) читается с реплики, действия — с default"""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with read_replica():
+            response = super().changelist_view(request, extra_context)
+            # QuerySet списка вычисляется при рендеринге шаблона
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+            return response
+
+
+class PrimaryPinMiddleware(MiddlewareMixin):
+    """Закрепляет за основной БД пишущие запросы и запросы сразу после них"""
+
+    def process_request(self, request):
+        # Значение задается заново каждым запросом, поэтому не сбрасывается
+        _pinned_to_primary.set(request.method in UNSAFE_METHODS or PIN_COOKIE in request.COOKIES)
+
+    def process_response(self, request, response):
+        if request.method in UNSAFE_METHODS and response.status_code < 400 and replica_configured():
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,160 @@
+"""
+Поиск подстроки по профилям и группам.
+
+search(kind, query, queryset) — единая точка для админки, автодополнения
+участников и API. Поля, по которым ищем, описаны в SPECS.
+
+PostgreSQL: обычный icontains (UPPER(col::text) LIKE UPPER('%q%')), который
+обслуживают GIN-индексы pg_trgm по тем же выражениям. Индексы создает
+python manage.py setup_search_indexes (миграции не трогаем — CONCURRENTLY).
+
+Другие СУБД (SQLite в разработке): в процессе строится n-граммный индекс
+{триграмма: множество id}. Кандидаты — пересечение множеств триграмм
+запроса, затем точная проверка вхождения подстроки. Индекс помечен версией
+из кэша; версия увеличивается при сохранении/удалении профиля или группы
+(apps/core/signals.py), и индекс перестраивается при следующем поиске.
+
+Поиск по связанным моделям (например, отметки по ФИО участника) — через
+search_ids(): сначала id найденных профилей/групп (не больше
+SEARCH_MAX_RELATED_IDS), затем фильтр по внешнему ключу вместо ILIKE по JOIN.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+
+from apps.groups.models import Group
+from apps.participants.models import PersonProfile
+
+logger = logging.getLogger(__name__)
+
+SPECS = {
+    "profile": (PersonProfile, ("full_name", "iin", "email")),
+    "group": (Group, ("code", "course_name", "supervisor_name", "supervisor_iin")),
+}
+NGRAM = 3
+VERSION_KEY = "search:version:{kind}"
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_version(kind):
+    return cache.get(VERSION_KEY.format(kind=kind), 0)
+
+
+def bump_version(kind):
+    key = VERSION_KEY.format(kind=kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def uses_trigram_indexes(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def _normalize(query):
+    return " ".join(str(query).split()).casefold()
+
+
+def _build_index(kind):
+    model, fields = SPECS[kind]
+    texts = {}
+    postings = defaultdict(set)
+    for pk, *values in model.objects.values_list("pk", *fields).iterator():
+        # Разделитель не дает совпасть подстроке на стыке двух полей
+        text = "\n".join(str(value) for value in values if value).casefold()
+        texts[pk] = text
+        for gram in _ngrams(text):
+            postings[gram].add(pk)
+    logger.info(f"Search index '{kind}' rebuilt: {len(texts)} rows, {len(postings)} n-grams")
+    return texts, postings
+
+
+def _local_index(kind):
+    version = get_version(kind)
+    entry = _indexes.get(kind)
+    if entry is None or entry[0] != version:
+        with _lock:
+            entry = _indexes.get(kind)
+            if entry is None or entry[0] != version:
+                entry = (version, *_build_index(kind))
+                _indexes[kind] = entry
+    return entry[1], entry[2]
+
+
+def _local_ids(kind, query):
+    texts, postings = _local_index(kind)
+    grams = _ngrams(query)
+    if not grams:
+        # Запрос короче n-граммы — проверяем все строки
+        return [pk for pk, text in texts.items() if query in text]
+
+    # Начинаем с самой редкой триграммы, чтобы пересечения были короткими
+    ordered = sorted((postings.get(gram, set()) for gram in grams), key=len)
+    candidates = set(ordered[0])
+    for posting in ordered[1:]:
+        if not candidates:
+            break
+        candidates &= posting
+    return [pk for pk in candidates if query in texts[pk]]
+
+
+def search_condition(kind, query, using="default"):
+    """Q для модели kind: вхождение query в любое из полей SPECS"""
+    _, fields = SPECS[kind]
+    query = _normalize(query)
+    if not query:
+        return Q()
+
+    if uses_trigram_indexes(using):
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": query})
+        return condition
+
+    return Q(pk__in=_local_ids(kind, query))
+
+
+def search(kind, query, queryset=None):
+    """QuerySet модели kind, отфильтрованный по вхождению query в поля из SPECS"""
+    model, _ = SPECS[kind]
+    queryset = model.objects.all() if queryset is None else queryset
+    return queryset.filter(search_condition(kind, query, queryset.db))
+
+
+def search_ids(kind, query, limit=None):
+    """id найденных объектов — для фильтра по внешнему ключу в других моделях"""
+    limit = settings.SEARCH_MAX_RELATED_IDS if limit is None else limit
+    return list(search(kind, query).order_by().values_list("pk", flat=True)[:limit])
+
+
+class IndexedSearchAdminMixin:
+    """
+    Поиск в админке через search().
+    search_index: {путь к модели: kind}; пустой путь — сама модель админки.
+    Например, {"profile": "profile", "session__group": "group"} для отметок.
+    """
+    search_index = {}
+
+    def get_search_results(self, request, queryset, search_term):
+        if not self.search_index or not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+
+        condition = Q()
+        for path, kind in self.search_index.items():
+            if not path:
+                condition |= search_condition(kind, search_term, queryset.db)
+            else:
+                condition |= Q(**{f"{path}_id__in": search_ids(kind, search_term)})
+        return queryset.filter(condition), False
@@ -0,0 +1,114 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.timezone import localdate, localtime
+
+from apps.attendance.models import Attendance
+from apps.attendance.signals import attendance_marked, attendance_marked_bulk
+from apps.core import counters, search
+from apps.groups.models import Group, Session
+from apps.participants.models import PersonProfile
+
+
+def _is_today(value):
+    # Session.date может прийти строкой (импорт передает "YYYY-MM-DD")
+    return str(value) == str(localdate())
+
+
+@receiver(attendance_marked)
+def count_attendance(sender, attendance, created, **kwargs):
+    if created:
+        counters.incr("visits_today")
+        counters.incr("participant_visits_today", profile_id=attendance.profile_id)
+
+
+@receiver(attendance_marked_bulk)
+def count_attendance_bulk(sender, marks, **kwargs):
+    created = [attendance for attendance, mode, is_created in marks if is_created]
+    if created:
+        counters.incr("visits_today", delta=len(created))
+    for attendance in created:
+        counters.incr("participant_visits_today", profile_id=attendance.profile_id)
+
+
+@receiver(post_delete, sender=Attendance)
+def uncount_attendance(sender, instance, **kwargs):
+    if instance.created and localtime(instance.created).date() == localdate():
+        counters.incr("visits_today", delta=-1)
+        counters.incr("participant_visits_today", profile_id=instance.profile_id, delta=-1)
+
+
+@receiver(post_save, sender=Group)
+def count_group(sender, instance, created, **kwargs):
+    if created:
+        counters.incr("groups_total")
+
+
+@receiver(post_delete, sender=Group)
+def uncount_group(sender, instance, **kwargs):
+    counters.incr("groups_total", delta=-1)
+
+
+@receiver(post_save, sender=PersonProfile)
+def count_profile(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        if instance.role == PersonProfile.Role.PARTICIPANT:
+            counters.incr("participants_total")
+    elif update_fields is None or "role" in update_fields:
+        # Роль могла измениться — пересчитаем при следующем чтении
+        counters.invalidate("participants_total")
+
+
+@receiver(post_delete, sender=PersonProfile)
+def uncount_profile(sender, instance, **kwargs):
+    if instance.role == PersonProfile.Role.PARTICIPANT:
+        counters.incr("participants_total", delta=-1)
+
+
+@receiver(post_save, sender=Session)
+def count_session(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        if _is_today(instance.date):
+            counters.incr("sessions_today")
+    elif update_fields is None or "date" in update_fields:
+        # Дата могла измениться (в том числе с сегодняшней)
+        counters.invalidate("sessions_today")
+
+
+@receiver(post_delete, sender=Session)
+def uncount_session(sender, instance, **kwargs):
+    if _is_today(instance.date):
+        counters.incr("sessions_today", delta=-1)
+
+
+def _invalidate_memberships(counter, relation, instance, action, reverse, pk_set):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # instance — профиль (profile.groups.add(...))
+        profile_ids = [instance.pk]
+    elif action == "pre_clear":
+        profile_ids = list(getattr(instance, relation).values_list("id", flat=True))
+    else:
+        profile_ids = pk_set or []
+    for profile_id in profile_ids:
+        counters.invalidate(counter, profile_id=profile_id)
+
+
+@receiver(m2m_changed, sender=Group.trainers.through)
+def trainers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _invalidate_memberships("trainer_groups", "trainers", instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Group.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _invalidate_memberships("participant_groups", "participants", instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=PersonProfile)
+@receiver(post_delete, sender=PersonProfile)
+def reindex_search(sender, instance, using, **kwargs):
+    # На PostgreSQL ищут индексы pg_trgm, локальный n-граммный индекс не нужен
+    if not search.uses_trigram_indexes(using):
+        search.bump_version("group" if sender is Group else "profile")
@@ -0,0 +1,252 @@
+"""
+Синтетические данные для нагрузочного тестирования и подбора железа.
+
+Генератор воспроизводим (random.Random(seed)) и пишет пачками bulk_create,
+без сигналов и генерации QR-файлов. Распределения приближены к реальным:
+- размер группы — нормальное вокруг group_size, от 5 до 60 человек;
+- участник может состоять в нескольких группах (пул меньше суммы мест);
+- курс — 3–10 сессий подряд по будням, даты начала равномерно за history_days;
+- у каждого участника своя «дисциплинированность» Beta(8, 2): доля посещенных сессий;
+- приход — 9:00 плюс гамма-распределение (в среднем ~8 минут, длинный хвост
+  опозданий), 5% приходят до начала окна; уход — после 17:00 у групп с track_exit;
+- у каждого участника один отпечаток браузера, у 3% отметок пониженное доверие.
+
+Объем: отметок ≈ groups × group_size × 6.5 × 0.8. Например, --groups 20000
+при group_size 25 дает ~2,6 млн отметок.
+
+Синтетические объекты помечены: коды групп начинаются с PREFIX, email
+профилей — на домене EMAIL_DOMAIN; purge() удаляет только их.
+Сигналы при генерации и удалении не вызываются — сводки, счетчики и версии
+поиска пересчитываются отдельно (finalize, конец purge).
+"""
+import hashlib
+import logging
+import random
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.attendance.models import Attendance, AttendanceSummary, ParticipantSummary, TrustLog
+from apps.attendance.summary import rebuild_groups_bulk
+from apps.core import counters, search
+from apps.core.bulk import raw_delete
+from apps.groups.models import Group, Session
+from apps.participants.models import BrowserFingerprint, PersonProfile
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "SYN"
+EMAIL_DOMAIN = "synthetic.invalid"
+# Диапазоны, не пересекающиеся с реальными данными
+IIN_BASE = 990000000000
+EXTERNAL_ID_BASE = 900000000
+
+SURNAMES = ["Ахметов", "Беков", "Жумабаев", "Иванов", "Касымов", "Нурланов", "Омаров", "Сейтказин", "Тлеубаев", "Ержанов"]
+NAMES = ["Айгерим", "Асель", "Данияр", "Ерлан", "Жанар", "Мадина", "Нуржан", "Сауле", "Тимур", "Алия"]
+COURSES = [
+    "Цифровая грамотность педагога",
+    "Исследовательская деятельность учащихся",
+    "Инклюзивное образование",
+    "Критериальное оценивание",
+    "Обновленное содержание образования",
+]
+
+
+def _fingerprint(iin):
+    return hashlib.sha256(f"synthetic-{iin}".encode()).hexdigest()
+
+
+def _aware(day, clock, minutes):
+    return timezone.make_aware(datetime.combine(day, clock) + timedelta(minutes=minutes))
+
+
+def _status(offset, window_minutes=60):
+    if offset < 0:
+        return Attendance.TimeStatus.TOO_EARLY
+    if offset > window_minutes:
+        return Attendance.TimeStatus.TOO_LATE
+    return Attendance.TimeStatus.ON_TIME
+
+
+def _workdays(start, count):
+    days, day = [], start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _create_profiles(rng, count, offset, role, batch_size):
+    profiles = []
+    for index in range(offset, offset + count):
+        iin = str(IIN_BASE + index)
+        profiles.append(PersonProfile(
+            iin=iin,
+            full_name=f"{rng.choice(SURNAMES)} {rng.choice(NAMES)} {index}",
+            email=f"user{index}@{EMAIL_DOMAIN}",
+            role=role,
+        ))
+    PersonProfile.objects.bulk_create(profiles, batch_size=batch_size)
+    # id перечитываются диапазоном ИИН: не каждая СУБД возвращает их из bulk_create,
+    # а IN со списком на сотни тысяч значений упирается в лимит параметров
+    return list(
+        PersonProfile.objects
+        .filter(iin__gte=str(IIN_BASE + offset), iin__lt=str(IIN_BASE + offset + count))
+        .order_by("iin")
+    )
+
+
+def generate(groups=100, participants=3000, group_size=25, history_days=365, seed=1,
+             batch_size=5000, today_group_size=0, stdout=None):
+    """
+    Создает groups групп с сессиями и историей отметок. Если today_group_size > 0,
+    дополнительно создается группа на сегодня без отметок (для сценария утреннего
+    наплыва). Возвращает сводку {модель: количество} и id сегодняшней сессии.
+    """
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    existing = PersonProfile.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").count()
+    group_offset = Group.objects.filter(code__startswith=PREFIX).count()
+
+    def log(message):
+        if stdout:
+            stdout.write(message)
+        else:
+            logger.info(message)
+
+    pool = _create_profiles(rng, participants, existing, PersonProfile.Role.PARTICIPANT, batch_size)
+    trainers = _create_profiles(
+        rng, max(1, groups // 5), existing + participants, PersonProfile.Role.TRAINER, batch_size
+    )
+    BrowserFingerprint.objects.bulk_create([
+        BrowserFingerprint(profile=p, fingerprint_hash=_fingerprint(p.iin), user_agent="synthetic", trust_score=100)
+        for p in pool
+    ], batch_size=batch_size)
+    log(f"Профили: участников {len(pool)}, тренеров {len(trainers)}")
+
+    reliability = {p.id: rng.betavariate(8, 2) for p in pool}
+    totals = {"groups": 0, "sessions": 0, "memberships": 0, "attendance": 0}
+    attendance_batch = []
+
+    def flush():
+        Attendance.objects.bulk_create(attendance_batch, batch_size=batch_size)
+        totals["attendance"] += len(attendance_batch)
+        attendance_batch.clear()
+
+    specs = []
+    for index in range(groups):
+        start = today - timedelta(days=rng.randint(7, max(8, history_days)))
+        days = _workdays(start, rng.randint(3, 10))
+        size = min(60, max(5, int(rng.normalvariate(group_size, group_size / 4))))
+        specs.append((index, days, size))
+    if today_group_size:
+        specs.append((groups, [today], today_group_size))
+
+    for index, days, size in specs:
+        number = group_offset + index
+        with transaction.atomic():
+            group = Group.objects.create(
+                external_id=EXTERNAL_ID_BASE + number,
+                code=f"{PREFIX}{number:07d}",
+                course_name=rng.choice(COURSES),
+                supervisor_name="Синтетический тренер",
+                supervisor_iin=trainers[index % len(trainers)].iin,
+                start_date=days[0],
+                end_date=days[-1],
+                track_exit=rng.random() < 0.7,
+            )
+            members = rng.sample(pool, min(size, len(pool)))
+            Group.participants.through.objects.bulk_create([
+                Group.participants.through(group_id=group.id, personprofile_id=p.id) for p in members
+            ])
+            Group.trainers.through.objects.create(group_id=group.id, personprofile_id=trainers[index % len(trainers)].id)
+            Session.objects.bulk_create([Session(group=group, date=day) for day in days])
+            sessions = list(Session.objects.filter(group=group).order_by("date"))
+
+        totals["groups"] += 1
+        totals["sessions"] += len(sessions)
+        totals["memberships"] += len(members)
+
+        for session in sessions:
+            if session.date >= today:
+                continue
+            for profile in members:
+                if rng.random() > reliability[profile.id]:
+                    continue
+                early = rng.random() < 0.05
+                offset = -rng.uniform(1, 10) if early else rng.gammavariate(2, 4)
+                arrived_at = _aware(session.date, time(9, 0), offset)
+                left_at = left_status = None
+                if group.track_exit and rng.random() < 0.9:
+                    left_offset = rng.gammavariate(2, 5)
+                    left_at = _aware(session.date, time(17, 0), left_offset)
+                    left_status = _status(left_offset)
+                suspicious = rng.random() < 0.03
+                attendance_batch.append(Attendance(
+                    session=session,
+                    profile=profile,
+                    arrived_at=arrived_at,
+                    arrived_status=_status(offset),
+                    left_at=left_at,
+                    left_status=left_status or Attendance.TimeStatus.UNKNOWN,
+                    fingerprint_hash=_fingerprint(profile.iin),
+                    trust_level=Attendance.TrustLevel.SUSPICIOUS if suspicious else Attendance.TrustLevel.TRUSTED,
+                    trust_score=rng.randint(50, 79) if suspicious else 100,
+                    created=arrived_at,
+                    modified=left_at or arrived_at,
+                ))
+            if len(attendance_batch) >= batch_size:
+                flush()
+
+        if (index + 1) % 500 == 0:
+            log(f"Групп: {index + 1}/{len(specs)}, отметок: {totals['attendance'] + len(attendance_batch)}")
+
+    if attendance_batch:
+        flush()
+    totals["profiles"] = len(pool) + len(trainers)
+    return totals, (sessions[0].id if today_group_size else None)
+
+
+def finalize(batch_size=5000):
+    """Сводки и счетчики после массовой вставки (bulk_create сигналы не вызывает)"""
+    rebuild_groups_bulk(Group.objects.filter(code__startswith=PREFIX), batch_size=batch_size)
+    counters.reconcile()
+    search.bump_version("profile")
+    search.bump_version("group")
+
+
+def purge():
+    """
+    Удаляет только синтетические данные, без сигналов: каскады выполняются явно,
+    счетчики и версии поиска пересчитываются в конце. Возвращает {модель: строк}.
+    """
+    groups = Group.objects.filter(code__startswith=PREFIX)
+    profiles = PersonProfile.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+    attendances = Attendance.objects.filter(Q(session__group__in=groups) | Q(profile__in=profiles))
+    participants = Group.participants.through.objects
+    trainers = Group.trainers.through.objects
+
+    deleted = {}
+    with transaction.atomic():
+        TrustLog.objects.filter(attendance__in=attendances).update(attendance=None)
+        steps = [
+            ("attendance", attendances),
+            ("attendance_summary", AttendanceSummary.objects.filter(group__in=groups)),
+            ("participant_summary", ParticipantSummary.objects.filter(Q(group__in=groups) | Q(profile__in=profiles))),
+            ("session", Session.objects.filter(group__in=groups)),
+            ("group_participants", participants.filter(Q(group__in=groups) | Q(personprofile__in=profiles))),
+            ("group_trainers", trainers.filter(Q(group__in=groups) | Q(personprofile__in=profiles))),
+            ("fingerprint", BrowserFingerprint.objects.filter(profile__in=profiles)),
+            ("group", groups),
+            ("profile", profiles),
+        ]
+        for name, queryset in steps:
+            deleted[name] = raw_delete(queryset)
+
+    counters.reconcile()
+    search.bump_version("profile")
+    search.bump_version("group")
+    return deleted
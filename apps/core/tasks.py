@@ -0,0 +1,17 @@
+import logging
+
+from celery import shared_task
+
+from apps.core import counters
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def reconcile_counters():
+    """Сверка счетчиков дашборда с БД (по расписанию CELERY_BEAT_SCHEDULE)"""
+    drift = counters.reconcile()
+    for name, (cached, actual) in drift.items():
+        # None — ключа не было (истек или еще не создан), это не расхождение
+        if cached is not None:
+            logger.warning(f"Counter {name} drifted: cached={cached}, actual={actual}")
@@ -11,6 +11,7 @@ router.register(r'groups', api_views.MyGroupsViewSet, basename='groups')
 urlpatterns = [
     # Базовые API эндпоинты
     path('health/', api_views.api_health_check, name='health_check'),
+    path('profiles/<str:profile_id>.<str:fmt>', api_views.profile_download_view, name='profile_download'),
     
     # DRF endpoints
     path('', include(router.urls)),
@@ -1,10 +1,6 @@
 from django.shortcuts import render
 from django.db.models import Count
-from django.utils import timezone
-from datetime import datetime, timedelta
-from apps.groups.models import Group, Session
-from apps.participants.models import PersonProfile
-from apps.attendance.models import Attendance
+from apps.core import counters
 
 
 def home_view(request):
@@ -24,51 +20,45 @@ def home_view(request):
     
     # Для участников
     if user_profile.role == 'participant':
-        # Статистика для участника
-        today = timezone.now().date()
-        my_visits_today = Attendance.objects.filter(
-            profile=user_profile,
-            created__date=today
-        ).count()
+        # Статистика для участника (счетчики из кэша одним запросом)
+        values = counters.get_counters(
+            ["participant_visits_today", "participant_groups"],
+            profile_id=user_profile.id,
+        )
         
-        my_groups_count = user_profile.groups.count()
+        recent_groups = user_profile.groups.annotate(sessions_count=Count("sessions"))[:3]
         
         context.update({
-            'my_visits_today': my_visits_today,
-            'my_groups_count': my_groups_count,
+            'my_visits_today': values["participant_visits_today"],
+            'my_groups_count': values["participant_groups"],
+            'recent_groups': list(recent_groups),
         })
         
         return render(request, 'index/participant.html', context)
     
     # Для тренеров и администраторов
     else:
-        # Статистика для тренера/админа
-        today = timezone.now().date()
+        # Всего групп (для тренера - только его группы), участников,
+        # посещения и активные сессии сегодня. Свои группы нужны и админу:
+        # ссылка «Показать все группы» ведет на список групп пользователя
+        values = counters.get_counters(
+            ["trainer_groups", "groups_total", "participants_total", "visits_today", "sessions_today"],
+            profile_id=user_profile.id,
+        )
+        groups_counter = "trainer_groups" if user_profile.role == 'trainer' else "groups_total"
         
-        # Всего групп (для тренера - только его группы)
-        if user_profile.role == 'trainer':
-            total_groups = user_profile.trainer_groups.count()
-        else:
-            total_groups = Group.objects.count()
-        
-        # Всего участников
-        total_participants = PersonProfile.objects.filter(role='participant').count()
-        
-        # Посещения сегодня
-        today_visits = Attendance.objects.filter(
-            created__date=today
-        ).count()
-        
-        # Активные сессии (сегодня)
-        active_sessions = Session.objects.filter(
-            date=today
-        ).count()
+        recent_groups = user_profile.trainer_groups.annotate(
+            participants_count=Count("participants", distinct=True),
+            sessions_count=Count("sessions", distinct=True),
+        )[:3]
         
         context.update({
-            'total_groups': total_groups,
-            'total_participants': total_participants,
-            'today_visits': today_visits,
-            'active_sessions': active_sessions,
+            'recent_groups': list(recent_groups),
+            'total_groups': values[groups_counter],
+            'my_groups_count': values["trainer_groups"],
+            'total_participants': values["participants_total"],
+            'today_visits': values["visits_today"],
+            'active_sessions': values["sessions_today"],
         })
         
         return render(request, 'index/trainer.html', context)
@@ -0,0 +1,102 @@
+"""
+Проверка доступа профиля к группам.
+
+Для каждого профиля в кэше хранятся два множества id групп: где он тренер и
+где участник. Проверки «тренер ли этой группы», «участник ли этой группы»
+сводятся к поиску в множестве без обращения к БД.
+
+Запись в кэше помечена версией профиля (apps/core/cache_versions.py). Версия
+меняется при изменении состава группы (m2m_changed по trainers/participants)
+и перед удалением группы (см. apps/groups/signals.py) — старая запись просто
+перестает совпадать. Отсутствующая версия не совпадает ни с какой записью:
+вместо нее создается новая, и доступ загружается из БД. Версия и данные
+читаются одним get_many. В пределах запроса результат запоминается на
+экземпляре профиля.
+
+QuerySet.update()/bulk_create по through-таблицам сигналы не вызывают: после
+массовых изменений состава групп нужно вызвать bump_version() для затронутых id.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Value
+
+from apps.core import cache_versions, metrics
+
+from .models import Group
+
+VERSION_KEY = "groups:access_version:{profile_id}"
+DATA_KEY = "groups:access:{profile_id}"
+INSTANCE_ATTR = "_group_access"
+
+
+def bump_version(profile_id):
+    cache_versions.bump_version(VERSION_KEY.format(profile_id=profile_id))
+
+
+def _load(profile_id):
+    """
+    Оба множества одним запросом (UNION ALL по двум through-таблицам).
+    Всегда с основной БД: проверки идут и внутри read_replica(), а отстающая
+    реплика сохранила бы старый состав под новой версией на весь TTL кэша.
+    """
+    groups = Group.objects.using("default")
+    as_trainer = (
+        groups.filter(trainers=profile_id)
+        .annotate(kind=Value("trainer"))
+        .values_list("id", "kind")
+        .order_by()
+    )
+    as_participant = (
+        groups.filter(participants=profile_id)
+        .annotate(kind=Value("participant"))
+        .values_list("id", "kind")
+        .order_by()
+    )
+    data = {"trainer": [], "participant": []}
+    for group_id, kind in as_trainer.union(as_participant, all=True):
+        data[kind].append(group_id)
+    return data
+
+
+def get_access(profile):
+    """{"trainer": frozenset(id групп), "participant": frozenset(id групп)}"""
+    access = getattr(profile, INSTANCE_ATTR, None)
+    if access is not None:
+        return access
+
+    version_key = VERSION_KEY.format(profile_id=profile.id)
+    data_key = DATA_KEY.format(profile_id=profile.id)
+    cached = cache.get_many([version_key, data_key])
+    version = cached.get(version_key)
+    data = cached.get(data_key)
+
+    hit = version is not None and data is not None and data.get("version") == version
+    metrics.cache_lookup("group_access", hit)
+    if not hit:
+        if version is None:
+            version = cache_versions.get_version(version_key)
+        data = {"version": version, **_load(profile.id)}
+        cache.set(data_key, data, settings.GROUP_ACCESS_CACHE_TTL)
+
+    access = {
+        "trainer": frozenset(data["trainer"]),
+        "participant": frozenset(data["participant"]),
+    }
+    setattr(profile, INSTANCE_ATTR, access)
+    return access
+
+
+def trainer_group_ids(profile):
+    return get_access(profile)["trainer"]
+
+
+def participant_group_ids(profile):
+    return get_access(profile)["participant"]
+
+
+def is_trainer(profile, group_id):
+    return group_id in trainer_group_ids(profile)
+
+
+def is_participant(profile, group_id):
+    return group_id in participant_group_ids(profile)
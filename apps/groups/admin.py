@@ -1,18 +1,40 @@
 from django.contrib import admin
+from django.db.models import Count
 from unfold.admin import ModelAdmin, TabularInline
+from unfold.contrib.filters.admin import AutocompleteSelectFilter, RangeDateFilter, RangeDateTimeFilter
 from .models import Group, Session
+from apps.core.replica import ReplicaChangeListMixin, is_changelist
+from apps.core.search import IndexedSearchAdminMixin
 
 @admin.register(Group)
-class GroupAdmin(ModelAdmin):
+class GroupAdmin(IndexedSearchAdminMixin, ReplicaChangeListMixin, ModelAdmin):
+    readonly_fields = ("archived_at",)
     list_display = ("code", "course_name_short", "supervisor_name", "start_date", "end_date", "participant_count")
     search_fields = ("code", "course_name", "supervisor_name", "supervisor_iin")
-    list_filter = ("start_date", "end_date")
+    search_index = {"": "group"}
+    list_filter = (
+        ("start_date", RangeDateFilter),
+        ("end_date", RangeDateFilter),
+        ("archived_at", RangeDateTimeFilter),
+    )
+    list_filter_submit = True
+    show_full_result_count = False
+
+    # Участников тысячи — поиск вместо полного списка в форме
+    autocomplete_fields = ("participants", "trainers")
 
-    filter_horizontal = ("participants", "trainers")
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Число участников нужно только колонке списка: автодополнение, форма
+        # и удаление обходятся без агрегата
+        if is_changelist(request):
+            queryset = queryset.annotate(participants_total=Count("participants", distinct=True))
+        return queryset
 
     def participant_count(self, obj):
-        return obj.participants.count()
+        return obj.participants_total
     participant_count.short_description = "Участников"
+    participant_count.admin_order_field = "participants_total"
 
     def course_name_short(self, obj):
         return obj.course_name[:64] + "..." if len(obj.course_name) > 64 else obj.course_name
@@ -23,10 +45,10 @@ class GroupAdmin(ModelAdmin):
             "fields": ("external_id", "code", "course_name", "supervisor_name", "supervisor_iin")
         }),
         ("Даты", {
-            "fields": ("start_date", "end_date")
+            "fields": ("start_date", "end_date", "archived_at")
         }),
         ("Настройки отметок", {
-            "fields": ("use_time_limits", "track_exit"),
+            "fields": ("use_time_limits", "track_exit", "rotating_qr"),
             "description": "Настройки ограничений по времени отметок участников",
         }),
         ("Связи", {
@@ -41,7 +63,7 @@ from .models import Group, Session
 
 
 @admin.register(Session)
-class SessionAdmin(ModelAdmin):
+class SessionAdmin(ReplicaChangeListMixin, ModelAdmin):
     list_display = (
         "group",
         "date",
@@ -52,8 +74,15 @@ class SessionAdmin(ModelAdmin):
         "qr_file_entry_link",
         "qr_file_exit_link",
     )
-    list_filter = ("group__code", "date")
+    list_select_related = ("group",)
+    list_filter = (
+        ("group", AutocompleteSelectFilter),
+        ("date", RangeDateFilter),
+    )
+    list_filter_submit = True
+    show_full_result_count = False
     search_fields = ("group__code",)
+    autocomplete_fields = ("group",)
     ordering = ("-date",)
 
     readonly_fields = (
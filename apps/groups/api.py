@@ -4,6 +4,9 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
+from apps.attendance.summary import group_summary
+from apps.core import search
+from apps.core.replica import ReadReplicaMixin
 from apps.groups.models import Group
 from apps.groups.serializers import GroupSerializer, GroupListSerializer
 
@@ -13,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(ReadReplicaMixin, viewsets.ModelViewSet):
     """
     ViewSet для CRUD операций с группами через код.
     Формат данных точно как в miniresponse.json.
@@ -40,10 +43,10 @@ class GroupViewSet(viewsets.ModelViewSet):
     
     def list(self, request, *args, **kwargs):
         """
-        GET /api/crud/groups/
+        GET /api/crud/groups/?search=<подстрока кода, курса или руководителя>
         Получить список всех групп (упрощенный формат)
         """
-        groups = self.get_queryset()
+        groups = search.search("group", request.query_params.get("search", ""), self.get_queryset())
         serializer = self.get_serializer(groups, many=True)
         return Response({
             'count': groups.count(),
@@ -132,6 +135,15 @@ class GroupViewSet(viewsets.ModelViewSet):
             status=status.HTTP_204_NO_CONTENT
         )
     
+    @action(detail=True, methods=['get'])
+    def summary(self, request, *args, **kwargs):
+        """
+        GET /api/crud/groups/{code}/summary/
+        Сводка посещаемости группы: счетчики по сессиям и доля завершенных сессий по участникам
+        """
+        group = get_object_or_404(Group, code=kwargs.get('code'))
+        return Response(group_summary(group))
+    
     @action(detail=False, methods=['get'], url_path='test-error')
     def test_error(self, request):
         """
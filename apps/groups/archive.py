@@ -0,0 +1,169 @@
+"""
+Архив завершенных групп.
+
+Снимок группы — gzip JSON Lines (сериализатор Django "jsonl") в
+ARCHIVE_ROOT/groups/<код>.jsonl.gz: группа с составом, сессии, отметки,
+сводки и связанные записи TrustLog. Формат тот же, что у dumpdata, поэтому
+снимок читается и стандартными средствами (loaddata).
+
+При архивации удаляются QR-файлы сессий из MEDIA_ROOT, с purge — еще и сессии
+со всеми отметками, сводками и записями TrustLog этих отметок (строка группы и
+состав остаются, archived_at заполнен). Удаление — по одному DELETE на таблицу
+в порядке внешних ключей, без сигналов на каждую строку; счетчики после него
+пересчитываются.
+Восстановление — rehydrate(): объекты сохраняются с исходными id, QR-файлы
+генерируются заново.
+
+Команды: archive_groups и rehydrate_groups.
+"""
+import gzip
+import logging
+import os
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.attendance.models import Attendance, AttendanceSummary, ParticipantSummary, TrustLog
+from apps.core import counters
+from apps.core.bulk import raw_delete
+from apps.groups.models import Group, Session
+from apps.groups.services import generate_session_qr_files
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+
+def archive_dir():
+    path = os.path.join(settings.ARCHIVE_ROOT, "groups")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def snapshot_path(group):
+    return os.path.join(archive_dir(), f"{group.code}.jsonl.gz")
+
+
+def archivable(days=None, today=None):
+    """Группы, закончившиеся больше days дней назад и еще не в архиве"""
+    days = settings.GROUP_ARCHIVE_AFTER_DAYS if days is None else days
+    today = today or timezone.localdate()
+    return Group.objects.filter(
+        archived_at__isnull=True,
+        end_date__lt=today - timedelta(days=days),
+    )
+
+
+def _snapshot_objects(group):
+    attendances = Attendance.objects.filter(session__group=group).order_by("id")
+    return chain(
+        [group],
+        Session.objects.filter(group=group).order_by("id").iterator(chunk_size=CHUNK_SIZE),
+        attendances.iterator(chunk_size=CHUNK_SIZE),
+        AttendanceSummary.objects.filter(group=group).order_by("id").iterator(chunk_size=CHUNK_SIZE),
+        ParticipantSummary.objects.filter(group=group).order_by("id").iterator(chunk_size=CHUNK_SIZE),
+        TrustLog.objects.filter(attendance__session__group=group).order_by("id").iterator(chunk_size=CHUNK_SIZE),
+    )
+
+
+def write_snapshot(group):
+    """Пишет снимок во временный файл и атомарно переименовывает. Возвращает путь"""
+    path = snapshot_path(group)
+    tmp_path = f"{path}.tmp"
+    serializer = serializers.get_serializer("jsonl")()
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        serializer.serialize(_snapshot_objects(group), stream=f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _delete_qr_files(group):
+    removed = 0
+    for session in Session.objects.filter(group=group).only("id", "qr_file_entry", "qr_file_exit"):
+        changed = []
+        for field in ("qr_file_entry", "qr_file_exit"):
+            file = getattr(session, field)
+            if file:
+                file.delete(save=False)
+                changed.append(field)
+                removed += 1
+        if changed:
+            session.save(update_fields=changed)
+    return removed
+
+
+def _purge_rows(group):
+    """
+    Удаляет сессии группы с зависимыми строками. TrustLog удаляется, а не
+    отвязывается: запись без отметки и без отпечатка нарушает инвариант
+    TrustLog.save, а в снимке она сохранена. Возвращает число удаленных строк.
+    """
+    attendances = Attendance.objects.filter(session__group=group)
+    steps = [
+        TrustLog.objects.filter(attendance__in=attendances),
+        attendances,
+        AttendanceSummary.objects.filter(group=group),
+        ParticipantSummary.objects.filter(group=group),
+        Session.objects.filter(group=group),
+    ]
+    return sum(raw_delete(queryset) for queryset in steps)
+
+
+def archive(group, purge=False):
+    """
+    Архивирует группу: снимок, удаление QR-файлов, с purge — удаление сессий
+    и отметок. Снимок пишется до любых удалений.
+    """
+    path = write_snapshot(group)
+    removed_files = _delete_qr_files(group)
+
+    purged = 0
+    with transaction.atomic():
+        if purge:
+            purged = _purge_rows(group)
+        group.archived_at = timezone.now()
+        group.save(update_fields=["archived_at"])
+    if purge:
+        counters.reconcile()
+
+    logger.info(
+        f"Group {group.code} archived to {path}: qr files removed={removed_files}, rows purged={purged}"
+    )
+    return path, removed_files, purged
+
+
+def rehydrate(group_code):
+    """
+    Восстанавливает группу из снимка. Уже существующие строки перезаписываются
+    значениями из снимка, недостающие создаются с исходными id. QR-файлы
+    из снимка удалены при архивации — они генерируются заново.
+    """
+    group = Group(code=group_code)
+    path = snapshot_path(group)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    restored = 0
+    with transaction.atomic(), gzip.open(path, "rt", encoding="utf-8") as f:
+        for obj in serializers.deserialize("jsonl", f):
+            if isinstance(obj.object, Session):
+                obj.object.qr_file_entry = None
+                obj.object.qr_file_exit = None
+            obj.save()
+            restored += 1
+        Group.objects.filter(code=group_code).update(archived_at=None)
+
+    # Новые сессии получают QR сигналом создания, остальные — здесь
+    missing = Session.objects.filter(group__code=group_code).filter(
+        Q(qr_file_entry__isnull=True) | Q(qr_file_entry="")
+    )
+    for session_id in missing.values_list("id", flat=True):
+        generate_session_qr_files(session_id)
+
+    logger.info(f"Group {group_code} rehydrated from {path}: objects={restored}")
+    return path, restored
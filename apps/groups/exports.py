@@ -0,0 +1,193 @@
+"""
+Серверная выгрузка посещаемости группы в CSV и XLSX.
+
+Строки читаются двумя упорядоченными потоками (.iterator(), на Postgres —
+серверные курсоры): участники по id и отметки по profile_id. Потоки
+сливаются (merge join), поэтому в памяти одновременно находятся только список
+сессий и отметки одного участника — независимо от размера группы.
+
+CSV отдается потоком (StreamingHttpResponse). XLSX пишется openpyxl
+в режиме write_only (строки сразу уходят во временный файл), а большие
+выгрузки собираются фоновой задачей (apps/groups/tasks.py) в EXPORT_ROOT.
+EXPORT_ROOT не должен лежать внутри MEDIA_ROOT: медиа раздаются публично,
+а файл выгрузки отдает только export_job_view владельцу задачи.
+"""
+import csv
+import os
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import localtime
+from openpyxl import Workbook
+
+from apps.attendance.models import Attendance
+
+CHUNK_SIZE = 2000
+JOB_KEY = "groups:export:{job_id}"
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _time(value):
+    return localtime(value).strftime("%H:%M") if value else ""
+
+
+def _mark(att, field, status_field):
+    if not att or not getattr(att, field):
+        return ""
+    return f"{_time(getattr(att, field))} ({getattr(att, f'get_{status_field}_display')()})"
+
+
+def iter_participant_attendance(group, using="default", participant_id=None):
+    """Пары (участник, {session_id: отметка}) в порядке id участника"""
+    participants = group.participants.using(using).order_by("id").only("id", "iin", "full_name")
+    attendances = (
+        Attendance.objects.using(using)
+        .filter(session__group=group)
+        .order_by("profile_id", "session_id")
+        .only(
+            "id", "profile_id", "session_id", "arrived_at", "left_at",
+            "arrived_status", "left_status", "trust_level",
+        )
+    )
+    if participant_id is not None:
+        participants = participants.filter(id=participant_id)
+        attendances = attendances.filter(profile_id=participant_id)
+
+    att_iter = attendances.iterator(chunk_size=CHUNK_SIZE)
+    pending = next(att_iter, None)
+
+    for participant in participants.iterator(chunk_size=CHUNK_SIZE):
+        # Пропускаем отметки тех, кто уже не в группе
+        while pending is not None and pending.profile_id < participant.id:
+            pending = next(att_iter, None)
+        marks = {}
+        while pending is not None and pending.profile_id == participant.id:
+            marks[pending.session_id] = pending
+            pending = next(att_iter, None)
+        yield participant, marks
+
+
+def iter_wide_rows(group, using="default"):
+    """Таблица группы: участник в строке, по колонке на вход/выход каждой сессии"""
+    sessions = list(group.sessions.using(using).order_by("date"))
+
+    header = ["Участник", "ИИН"]
+    for session in sessions:
+        date = session.date.strftime("%d.%m.%Y")
+        header.append(f"{date} вход")
+        if group.track_exit:
+            header.append(f"{date} выход")
+    yield header
+
+    for participant, marks in iter_participant_attendance(group, using):
+        row = [participant.full_name, participant.iin]
+        for session in sessions:
+            att = marks.get(session.id)
+            row.append(_mark(att, "arrived_at", "arrived_status"))
+            if group.track_exit:
+                row.append(_mark(att, "left_at", "left_status"))
+        yield row
+
+
+def iter_long_rows(group, using="default", participant_id=None):
+    """Строка на каждую пару участник × сессия (детальная таблица участника)"""
+    sessions = list(group.sessions.using(using).order_by("date"))
+
+    yield [
+        "Участник", "ИИН", "Дата", "Вход", "Статус входа",
+        "Выход", "Статус выхода", "Уровень доверия",
+    ]
+    for participant, marks in iter_participant_attendance(group, using, participant_id):
+        for session in sessions:
+            att = marks.get(session.id)
+            yield [
+                participant.full_name,
+                participant.iin,
+                session.date.strftime("%d.%m.%Y"),
+                _time(att.arrived_at) if att else "",
+                att.get_arrived_status_display() if att and att.arrived_at else "",
+                _time(att.left_at) if att else "",
+                att.get_left_status_display() if att and att.left_at else "",
+                att.get_trust_level_display() if att else "",
+            ]
+
+
+def export_rows(group, using="default", participant_id=None):
+    if participant_id is not None:
+        return iter_long_rows(group, using, participant_id)
+    return iter_wide_rows(group, using)
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo(), delimiter=";")
+    # BOM — чтобы Excel открыл UTF-8 с кириллицей
+    yield "﻿"
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(rows, fileobj):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Посещаемость")
+    for row in rows:
+        sheet.append(row)
+    workbook.save(fileobj)
+
+
+def is_large(group):
+    """Слишком большая для синхронной сборки XLSX (участники × сессии)"""
+    return group.participants.count() * max(group.sessions.count(), 1) > settings.EXPORT_SYNC_MAX_CELLS
+
+
+def export_filename(group, fmt, participant_id=None):
+    suffix = f"_{participant_id}" if participant_id else ""
+    return f"attendance_{group.code}{suffix}_{localtime().strftime('%Y%m%d_%H%M')}.{fmt}"
+
+
+# ------------------------------
+# Фоновые выгрузки
+# ------------------------------
+def exports_dir():
+    path = settings.EXPORT_ROOT
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def create_job(group, profile, fmt, participant_id=None):
+    job_id = uuid.uuid4().hex
+    cache.set(JOB_KEY.format(job_id=job_id), {
+        "group_id": group.id,
+        "profile_id": profile.id,
+        "format": fmt,
+        "participant_id": participant_id,
+        "filename": export_filename(group, fmt, participant_id),
+        "state": "pending",
+    }, settings.EXPORT_JOB_TTL)
+    return job_id
+
+
+def get_job(job_id):
+    return cache.get(JOB_KEY.format(job_id=job_id))
+
+
+def update_job(job_id, **fields):
+    data = get_job(job_id)
+    if data is None:
+        return
+    data.update(fields)
+    cache.set(JOB_KEY.format(job_id=job_id), data, settings.EXPORT_JOB_TTL)
+
+
+def job_path(job_id, fmt):
+    return os.path.join(exports_dir(), f"{job_id}.{fmt}")
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.groups import archive
+from apps.groups.models import Group
+
+#python manage.py archive_groups --days 180 --purge
+
+
+class Command(BaseCommand):
+    help = (
+        "Архивирует завершенные группы: снимок в ARCHIVE_ROOT/groups, удаление QR-файлов, "
+        "с --purge — удаление сессий и отметок"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=settings.GROUP_ARCHIVE_AFTER_DAYS,
+            help="Сколько дней должно пройти после окончания группы",
+        )
+        parser.add_argument("--group", type=str, help="Архивировать только группу с этим кодом")
+        parser.add_argument(
+            "--purge", action="store_true", default=settings.GROUP_ARCHIVE_PURGE,
+            help="Удалить сессии и отметки группы после сохранения снимка",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Только показать группы")
+
+    def handle(self, *args, **options):
+        if options["group"]:
+            groups = Group.objects.filter(code=options["group"])
+        else:
+            groups = archive.archivable(options["days"])
+
+        count = 0
+        for group in groups:
+            if options["dry_run"]:
+                self.stdout.write(f"{group.code}: окончание {group.end_date:%d.%m.%Y}")
+                count += 1
+                continue
+            path, removed_files, purged = archive.archive(group, purge=options["purge"])
+            self.stdout.write(
+                f"{group.code} → {path} (QR-файлов удалено: {removed_files}, строк удалено: {purged})"
+            )
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Групп: {count}"))
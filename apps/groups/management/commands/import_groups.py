@@ -2,6 +2,7 @@ import json
 import uuid
 from datetime import time
 from django.core.management.base import BaseCommand
+from apps.core import counters
 from apps.groups.models import Group, Session
 from apps.participants.models import PersonProfile
 
@@ -95,4 +96,7 @@ class Command(BaseCommand):
                     }
                 )
 
+        # После массового импорта один пересчет точнее и дешевле, чем инкременты
+        counters.reconcile()
+
         self.stdout.write(self.style.SUCCESS("Импорт завершён."))
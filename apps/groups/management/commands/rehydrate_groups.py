@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.groups import archive
+
+#python manage.py rehydrate_groups GROUP_CODE [GROUP_CODE ...]
+
+
+class Command(BaseCommand):
+    help = "Восстанавливает группы из архивных снимков (ARCHIVE_ROOT/groups)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("codes", nargs="+", type=str, help="Коды групп")
+
+    def handle(self, *args, **options):
+        for code in options["codes"]:
+            try:
+                path, restored = archive.rehydrate(code)
+            except FileNotFoundError as e:
+                raise CommandError(f"Снимок группы {code} не найден: {e}")
+            self.stdout.write(self.style.SUCCESS(f"{code} ← {path} (объектов: {restored})"))
@@ -33,6 +33,17 @@ class Group(models.Model):
         default=False,
         help_text=_("Если включено, участники должны отмечаться как на входе, так и на выходе. Если выключено - только вход"),
     )
+    rotating_qr = models.BooleanField(
+        _("Ротируемый QR-код"),
+        default=False,
+        help_text=_("Если включено, отметка возможна только по коду с экрана тренера, который меняется каждые несколько секунд. Печатные QR не действуют"),
+    )
+    archived_at = models.DateTimeField(
+        _("В архиве с"),
+        null=True,
+        blank=True,
+        help_text=_("Снимок группы сохранен в архив (apps/groups/archive.py), QR-файлы удалены"),
+    )
 
     def __str__(self):
         return f"{self.code} — {self.course_name}"
@@ -81,6 +92,10 @@ class Session(models.Model):
 
     class Meta:
         unique_together = ("group", "date")
+        indexes = [
+            # Сессии за день без привязки к группе (home_view)
+            models.Index(fields=["date"], name="session_date_idx"),
+        ]
         ordering = ["group", "date"]
         verbose_name = _("Сессия")
         verbose_name_plural = _("Сессии")
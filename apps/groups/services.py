@@ -3,6 +3,7 @@ from io import BytesIO
 from django.core.files.base import ContentFile
 from django.utils.timezone import localtime
 from django.conf import settings
+from apps.attendance.models import Attendance
 from apps.groups.models import Session
 from apps.logger import logger
 
@@ -150,3 +151,57 @@ def generate_session_qr_pdf_on_fly(session_id, mode='entry'):
     c.save()
     output.seek(0)
     return output.read()
+
+
+def attendance_matrix(group):
+    """
+    Строки таблицы посещаемости группы (участник × сессия) для attendance_json_view.
+    Сессии и участники берутся из prefetch группы, если он сделан.
+    """
+    sessions = list(group.sessions.all())
+    participants = list(group.participants.all())
+
+    attendance_lookup = {}
+
+    for att in Attendance.for_group(group):
+        attendance_lookup[(att.session_id, att.profile_id)] = att
+
+    data = []
+
+    for participant in participants:
+        if not sessions:
+            # Если нет сессий, просто возвращаем участника с "-"
+            data.append({
+                "participant_id": participant.id,
+                "participant": participant.full_name,
+                "date": "-",
+                "session_id": None,
+                "arrived_at": None,
+                "left_at": None,
+                "arrived_status": None,
+                "left_status": None,
+                "marked_entry": False,
+                "marked_exit": False,
+                "trust_level": None,
+                "trust_score": None,
+            })
+            continue
+
+        for session in sessions:
+            att = attendance_lookup.get((session.id, participant.id))
+            data.append({
+                "participant_id": participant.id,
+                "participant": participant.full_name,
+                "date": session.date.strftime("%Y-%m-%d"),
+                "session_id": session.id,
+                "arrived_at": localtime(att.arrived_at).strftime("%H:%M") if att and att.arrived_at else None,
+                "left_at": localtime(att.left_at).strftime("%H:%M") if att and att.left_at else None,
+                "arrived_status": att.arrived_status if att else None,
+                "left_status": att.left_status if att else None,
+                "marked_entry": bool(att.marked_entry_by_trainer) if att else False,
+                "marked_exit": bool(att.marked_exit_by_trainer) if att else False,
+                "trust_level": att.get_trust_level_display() if att else None,
+                "trust_score": att.trust_score if att else None,
+            })
+
+    return data
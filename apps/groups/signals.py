@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
-from .models import Session
+from . import access
+from .models import Group, Session
 from .services import generate_session_qr_files
 
 @receiver(post_save, sender=Session)
@@ -8,3 +10,41 @@ def generate_qr_pdfs_on_save(sender, instance, created, **kwargs):
     if created:
         # Генерируем QR только при создании сессии
         generate_session_qr_files(instance.id)
+
+
+def _bump_access(profile_ids):
+    # После коммита: запрос, успевший прочитать старый состав, не закэширует его под новой версией
+    profile_ids = list(profile_ids)
+    transaction.on_commit(lambda: [access.bump_version(profile_id) for profile_id in profile_ids])
+
+
+def _membership_changed(relation, instance, action, reverse, pk_set):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # instance — профиль (profile.trainer_groups.add(...))
+        profile_ids = [instance.pk]
+    elif action == "pre_clear":
+        profile_ids = getattr(instance, relation).values_list("id", flat=True)
+    else:
+        profile_ids = pk_set or []
+    _bump_access(profile_ids)
+
+
+@receiver(m2m_changed, sender=Group.trainers.through)
+def trainers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _membership_changed("trainers", instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Group.participants.through)
+def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _membership_changed("participants", instance, action, reverse, pk_set)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # Каскадное удаление строк through-таблиц m2m_changed не вызывает
+    _bump_access(
+        set(instance.trainers.values_list("id", flat=True))
+        | set(instance.participants.values_list("id", flat=True))
+    )
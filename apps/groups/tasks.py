@@ -0,0 +1,53 @@
+import logging
+import os
+import time
+
+from celery import shared_task
+from django.conf import settings
+
+from apps.groups import archive, exports
+from apps.groups.models import Group
+
+logger = logging.getLogger(__name__)
+
+
+def _cleanup_old_exports():
+    # Ссылки на выгрузки живут EXPORT_JOB_TTL, файлы старше не нужны
+    threshold = time.time() - settings.EXPORT_JOB_TTL
+    for name in os.listdir(exports.exports_dir()):
+        path = os.path.join(exports.exports_dir(), name)
+        if os.path.getmtime(path) < threshold:
+            os.remove(path)
+
+
+@shared_task(ignore_result=True)
+def build_export(job_id):
+    """Сборка большой выгрузки посещаемости в файл EXPORT_ROOT/<job_id>.<format>"""
+    job = exports.get_job(job_id)
+    if job is None:
+        return
+
+    try:
+        _cleanup_old_exports()
+        group = Group.objects.get(id=job["group_id"])
+        rows = exports.export_rows(group, participant_id=job["participant_id"])
+        path = exports.job_path(job_id, job["format"])
+        if job["format"] == "xlsx":
+            exports.write_xlsx(rows, path)
+        else:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.writelines(exports.stream_csv(rows))
+        exports.update_job(job_id, state="done")
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+        exports.update_job(job_id, state="failed")
+
+
+@shared_task(ignore_result=True)
+def archive_finished_groups():
+    """Архивация групп, закончившихся больше GROUP_ARCHIVE_AFTER_DAYS дней назад"""
+    for group in archive.archivable():
+        try:
+            archive.archive(group, purge=settings.GROUP_ARCHIVE_PURGE)
+        except Exception as e:
+            logger.error(f"Failed to archive group {group.code}: {e}", exc_info=True)
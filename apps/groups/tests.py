@@ -1,3 +1,82 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from apps.groups import access
+from apps.groups.models import Group
+from apps.participants.models import PersonProfile
+
+# Тесты не зависят от Redis: кэш — в памяти процесса
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GroupAccessCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.group = Group.objects.create(
+            external_id=1, code="G1", course_name="Курс", supervisor_name="Тренер",
+            supervisor_iin="100000000002", start_date=today, end_date=today,
+        )
+        cls.profile = PersonProfile.objects.create(iin="100000000001", full_name="Участник")
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_access(self):
+        # Новый экземпляр: результат на экземпляре живет только в пределах запроса
+        return access.get_access(PersonProfile.objects.get(id=self.profile.id))
+
+    def test_access_is_cached(self):
+        self.group.participants.add(self.profile)
+        self.assertEqual(self.fresh_access()["participant"], {self.group.id})
+
+        with self.assertNumQueries(1):
+            profile = PersonProfile.objects.get(id=self.profile.id)
+            self.assertTrue(access.is_participant(profile, self.group.id))
+            self.assertFalse(access.is_trainer(profile, self.group.id))
+
+    def test_membership_changes_invalidate_after_commit(self):
+        self.assertEqual(self.fresh_access(), {"trainer": frozenset(), "participant": frozenset()})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.participants.add(self.profile)
+        self.assertEqual(self.fresh_access()["participant"], {self.group.id})
+
+        # Изменение со стороны профиля (reverse) и назначение тренером
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.trainer_groups.add(self.group)
+        self.assertEqual(self.fresh_access()["trainer"], {self.group.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.participants.remove(self.profile)
+        self.assertEqual(self.fresh_access()["participant"], frozenset())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.trainers.clear()
+        self.assertEqual(self.fresh_access()["trainer"], frozenset())
+
+    def test_version_is_bumped_only_on_commit(self):
+        self.fresh_access()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.group.participants.add(self.profile)
+            # До коммита запрос видит старую запись кэша
+            self.assertEqual(self.fresh_access()["participant"], frozenset())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_group_delete_invalidates_members(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.participants.add(self.profile)
+        self.assertEqual(self.fresh_access()["participant"], {self.group.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.get(id=self.group.id).delete()
+        self.assertEqual(self.fresh_access()["participant"], frozenset())
+
+    def test_evicted_version_reloads_from_database(self):
+        self.fresh_access()
+        # Состав изменен в обход сигналов, затем ключ версии вытеснен из кэша
+        self.group.participants.through.objects.create(group=self.group, personprofile=self.profile)
+        cache.delete(access.VERSION_KEY.format(profile_id=self.profile.id))
+        self.assertEqual(self.fresh_access()["participant"], {self.group.id})
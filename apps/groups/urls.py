@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     participant_groups_view,
     trainer_groups_view,
     group_detail_view,
-    session_qr_pdf_view, manual_attendance_data, attendance_json_view, participant_attendance_detail_view
+    session_qr_pdf_view, manual_attendance_data, attendance_json_view, participant_attendance_detail_view,
+    attendance_stream_view, attendance_events_view, attendance_summary_json_view,
+    attendance_export_view, export_job_view, session_projector_view,
 )
 
 app_name = "groups"
@@ -13,6 +16,11 @@ urlpatterns = [
     path("manage/", trainer_groups_view, name="trainer_groups"),
     path("<int:group_id>/", group_detail_view, name="group_detail"),
     path("<int:group_id>/attendance.json", attendance_json_view, name="attendance_json"),
+    path("<int:group_id>/summary.json", attendance_summary_json_view, name="attendance_summary_json"),
+    path("<int:group_id>/export.csv", attendance_export_view, {"fmt": "csv"}, name="attendance_export_csv"),
+    path("<int:group_id>/export.xlsx", attendance_export_view, {"fmt": "xlsx"}, name="attendance_export_xlsx"),
+    path("export/<str:job_id>/", export_job_view, name="export_job"),
+    path("<int:group_id>/attendance/events/", attendance_events_view, name="attendance_events"),
 
     # JSON-данные по участнику (для AJAX)
     path("<int:group_id>/manual-attendance/<int:participant_id>/data/", manual_attendance_data,
@@ -23,4 +31,12 @@ urlpatterns = [
          name="participant_attendance_detail"),
 
     path('session/<int:session_id>/qr-pdf/', session_qr_pdf_view, name='session_qr_pdf'),
+    path('session/<int:session_id>/projector/', session_projector_view, name='session_projector'),
 ]
+
+# SSE держит соединение открытым — только под ASGI. Под WSGI Django буферизует
+# асинхронный поток целиком, и каждая вкладка навсегда занимает поток воркера
+if settings.LIVE_SSE:
+    urlpatterns.append(
+        path("<int:group_id>/attendance/stream/", attendance_stream_view, name="attendance_stream")
+    )
@@ -1,16 +1,34 @@
+import logging
+import os
+import tempfile
 from collections import defaultdict
+
+import segno
 from django.db.models import Prefetch, Q
-from django.shortcuts import render, get_object_or_404
-from django.utils.timezone import now, localdate, localtime
-from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
+from django.db import router
+from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
+from django.conf import settings
+from django.utils.timezone import now, localdate
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse, FileResponse, Http404
 from django.contrib import messages
 
 from apps.accounts.decorators import sso_login_required
-from apps.attendance.models import Attendance
+from apps.attendance import live
+from apps.attendance.models import Attendance, AttendanceSummary
+from apps.attendance.summary import group_summary
+from apps.core.concurrency import db_sync_to_async
+from apps.core.fastjson import FastJsonResponse
+from apps.core.replica import read_replica
+from apps.groups import access, exports
 from apps.groups.models import Group, Session
-from apps.groups.services import generate_session_qr_pdf_on_fly
+from apps.groups.services import attendance_matrix, generate_session_qr_pdf_on_fly
+from apps.groups.tasks import build_export
+from apps.qr import signing
 from apps.participants.models import PersonProfile
 
+logger = logging.getLogger(__name__)
+
 
 # ------------------------------
 # Участник: список своих групп
@@ -69,19 +87,28 @@ def trainer_groups_view(request):
 def group_detail_view(request, group_id):
     user = request.user_profile
 
-    group = get_object_or_404(
-        Group.objects.prefetch_related("sessions", "trainers"),
-        id=group_id
-    )
-
-    if user.id not in {t.id for t in group.trainers.all()}:
+    if not access.is_trainer(user, group_id):
         return HttpResponseForbidden("У вас нет доступа к этой группе")
 
+    group = get_object_or_404(Group, id=group_id)
+
     sessions = list(group.sessions.all().order_by("date"))
 
+    # Итоги по сессиям для шапки таблицы — из сводки, без агрегации отметок
+    participants_total = group.participants.count()
+    session_summary = {
+        row["session_id"]: {**row, "participants_total": participants_total}
+        for row in AttendanceSummary.objects.filter(group=group).values("session_id", "arrived_count", "left_count")
+    }
+
     return render(request, "groups/group_detail.html", {
         "group": group,
         "sessions": sessions,
+        "session_summary": session_summary,
+        "live_sse": settings.LIVE_SSE,
+        # Курсор берется до загрузки таблицы: события между рендером и опросом не теряются
+        "live_cursor": None if settings.LIVE_SSE else live.last_event_id(group.id),
+        "live_poll_ms": settings.LIVE_POLL_MS,
     })
 
 # ------------------------------
@@ -89,71 +116,140 @@ def group_detail_view(request, group_id):
 # ------------------------------
 
 @sso_login_required
+@read_replica()
 def attendance_json_view(request, group_id):
     user = request.user_profile
 
+    if not access.is_trainer(user, group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
+
     group = get_object_or_404(
-        Group.objects.prefetch_related("sessions", "participants", "trainers"),
+        Group.objects.prefetch_related("sessions", "participants"),
         id=group_id
     )
 
-    if user.id not in {t.id for t in group.trainers.all()}:
+    return FastJsonResponse({"data": attendance_matrix(group)})
+
+# ------------------------------
+# JSON API: сводка посещаемости группы (по сессиям и участникам)
+# ------------------------------
+@sso_login_required
+@read_replica()
+def attendance_summary_json_view(request, group_id):
+    user = request.user_profile
+
+    if not access.is_trainer(user, group_id):
         return HttpResponseForbidden("У вас нет доступа к этой группе")
 
-    sessions = list(group.sessions.all())
-    participants = list(group.participants.all())
+    group = get_object_or_404(Group, id=group_id)
+
+    return FastJsonResponse(group_summary(group))
 
-    session_lookup = {s.id: s.date.strftime("%Y-%m-%d") for s in sessions}
-    attendance_lookup = {}
+# ------------------------------
+# Выгрузка посещаемости группы (CSV потоком, XLSX файлом или фоновой задачей)
+# ------------------------------
+@sso_login_required
+@read_replica()
+def attendance_export_view(request, group_id, fmt):
+    user = request.user_profile
 
-    for att in Attendance.for_group(group):
-        attendance_lookup[(att.session_id, att.profile_id)] = att
+    if not access.is_trainer(user, group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
 
-    data = []
+    group = get_object_or_404(Group, id=group_id)
 
-    for participant in participants:
-        if not sessions:
-            # Если нет сессий, просто возвращаем участника с "-"
-            data.append({
-                "participant_id": participant.id,
-                "participant": participant.full_name,
-                "date": "-",
-                "session_id": None,
-                "arrived_at": None,
-                "left_at": None,
-                "arrived_status": None,
-                "left_status": None,
-                "marked_entry": False,
-                "marked_exit": False,
-                "trust_level": None,
-                "trust_score": None,
-            })
-            continue
-
-        for session in sessions:
-            att = attendance_lookup.get((session.id, participant.id))
-            data.append({
-                "participant_id": participant.id,
-                "participant": participant.full_name,
-                "date": session.date.strftime("%Y-%m-%d"),
-                "session_id": session.id,
-                "arrived_at": localtime(att.arrived_at).strftime("%H:%M") if att and att.arrived_at else None,
-                "left_at": localtime(att.left_at).strftime("%H:%M") if att and att.left_at else None,
-                "arrived_status": att.arrived_status if att else None,
-                "left_status": att.left_status if att else None,
-                "marked_entry": bool(att.marked_entry_by_trainer) if att else False,
-                "marked_exit": bool(att.marked_exit_by_trainer) if att else False,
-                "trust_level": att.get_trust_level_display() if att else None,
-                "trust_score": att.trust_score if att else None,
-            })
-
-    return JsonResponse({"data": data})
+    participant_id = request.GET.get("participant")
+    participant_id = int(participant_id) if participant_id and participant_id.isdigit() else None
+
+    # Строки читаются уже после выхода из представления, поэтому БД фиксируем явно
+    using = router.db_for_read(Attendance) or "default"
+    filename = exports.export_filename(group, fmt, participant_id)
+
+    if fmt == "csv":
+        response = StreamingHttpResponse(
+            exports.stream_csv(exports.export_rows(group, using, participant_id)),
+            content_type=exports.CONTENT_TYPES["csv"],
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    if participant_id is None and exports.is_large(group):
+        job_id = exports.create_job(group, user, fmt)
+        try:
+            build_export.delay(job_id)
+        except Exception as e:
+            logger.warning(f"Очередь недоступна, выгрузка {job_id} собирается синхронно: {e}")
+            build_export(job_id)
+        return redirect("groups:export_job", job_id=job_id)
+
+    # write_only: строки не копятся в памяти, а пишутся во временный файл
+    tmp = tempfile.TemporaryFile()
+    exports.write_xlsx(exports.export_rows(group, using, participant_id), tmp)
+    tmp.seek(0)
+    return FileResponse(tmp, as_attachment=True, filename=filename, content_type=exports.CONTENT_TYPES["xlsx"])
+
+
+@sso_login_required
+def export_job_view(request, job_id):
+    """Статус фоновой выгрузки: страница ожидания с опросом, JSON-статус или файл"""
+    job = exports.get_job(job_id)
+    if not job or job["profile_id"] != request.user_profile.id:
+        raise Http404("Выгрузка не найдена или устарела")
+
+    if request.GET.get("format") == "json":
+        return FastJsonResponse({"ready": job["state"] != "pending", "state": job["state"]})
+
+    if job["state"] == "done" and "download" in request.GET:
+        path = exports.job_path(job_id, job["format"])
+        if not os.path.exists(path):
+            raise Http404("Файл выгрузки удален")
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=job["filename"],
+            content_type=exports.CONTENT_TYPES[job["format"]],
+        )
+
+    return render(request, "groups/export_job.html", {
+        "job": job,
+        "job_id": job_id,
+        "poll_interval": settings.EXPORT_POLL_MS,
+    })
+
+# ------------------------------
+# Живые изменения посещаемости группы: SSE (только ASGI) или короткий опрос
+# ------------------------------
+@sso_login_required
+def attendance_events_view(request, group_id):
+    if not access.is_trainer(request.user_profile, group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
+
+    events, cursor = live.events_after(group_id, request.GET.get("after"))
+    return FastJsonResponse({"events": events, "cursor": cursor})
+
+
+@sso_login_required
+async def attendance_stream_view(request, group_id):
+    user = request.user_profile
+
+    # При промахе кэша доступ загружается из БД — выполняем в пуле потоков
+    if not await db_sync_to_async(access.is_trainer)(user, group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
+
+    response = StreamingHttpResponse(live.stream_group_events(group_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Отключаем буферизацию на nginx/traefik, иначе события приходят пачками
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 # ------------------------------
 # Ручная отметка: загрузка данных по участнику
 # ------------------------------
 @sso_login_required
 def manual_attendance_data(request, group_id, participant_id):
+    if not access.is_trainer(request.user_profile, group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
+
     attendances = (
         Attendance.objects
         .filter(session__group_id=group_id, profile_id=participant_id)
@@ -172,18 +268,20 @@ def manual_attendance_data(request, group_id, participant_id):
             "marked_exit": a.marked_exit_by_trainer.full_name if a.marked_exit_by_trainer else None,
         })
 
-    return JsonResponse({"attendances": data})
+    return FastJsonResponse({"attendances": data})
 
 
 @sso_login_required
+@read_replica()
 def participant_attendance_detail_view(request, group_id, participant_id):
     user = request.user_profile
-    group = get_object_or_404(Group.objects.prefetch_related("sessions", "trainers"), id=group_id)
-    participant = get_object_or_404(PersonProfile, id=participant_id)  # <-- исправлено
 
-    if user not in group.trainers.all():
+    if not access.is_trainer(user, group_id):
         return HttpResponseForbidden("Нет доступа к группе")
 
+    group = get_object_or_404(Group.objects.prefetch_related("sessions"), id=group_id)
+    participant = get_object_or_404(PersonProfile, id=participant_id)  # <-- исправлено
+
     sessions = group.sessions.all().order_by("date")
     attendance_by_session = {
         att.session_id: att for att in Attendance.objects.filter(
@@ -199,12 +297,43 @@ def participant_attendance_detail_view(request, group_id, participant_id):
         "attendance_by_session": attendance_by_session,
         "today": localdate(),
     })
+# ------------------------------
+# Экран тренера с ротируемым QR
+# ------------------------------
+@sso_login_required
+def session_projector_view(request, session_id):
+    """QR-код для проектора: меняется каждые QR_ROTATE_SECONDS, страница сама его обновляет"""
+    user = request.user_profile
+    session = get_object_or_404(Session.objects.select_related("group"), id=session_id)
+    if not access.is_trainer(user, session.group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
+
+    mode = "exit" if request.GET.get("mode") == "exit" and session.group.track_exit else "entry"
+    token = signing.make_token(session.id, mode)
+    url = request.build_absolute_uri(reverse("qr_mark_rotating", args=[token]))
+    data = {
+        "svg": segno.make(url).svg_inline(scale=10),
+        "expires_in_ms": int(signing.seconds_left() * 1000),
+    }
+    if request.GET.get("format") == "json":
+        return FastJsonResponse(data)
+
+    return render(request, "groups/session_projector.html", {
+        "session": session,
+        "mode": mode,
+        "period": settings.QR_ROTATE_SECONDS,
+        **data,
+    })
+
+
 # ------------------------------
 # Генерация PDF с QR по сессии
 # ------------------------------
 @sso_login_required
 def session_qr_pdf_view(request, session_id):
-    session = get_object_or_404(Session, id=session_id)
+    session = get_object_or_404(Session.objects.select_related("group"), id=session_id)
+    if not access.is_trainer(request.user_profile, session.group_id):
+        return HttpResponseForbidden("У вас нет доступа к этой группе")
 
     if request.method == "POST":
         mode = request.POST.get("mode", "entry")
@@ -1,15 +1,50 @@
 from django.contrib import admin
+from django.db.models import Count, Exists, OuterRef
 from unfold.admin import ModelAdmin, TabularInline
+from unfold.contrib.filters.admin import RangeNumericFilter
 from .models import BrowserFingerprint, PersonProfile
+from apps.core.replica import ReplicaChangeListMixin, is_changelist
+from apps.core.search import IndexedSearchAdminMixin
+
+
+class FingerprintTrustFilter(admin.SimpleListFilter):
+    """Профили с отпечатком заданного уровня доверия — через EXISTS, без JOIN и дублей"""
+    title = "Доверие отпечатков"
+    parameter_name = "fingerprint_trust"
+
+    RANGES = {
+        BrowserFingerprint.TrustLevel.TRUSTED: {"trust_score__gte": 80},
+        BrowserFingerprint.TrustLevel.SUSPICIOUS: {"trust_score__gte": 50, "trust_score__lt": 80},
+        BrowserFingerprint.TrustLevel.BLOCKED: {"trust_score__lt": 50},
+    }
+
+    def lookups(self, request, model_admin):
+        return BrowserFingerprint.TrustLevel.choices
+
+    def queryset(self, request, queryset):
+        ranges = self.RANGES.get(self.value())
+        if ranges is None:
+            return queryset
+        fingerprints = BrowserFingerprint.objects.filter(profile=OuterRef("pk"), **ranges)
+        return queryset.filter(Exists(fingerprints))
 
 
 @admin.register(PersonProfile)
-class PersonProfileAdmin(ModelAdmin):
+class PersonProfileAdmin(IndexedSearchAdminMixin, ReplicaChangeListMixin, ModelAdmin):
     list_display = ("full_name", "iin", "email", "role_display", "fingerprint_count")
-    list_filter = ("role", "fingerprints__trust_score")
+    list_filter = ("role", FingerprintTrustFilter)
+    show_full_result_count = False
     search_fields = ("full_name", "iin", "email")
+    search_index = {"": "profile"}
     ordering = ("full_name",)
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Агрегат только для колонки списка, не для автодополнения и удаления
+        if is_changelist(request):
+            queryset = queryset.annotate(fingerprints_total=Count("fingerprints"))
+        return queryset
+
     fieldsets = (
         ("Основная информация", {
             "fields": ("full_name", "iin", "email", "role"),
@@ -21,8 +56,9 @@ class PersonProfileAdmin(ModelAdmin):
     role_display.short_description = "Роль"
 
     def fingerprint_count(self, obj):
-        return obj.fingerprints.count()
+        return obj.fingerprints_total
     fingerprint_count.short_description = "Отпечатков"
+    fingerprint_count.admin_order_field = "fingerprints_total"
 
 class BrowserFingerprintInline(TabularInline):
     model = BrowserFingerprint
@@ -40,7 +76,7 @@ class BrowserFingerprintInline(TabularInline):
 
 
 @admin.register(BrowserFingerprint)
-class BrowserFingerprintAdmin(ModelAdmin):
+class BrowserFingerprintAdmin(ReplicaChangeListMixin, ModelAdmin):
     list_display = (
         "profile",
         "fingerprint_hash",
@@ -49,7 +85,11 @@ class BrowserFingerprintAdmin(ModelAdmin):
         "first_seen",
         "last_seen",
     )
-    list_filter = ("trust_score",)
+    list_select_related = ("profile",)
+    list_filter = (("trust_score", RangeNumericFilter),)
+    list_filter_submit = True
+    show_full_result_count = False
+    autocomplete_fields = ("profile",)
     search_fields = (
         "fingerprint_hash",
         "user_agent",
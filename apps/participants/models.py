@@ -55,7 +55,9 @@ class BrowserFingerprint(BaseModel):
     class Meta:
         unique_together = ("profile", "fingerprint_hash")
         indexes = [
-            models.Index(fields=["fingerprint_hash"]),
+            # Поиск других владельцев отпечатка (check_fingerprint_usage_conflicts)
+            # без обращения к таблице: profile_id берется из индекса
+            models.Index(fields=["fingerprint_hash"], include=["profile"], name="fingerprint_hash_profile_idx"),
             models.Index(fields=["profile", "last_seen"]),
             models.Index(fields=["trust_score"]),
         ]
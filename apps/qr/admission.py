@@ -0,0 +1,112 @@
+"""
+Контроль допуска для всплесков сканирования.
+
+Одновременно в конвейер отметки (mark_attendance) допускается не более
+QR_ADMISSION_LIMIT запросов на весь кластер. Семафор хранится в Redis
+в виде sorted set с арендой: зависший воркер не удерживает слот дольше
+QR_ADMISSION_LEASE_SECONDS. Запросы сверх лимита ставятся в очередь
+Celery, а клиент получает страницу ожидания, которая опрашивает результат.
+"""
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_KEY = "orleuqr:qr:admission"
+TICKET_KEY = "qr:ticket:{ticket}"
+
+# Атомарно: убрать просроченные аренды, проверить лимит, занять слот
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lease = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - lease)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(lease) * 2)
+    return 1
+end
+return 0
+"""
+
+
+def acquire_slot():
+    """
+    Пытается занять слот. Возвращает (admitted, slot_id).
+    Если контроль выключен или Redis недоступен — пропускаем запрос (fail open).
+    """
+    limit = settings.QR_ADMISSION_LIMIT
+    if not limit:
+        return True, None
+
+    slot_id = uuid.uuid4().hex
+    try:
+        client = get_redis_connection("default")
+        admitted = client.eval(
+            _ACQUIRE_SCRIPT, 1, ADMISSION_KEY,
+            time.time(), settings.QR_ADMISSION_LEASE_SECONDS, limit, slot_id,
+        )
+    except Exception as e:
+        logger.warning(f"[Admission] Redis недоступен, пропускаем без очереди: {e}")
+        return True, None
+
+    if admitted:
+        return True, slot_id
+    return False, None
+
+
+def release_slot(slot_id):
+    if not slot_id:
+        return
+    try:
+        get_redis_connection("default").zrem(ADMISSION_KEY, slot_id)
+    except Exception as e:
+        # Слот освободится сам по истечении аренды
+        logger.warning(f"[Admission] Не удалось освободить слот {slot_id}: {e}")
+
+
+def enqueue_scan(profile, token, fingerprint_hash, user_agent, mode):
+    """Ставит отметку в очередь и возвращает номер тикета для опроса"""
+    from apps.qr.tasks import process_scan_ticket
+
+    ticket = uuid.uuid4().hex
+    cache.set(
+        TICKET_KEY.format(ticket=ticket),
+        {"state": "pending", "profile_id": profile.id, "mode": mode},
+        settings.QR_TICKET_TTL,
+    )
+    # Время скана фиксируется здесь: задержка очереди не должна влиять
+    # на время прихода, статус (вовремя/опоздал) и проверку дня сессии
+    scanned_at = timezone.now().isoformat()
+    args = (ticket, profile.id, str(token), fingerprint_hash, user_agent[:1000], mode, scanned_at)
+    try:
+        process_scan_ticket.delay(*args)
+    except Exception as e:
+        # Брокер недоступен — лучше обработать сразу, чем потерять отметку
+        logger.warning(f"[Admission] Очередь недоступна, обрабатываем тикет {ticket} синхронно: {e}")
+        process_scan_ticket(*args)
+    return ticket
+
+
+def get_ticket(ticket):
+    return cache.get(TICKET_KEY.format(ticket=ticket))
+
+
+def store_ticket_result(ticket, profile_id, mode, success, result, status):
+    data = {
+        "state": "done",
+        "profile_id": profile_id,
+        "mode": mode,
+        "success": success,
+        "status": status,
+    }
+    if success:
+        data["attendance_id"] = result.pk
+    else:
+        data["reason"] = str(result)
+    cache.set(TICKET_KEY.format(ticket=ticket), data, settings.QR_TICKET_TTL)
@@ -0,0 +1,43 @@
+"""
+Идемпотентность сканирований.
+
+Телефоны с плохой связью повторяют mark/<token>/?fp=... много раз.
+Итог первой успешной отметки кэшируется по ключу (профиль, токен, режим),
+и повторы получают его без обращения к БД. Отметку выполняет только
+попытка, занявшая ключ (claim), и только она его освобождает. Параллельная
+попытка не ждет в потоке запроса, а сразу получает страницу «обрабатывается»,
+которая повторяет запрос и забирает сохраненный итог. Гонку на уровне БД
+окончательно разрешает ограничение unique (session, profile) в mark_attendance.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+RESULT_KEY = "qr:idem:{profile_id}:{mode}:{token}"
+CLAIM_KEY = "qr:idem-claim:{profile_id}:{mode}:{token}"
+
+
+def _key(template, profile_id, token, mode):
+    return template.format(profile_id=profile_id, mode=mode, token=token)
+
+
+def get_outcome(profile_id, token, mode):
+    """Сохраненный итог (success, attendance, status) или None"""
+    return cache.get(_key(RESULT_KEY, profile_id, token, mode))
+
+
+def store_outcome(profile_id, token, mode, success, result, status):
+    # Кэшируем только состоявшиеся отметки: отказы вроде «слишком рано»
+    # зависят от времени и должны пересчитываться
+    if success not in (True, "already_marked"):
+        return
+    cache.set(_key(RESULT_KEY, profile_id, token, mode), (success, result, status), settings.QR_IDEMPOTENCY_TTL)
+
+
+def claim(profile_id, token, mode):
+    """Помечает попытку как выполняющуюся. False — параллельная попытка уже идет."""
+    return cache.add(_key(CLAIM_KEY, profile_id, token, mode), 1, settings.QR_IDEMPOTENCY_CLAIM_SECONDS)
+
+
+def release(profile_id, token, mode):
+    """Снимает ключ. Вызывает только попытка, для которой claim() вернул True."""
+    cache.delete(_key(CLAIM_KEY, profile_id, token, mode))
@@ -0,0 +1,234 @@
+"""
+Нагрузочное тестирование сканирования QR.
+
+Сессии участников создаются напрямую в хранилище сессий Django
+(заглушка вместо OIDC-входа), после чего пачка запросов
+/qr/mark/<token>/?fp=... отправляется на указанный сервер.
+
+run_burst — все запросы сразу с фиксированной параллельностью (сравнение
+серверов). run_arrivals — сценарий утреннего наплыва: запросы уходят по
+расписанию приходов (burst_offsets), задержка считается от запланированного
+момента, поэтому очередь перед перегруженным сервером попадает в перцентили.
+Без URL запросы обрабатываются в процессе через django.test.Client — сеть и
+OIDC-провайдер не нужны; run_arrivals_asgi делает то же через ASGI-обработчик.
+
+Код 200 не означает отметку: страницы «QR недействителен», технической ошибки
+и конфликта отпечатка тоже отдаются с 200. Успешные сканы считаются по
+строкам в БД (count_marked), коды ответов выводятся только для справки.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.sessions.backends.cache import SessionStore
+
+
+def create_session_keys(profiles):
+    """Создает сессии «вошедших» пользователей, как это делает OIDC callback"""
+    keys = []
+    for profile in profiles:
+        store = SessionStore()
+        store["user_id"] = profile.id
+        store["user_email"] = profile.email
+        store.create()
+        keys.append(store.session_key)
+    return keys
+
+
+def count_marked(session, profiles, mode="entry"):
+    """Сколько участников отмечены в сессии (вход или выход)"""
+    from apps.attendance.models import Attendance
+
+    field = "arrived_at" if mode == "entry" else "left_at"
+    return Attendance.objects.filter(
+        session=session, profile__in=profiles, **{f"{field}__isnull": False}
+    ).count()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_burst(url, session_keys, concurrency=50, timeout=30):
+    """
+    Отправляет по одному запросу на каждую сессию с заданной параллельностью.
+    Возвращает сводку: пропускная способность и перцентили задержки (мс).
+    """
+    local = threading.local()
+    cookie_name = settings.SESSION_COOKIE_NAME
+
+    def scan(index_and_key):
+        index, session_key = index_and_key
+        if not hasattr(local, "http"):
+            local.http = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = local.http.get(
+                url,
+                params={"fp": f"loadtest-{index:06d}"},
+                cookies={cookie_name: session_key},
+                allow_redirects=False,
+                timeout=timeout,
+            )
+            code = response.status_code
+        except requests.RequestException:
+            code = None
+        return code, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(scan, enumerate(session_keys)))
+    elapsed = time.perf_counter() - started
+
+    return _summary(results, elapsed)
+
+
+def burst_offsets(count, window, seed=1):
+    """
+    Моменты прихода (секунды от начала) для count участников: реальные 9:00–10:00
+    (гамма-распределение, пик в первые минуты, 5% до начала окна), сжатые в window секунд.
+    """
+    rng = random.Random(seed)
+    minutes = [
+        -rng.uniform(0, 10) if rng.random() < 0.05 else rng.gammavariate(2, 4)
+        for _ in range(count)
+    ]
+    start = min(minutes)
+    span = (max(minutes) - start) or 1
+    return sorted((value - start) / span * window for value in minutes)
+
+
+def _default_host():
+    hosts = [host for host in settings.ALLOWED_HOSTS if host and host != "*"]
+    return hosts[0].lstrip(".") if hosts else "localhost"
+
+
+def _client_scan(host):
+    from django.test import Client
+
+    local = threading.local()
+    cookie_name = settings.SESSION_COOKIE_NAME
+
+    def scan(path, session_key, fp, timeout):
+        if not hasattr(local, "client"):
+            local.client = Client(raise_request_exception=False, HTTP_HOST=host)
+        local.client.cookies[cookie_name] = session_key
+        try:
+            return local.client.get(path, {"fp": fp}).status_code
+        except Exception:
+            return None
+
+    return scan
+
+
+def _http_scan(base_url):
+    local = threading.local()
+    cookie_name = settings.SESSION_COOKIE_NAME
+
+    def scan(path, session_key, fp, timeout):
+        if not hasattr(local, "http"):
+            local.http = requests.Session()
+        try:
+            return local.http.get(
+                base_url + path,
+                params={"fp": fp},
+                cookies={cookie_name: session_key},
+                allow_redirects=False,
+                timeout=timeout,
+            ).status_code
+        except requests.RequestException:
+            return None
+
+    return scan
+
+
+def run_arrivals(path, session_keys, offsets, base_url=None, concurrency=50, timeout=30):
+    """
+    Открытая модель нагрузки: запрос i отправляется в момент offsets[i], независимо
+    от того, ответил ли сервер на предыдущие. Если base_url не задан, запросы
+    выполняются в процессе (django.test.Client). Возвращает сводку, как run_burst,
+    плюс коды ответов.
+    """
+    if base_url:
+        scan = _http_scan(base_url.rstrip("/"))
+    else:
+        scan = _client_scan(_default_host())
+
+    started = time.perf_counter()
+
+    def job(index, session_key, scheduled):
+        code = scan(path, session_key, f"loadtest-{index:06d}", timeout)
+        return code, (time.perf_counter() - scheduled) * 1000
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, (session_key, offset) in enumerate(zip(session_keys, offsets)):
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(job, index, session_key, scheduled))
+        results = [future.result() for future in futures]
+    return _summary(results, time.perf_counter() - started)
+
+
+def run_arrivals_asgi(path, session_keys, offsets, concurrency=50):
+    """
+    Как run_arrivals в процессе, но через ASGI-обработчик Django (AsyncClient) в
+    одном цикле событий — так запрос проходит путь, как под uvicorn. Синхронные
+    хуки middleware (MiddlewareMixin) выполняются там через
+    sync_to_async(thread_sensitive=True), то есть в одном потоке на процесс,
+    и сравнение с run_arrivals показывает, сколько это стоит.
+    """
+    from django.test import AsyncClient
+
+    host = _default_host()
+    cookie_name = settings.SESSION_COOKIE_NAME
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+
+        async def job(index, session_key, offset):
+            await asyncio.sleep(offset)
+            scheduled = started + offset
+            async with semaphore:
+                client = AsyncClient(raise_request_exception=False, HTTP_HOST=host)
+                client.cookies[cookie_name] = session_key
+                try:
+                    code = (await client.get(path, {"fp": f"loadtest-{index:06d}"})).status_code
+                except Exception:
+                    code = None
+            return code, (time.perf_counter() - scheduled) * 1000
+
+        results = await asyncio.gather(*(
+            job(index, session_key, offset)
+            for index, (session_key, offset) in enumerate(zip(session_keys, offsets))
+        ))
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return _summary(results, elapsed)
+
+
+def _summary(results, elapsed):
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "requests": len(results),
+        "elapsed": elapsed,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1] if latencies else 0.0,
+        "codes": Counter(code for code, _ in results),
+    }
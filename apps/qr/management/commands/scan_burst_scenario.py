@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.models import Attendance
+from apps.groups.models import Session
+from apps.qr.loadtest import burst_offsets, count_marked, create_session_keys, run_arrivals, run_arrivals_asgi
+
+# Пример: наплыв 9:00 для 500 участников, сжатый в 60 секунд, без сети
+# python manage.py generate_synthetic_data --groups 0 --today-group-size 500
+# python manage.py scan_burst_scenario <session_id> --window 60
+# Против локального сервера: --target http://127.0.0.1:8000
+# Через ASGI-обработчик в процессе (как под uvicorn): QR_ASYNC_VIEWS=1 ... --asgi
+
+
+class Command(BaseCommand):
+    help = (
+        "Сценарий утреннего наплыва: сканы входа /qr/mark/<token>/ по расписанию приходов 9:00–10:00, "
+        "сжатому в --window секунд. Отчет: пропускная способность и перцентили задержки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("session_id", type=int, help="ID сессии (должна быть сегодняшней)")
+        parser.add_argument("--window", type=float, default=60, help="Длительность сценария в секундах")
+        parser.add_argument("--participants", type=int, default=0, help="Сколько участников сканируют (0 — все)")
+        parser.add_argument("--concurrency", type=int, default=50, help="Максимум одновременных запросов")
+        parser.add_argument(
+            "--target",
+            help="URL сервера; по умолчанию запросы обрабатываются в этом процессе (django.test.Client)",
+        )
+        parser.add_argument(
+            "--asgi",
+            action="store_true",
+            help="В процессе через ASGI-обработчик (AsyncClient) вместо django.test.Client",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--keep", action="store_true", help="Не удалять отметки участников перед прогоном")
+
+    def handle(self, *args, **options):
+        try:
+            session = Session.objects.select_related("group").get(id=options["session_id"])
+        except Session.DoesNotExist:
+            raise CommandError(f"Сессия {options['session_id']} не найдена")
+
+        participants = session.group.participants.order_by("id")
+        if options["participants"]:
+            participants = participants[:options["participants"]]
+        participants = list(participants)
+        if not participants:
+            raise CommandError("В группе нет участников")
+        if options["asgi"] and options["target"]:
+            raise CommandError("--asgi и --target взаимоисключающие")
+        if options["asgi"] and not settings.QR_ASYNC_VIEWS:
+            self.stdout.write(self.style.WARNING(
+                "QR_ASYNC_VIEWS=0: через ASGI будут обслуживаться sync-представления сканирования"
+            ))
+
+        if not options["keep"]:
+            Attendance.objects.filter(session=session, profile__in=participants).delete()
+
+        session_keys = create_session_keys(participants)
+        offsets = burst_offsets(len(participants), options["window"], seed=options["seed"])
+        self.stdout.write(
+            f"Сессия {session}: {len(participants)} сканов за {options['window']:.0f} с, "
+            f"{options['target'] or ('в процессе, ASGI' if options['asgi'] else 'в процессе')}"
+        )
+
+        before = count_marked(session, participants)
+        path = f"/qr/mark/{session.qr_token_entry}/"
+        if options["asgi"]:
+            stats = run_arrivals_asgi(path, session_keys, offsets, concurrency=options["concurrency"])
+        else:
+            stats = run_arrivals(
+                path, session_keys, offsets, base_url=options["target"], concurrency=options["concurrency"],
+            )
+        marked = count_marked(session, participants) - before
+
+        peak = max(
+            sum(1 for offset in offsets if second <= offset < second + 1)
+            for second in range(int(options["window"]) + 1)
+        )
+        self.stdout.write("")
+        self.stdout.write(f"Запросов:        {stats['requests']} (пик расписания {peak}/с)")
+        self.stdout.write(f"Длительность:    {stats['elapsed']:.1f} с")
+        self.stdout.write(f"Запросов/с:      {stats['rps']:.1f}")
+        self.stdout.write(
+            f"Задержка, мс:    p50 {stats['p50']:.1f}  p95 {stats['p95']:.1f}  "
+            f"p99 {stats['p99']:.1f}  max {stats['max']:.1f}"
+        )
+        codes = ", ".join(f"{code or 'ошибка'}: {count}" for code, count in sorted(stats["codes"].items(), key=str))
+        # Код 200 отдают и страницы ошибок: успешные сканы — это записанные отметки
+        self.stdout.write(f"Ответы:          {codes}")
+        style = self.style.SUCCESS if marked == len(participants) else self.style.WARNING
+        self.stdout.write(style(f"Отмечено:        {marked}/{len(participants)}"))
+        if marked:
+            self.stdout.write(f"Отметок/с:       {marked / stats['elapsed']:.1f}")
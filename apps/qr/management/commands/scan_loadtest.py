@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.attendance.models import Attendance
+from apps.groups.models import Session
+from apps.qr.loadtest import count_marked, create_session_keys, run_burst
+
+# Пример: сравнение sync (gthread) и async (uvicorn) развертываний
+# python manage.py scan_loadtest 42 --target sync=http://127.0.0.1:8000 --target async=http://127.0.0.1:8001
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест сканирования QR: сравнение сканов в секунду между серверами (sync/async)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("session_id", type=int, help="ID сессии (должна быть сегодняшней)")
+        parser.add_argument(
+            "--target",
+            action="append",
+            required=True,
+            help="Сервер в формате имя=URL, можно указать несколько раз",
+        )
+        parser.add_argument("--mode", choices=["entry", "exit"], default="entry")
+        parser.add_argument("--participants", type=int, default=200, help="Сколько участников группы сканируют")
+        parser.add_argument("--concurrency", type=int, default=50, help="Одновременных клиентов")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Не удалять отметки перед прогоном (по умолчанию каждый прогон делает реальные вставки)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            session = Session.objects.select_related("group").get(id=options["session_id"])
+        except Session.DoesNotExist:
+            raise CommandError(f"Сессия {options['session_id']} не найдена")
+
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep:
+                raise CommandError(f"Неверный формат --target: {target}")
+            targets.append((name, url.rstrip("/")))
+
+        participants = list(session.group.participants.all()[:options["participants"]])
+        if not participants:
+            raise CommandError("В группе нет участников")
+
+        if options["mode"] == "entry":
+            path = f"/qr/mark/{session.qr_token_entry}/"
+        else:
+            path = f"/qr/leave/{session.qr_token_exit}/"
+
+        session_keys = create_session_keys(participants)
+        self.stdout.write(
+            f"Сессия {session}: {len(participants)} участников, параллельность {options['concurrency']}"
+        )
+
+        rows = []
+        for name, base_url in targets:
+            if not options["keep"] and options["mode"] == "entry":
+                Attendance.objects.filter(session=session, profile__in=participants).delete()
+
+            # Успехом считается записанная отметка, а не код 200
+            before = count_marked(session, participants, options["mode"])
+            stats = run_burst(base_url + path, session_keys, concurrency=options["concurrency"])
+            stats["marked"] = count_marked(session, participants, options["mode"]) - before
+            rows.append((name, stats))
+            codes = ", ".join(f"{code or 'ошибка'}: {count}" for code, count in sorted(stats["codes"].items(), key=str))
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {stats['rps']:.1f} скан/с, отмечено {stats['marked']}/{stats['requests']} (ответы {codes})"
+            ))
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'режим':<10}{'скан/с':>10}{'отмечено':>10}{'без отм.':>10}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}"
+        )
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name:<10}{stats['rps']:>10.1f}{stats['marked']:>10}{stats['requests'] - stats['marked']:>10}"
+                f"{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}"
+            )
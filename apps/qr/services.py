@@ -1,32 +1,49 @@
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from django.utils.timezone import localtime
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, localtime, make_aware
 from django.utils.translation import gettext as _
+from apps.core import metrics
+from apps.groups import access
 from apps.groups.models import Session
 from apps.participants.models import PersonProfile, BrowserFingerprint
 from apps.attendance.models import Attendance, TrustLog
+from apps.attendance.signals import attendance_marked, attendance_marked_bulk
 from apps.attendance.utils import check_fingerprint_usage_conflicts
+from apps.qr import signing
 
 
 def _get_session_by_token(token: str, mode: str):
     """Получить сессию по токену. Возвращает (session, error_message)"""
     try:
-        if mode == 'entry':
-            session = Session.objects.get(qr_token_entry=token)
+        if signing.is_signed(token):
+            # Ротируемый код: свежесть слота уже проверена в представлении
+            # до постановки в очередь, здесь — только подпись
+            session_id, signed_mode = signing.unsign(token, check_slot=False)
+            if signed_mode != mode:
+                raise signing.InvalidToken(token)
+            session = Session.objects.select_related("group").get(id=session_id)
+        elif mode == 'entry':
+            session = Session.objects.select_related("group").get(qr_token_entry=token)
         else:
-            session = Session.objects.get(qr_token_exit=token)
-            
+            session = Session.objects.select_related("group").get(qr_token_exit=token)
+
+        # Для групп с ротируемыми кодами печатный QR не действует
+        if session.group.rotating_qr and not signing.is_signed(token):
+            return None, _("Этот QR-код больше не действует. Отсканируйте код с экрана тренера.")
+
         # Проверяем, разрешен ли выход для этой группы
         if mode == 'exit' and not session.group.track_exit:
             return None, _("Отметка выхода отключена для данной группы. Обратитесь к администратору.")
             
         return session, None
-    except Session.DoesNotExist:
+    except (Session.DoesNotExist, signing.InvalidToken):
         return None, _("QR-код недействителен или сессия не найдена. Возможно, код устарел или был удален.")
 
 
-def _validate_session_time(session: Session, current_time, mode: str, use_time_limits: bool):
-    current_date = localtime().date()
-    if session.date != current_date:
+def _validate_session_time(session: Session, now, mode: str, use_time_limits: bool):
+    current_time = now.time()
+    if session.date != now.date():
         return False, _("Отметка возможна только в день проведения сессии."), None
 
     if not use_time_limits:
@@ -56,19 +73,37 @@ def _calculate_time_status(event_time, start, end):
         return Attendance.TimeStatus.ON_TIME
 
 
-def mark_attendance(profile: PersonProfile, token: str, fingerprint_hash: str, user_agent: str, mode: str = 'entry'):
+# Исход сканирования для метрик по статусу отказа из _validate_session_time
+_TIME_OUTCOMES = {
+    Attendance.TimeStatus.TOO_EARLY: "too_early",
+    Attendance.TimeStatus.TOO_LATE: "too_late",
+}
+
+
+def mark_attendance(profile: PersonProfile, token: str, fingerprint_hash: str, user_agent: str, mode: str = 'entry',
+                    event_time=None):
+    """
+    event_time — момент сканирования, если отметка обрабатывается позже
+    (очередь допуска): по нему, а не по времени обработки, считаются день,
+    окно и статус отметки.
+    """
+    now = localtime(event_time) if event_time else localtime()
+
     session, session_error = _get_session_by_token(token, mode)
     if session_error:
+        metrics.scan_outcome(mode, "invalid_token")
         return False, session_error, None
     
-    current_time = localtime().time()
+    current_time = now.time()
     use_time_limits = getattr(session.group, 'use_time_limits', False)
 
-    valid, error, status = _validate_session_time(session, current_time, mode, use_time_limits)
+    valid, error, status = _validate_session_time(session, now, mode, use_time_limits)
     if not valid:
+        metrics.scan_outcome(mode, _TIME_OUTCOMES.get(status, "wrong_day"))
         return False, error, status
 
-    if profile not in session.group.participants.all():
+    if not access.is_participant(profile, session.group_id):
+        metrics.scan_outcome(mode, "not_member")
         return False, _("Вы не являетесь участником этой группы."), None
 
     fingerprint, created = BrowserFingerprint.objects.get_or_create(
@@ -76,61 +111,87 @@ def mark_attendance(profile: PersonProfile, token: str, fingerprint_hash: str, u
         fingerprint_hash=fingerprint_hash,
         defaults={
             "user_agent": user_agent[:1000],
-            "last_seen": localtime(),
+            "last_seen": now,
         }
     )
     if not created:
-        fingerprint.last_seen = localtime()
+        fingerprint.last_seen = now
         fingerprint.save(update_fields=["last_seen"])
 
     check_fingerprint_usage_conflicts(fingerprint, profile, session)
 
-    attendance = Attendance.objects.filter(session=session, profile=profile).first()
-    now = localtime()
+    # session__group загружается сразу: итог кэшируется для повторов
+    # (idempotency.store_outcome), и их рендер не должен ходить в БД
+    attendance = Attendance.objects.select_related("session__group").filter(session=session, profile=profile).first()
 
     if mode == 'entry':
         if attendance:
+            metrics.scan_outcome(mode, "already_marked")
             return "already_marked", attendance, attendance.arrived_status
 
         arrived_status = status
         if not use_time_limits:
             arrived_status = _calculate_time_status(current_time, session.entry_start, session.entry_end)
 
-        attendance = Attendance.objects.create(
-            session=session,
-            profile=profile,
-            arrived_at=now,
-            arrived_status=arrived_status,
-            trust_level=fingerprint.trust_level,
-            trust_score=fingerprint.trust_score,
-            fingerprint_hash=fingerprint_hash,
-        )
+        # Победителя параллельных попыток определяет сама вставка: unique_together
+        # (session, profile) пропускает только одну, остальные получают IntegrityError.
+        # Савепоинт откатывает только неудачную вставку, а не всю транзакцию
+        try:
+            with transaction.atomic():
+                attendance = Attendance.objects.create(
+                    session=session,
+                    profile=profile,
+                    arrived_at=now,
+                    arrived_status=arrived_status,
+                    trust_level=fingerprint.trust_level,
+                    trust_score=fingerprint.trust_score,
+                    fingerprint_hash=fingerprint_hash,
+                )
+        except IntegrityError:
+            attendance = Attendance.objects.select_related("session__group").get(session=session, profile=profile)
+            metrics.scan_outcome(mode, "already_marked")
+            return "already_marked", attendance, attendance.arrived_status
+
+        attendance_marked.send(sender=Attendance, attendance=attendance, mode=mode, created=True)
+        metrics.scan_outcome(mode, "success")
         return True, attendance, arrived_status
 
     elif mode == 'exit':
         if not attendance or not attendance.arrived_at:
+            metrics.scan_outcome(mode, "no_entry")
             return False, _("Отметка входа не найдена — нельзя отметить выход."), attendance.left_status if attendance else None
 
         if attendance.left_at:
+            metrics.scan_outcome(mode, "already_marked")
             return "already_marked", attendance, attendance.left_status
 
         left_status = status
         if not use_time_limits:
             left_status = _calculate_time_status(current_time, session.exit_start, session.exit_end)
 
+        # Условный UPDATE: из параллельных попыток выход фиксирует только одна
+        updated = Attendance.objects.filter(pk=attendance.pk, left_at__isnull=True).update(
+            left_at=now, left_status=left_status,
+        )
+        if not updated:
+            attendance.refresh_from_db(fields=["left_at", "left_status"])
+            metrics.scan_outcome(mode, "already_marked")
+            return "already_marked", attendance, attendance.left_status
+
         attendance.left_at = now
         attendance.left_status = left_status
-        attendance.save(update_fields=["left_at", "left_status"])
+        attendance_marked.send(sender=Attendance, attendance=attendance, mode=mode, created=False)
+        metrics.scan_outcome(mode, "success")
         return True, attendance, left_status
 
 
 def manual_mark_entry(trainer_profile: PersonProfile, participant_profile: PersonProfile, session: Session, mark_type: str):
     now = localtime()
 
-    if session.group not in trainer_profile.trainer_groups.all():
+    if not access.is_trainer(trainer_profile, session.group_id):
         return False, _("Вы не связаны с этой группой.")
 
-    if participant_profile not in session.group.participants.all():
+    if not access.is_participant(participant_profile, session.group_id):
         return False, _("Участник не входит в эту группу.")
 
     attendance, created = Attendance.objects.get_or_create(
@@ -162,7 +223,7 @@ def manual_mark_entry(trainer_profile: PersonProfile, participant_profile: Perso
 
     if changed:
         attendance.save()
-        fingerprint, created = BrowserFingerprint.objects.get_or_create(
+        fingerprint, fp_created = BrowserFingerprint.objects.get_or_create(
             profile=trainer_profile,
             fingerprint_hash=f"manual-mark-{trainer_profile.iin}",
             defaults={
@@ -170,7 +231,7 @@ def manual_mark_entry(trainer_profile: PersonProfile, participant_profile: Perso
                 "last_seen": now,
             }
         )
-        if not created:
+        if not fp_created:
             fingerprint.last_seen = now
             fingerprint.save(update_fields=["last_seen"])
 
@@ -184,6 +245,196 @@ def manual_mark_entry(trainer_profile: PersonProfile, participant_profile: Perso
             ),
             delta=-10,
         )
+        attendance_marked.send(sender=Attendance, attendance=attendance, mode=mark_type, created=created)
         return True, attendance
     else:
         return False, _("Отметка уже поставлена.")
+
+
+def _parse_marked_at(value, session: Session, now):
+    """Время отметки из офлайн-очереди киоска: только в день сессии и не из будущего"""
+    if not value:
+        return now, None
+    try:
+        marked_at = parse_datetime(str(value))
+    except ValueError:
+        # Формат верный, но даты не существует (2026-02-30T10:00) — ошибка только этого элемента
+        marked_at = None
+    if marked_at is None:
+        return None, _("Некорректное время отметки.")
+    if is_naive(marked_at):
+        marked_at = make_aware(marked_at)
+    marked_at = localtime(marked_at)
+    if marked_at.date() != session.date or marked_at > now:
+        return None, _("Время отметки вне дня сессии.")
+    return marked_at, None
+
+
+def manual_mark_batch(trainer_profile: PersonProfile, session: Session, marks: list):
+    """
+    Пакетная ручная отметка одной сессии: список {"participant_id", "type",
+    "marked_at" (необязательно, для офлайн-очереди киоска)}.
+
+    Права проверяются один раз, отметки применяются bulk_create/bulk_update,
+    записи TrustLog — одной вставкой, сводки и счетчики обновляются сигналом
+    attendance_marked_bulk. Возвращает результаты по каждому
+    элементу в исходном порядке: {"index", "participant_id", "type", "ok",
+    "status" ("marked" | "already_marked" | "error"), "error"}.
+    """
+    now = localtime()
+    results = [
+        {"index": index, "participant_id": item.get("participant_id"), "type": item.get("type"), "ok": False}
+        for index, item in enumerate(marks)
+    ]
+
+    def fail(result, message, status="error"):
+        result.update(status=status, error=str(message))
+
+    if not access.is_trainer(trainer_profile, session.group_id):
+        for result in results:
+            fail(result, _("Вы не связаны с этой группой."))
+        return results
+
+    requested_ids = {r["participant_id"] for r in results if isinstance(r["participant_id"], int)}
+    member_ids = set(session.group.participants.filter(id__in=requested_ids).values_list("id", flat=True))
+    manual_hash = f"manual-mark-{trainer_profile.iin}"
+
+    # Элементы применяются в порядке запроса (офлайн-очередь киоска уже упорядочена)
+    pending = []
+    for result, item in zip(results, marks):
+        if result["type"] not in ("entry", "exit"):
+            fail(result, _("Неизвестный тип отметки."))
+            continue
+        if result["type"] == "exit" and not session.group.track_exit:
+            fail(result, _("Отметка выхода отключена для данной группы."))
+            continue
+        if result["participant_id"] not in member_ids:
+            fail(result, _("Участник не входит в эту группу."))
+            continue
+        marked_at, error = _parse_marked_at(item.get("marked_at"), session, now)
+        if error:
+            fail(result, error)
+            continue
+        pending.append((marked_at, result))
+
+    applied = []
+    with transaction.atomic():
+        existing = {
+            attendance.profile_id: attendance
+            for attendance in Attendance.objects.select_for_update().filter(
+                session=session, profile_id__in={result["participant_id"] for marked_at, result in pending}
+            )
+        }
+        created = {}
+        updated = {}
+
+        for marked_at, result in pending:
+            profile_id = result["participant_id"]
+            attendance = existing.get(profile_id) or created.get(profile_id)
+
+            if result["type"] == "entry":
+                if attendance and attendance.arrived_at:
+                    fail(result, _("Отметка уже поставлена."), "already_marked")
+                    continue
+                if attendance is None:
+                    attendance = Attendance(
+                        session=session,
+                        profile_id=profile_id,
+                        trust_level=Attendance.TrustLevel.MANUAL,
+                        trust_score=0,
+                        fingerprint_hash=manual_hash,
+                        left_status=Attendance.TimeStatus.UNKNOWN,
+                    )
+                    created[profile_id] = attendance
+                else:
+                    updated[profile_id] = attendance
+                attendance.arrived_at = marked_at
+                attendance.arrived_status = Attendance.TimeStatus.MANUAL
+                attendance.marked_entry_by_trainer = trainer_profile
+            else:
+                if not attendance or not attendance.arrived_at:
+                    fail(result, _("Сначала необходимо отметить вход."))
+                    continue
+                if attendance.left_at:
+                    fail(result, _("Отметка уже поставлена."), "already_marked")
+                    continue
+                if marked_at < attendance.arrived_at:
+                    fail(result, _("Время выхода раньше времени входа."))
+                    continue
+                attendance.left_at = marked_at
+                attendance.left_status = Attendance.TimeStatus.MANUAL
+                attendance.marked_exit_by_trainer = trainer_profile
+                if profile_id not in created:
+                    updated[profile_id] = attendance
+
+            result.update(ok=True, status="marked")
+            applied.append(result)
+
+        if created:
+            # ON CONFLICT DO NOTHING: строку могла вставить параллельная отметка по QR
+            Attendance.objects.bulk_create(created.values(), ignore_conflicts=True)
+            stored = {
+                attendance.profile_id: attendance
+                for attendance in Attendance.objects.filter(session=session, profile_id__in=created)
+            }
+            for profile_id, attendance in created.items():
+                row = stored[profile_id]
+                if row.arrived_at != attendance.arrived_at or row.fingerprint_hash != manual_hash:
+                    for result in applied:
+                        if result["participant_id"] == profile_id:
+                            result["ok"] = False
+                            fail(result, _("Отметка уже поставлена."), "already_marked")
+                    continue
+                attendance.pk = row.pk
+        if updated:
+            Attendance.objects.bulk_update(updated.values(), [
+                "arrived_at", "arrived_status", "marked_entry_by_trainer",
+                "left_at", "left_status", "marked_exit_by_trainer",
+            ])
+
+        applied = [result for result in applied if result["ok"]]
+        if applied:
+            fingerprint, fp_created = BrowserFingerprint.objects.get_or_create(
+                profile=trainer_profile,
+                fingerprint_hash=manual_hash,
+                defaults={
+                    "user_agent": "manual mark",
+                    "last_seen": now,
+                }
+            )
+            if not fp_created:
+                fingerprint.last_seen = now
+                fingerprint.save(update_fields=["last_seen"])
+
+            attendances = {**existing, **created}
+            TrustLog.objects.bulk_create([
+                TrustLog(
+                    fingerprint=fingerprint,
+                    attendance=attendances[result["participant_id"]],
+                    reason=_("Ручная отметка ({mark_type}) тренером {trainer} ({iin})").format(
+                        mark_type=result["type"],
+                        trainer=trainer_profile.full_name,
+                        iin=trainer_profile.iin,
+                    ),
+                    delta=-10,
+                )
+                for result in applied
+            ])
+
+    # Сводки, счетчики и live-обновления — одним сигналом на пакет
+    if applied:
+        attendances = {**existing, **created}
+        for attendance in attendances.values():
+            attendance.session = session
+        attendance_marked_bulk.send(sender=Attendance, marks=[
+            (
+                attendances[result["participant_id"]],
+                result["type"],
+                result["participant_id"] in created and result["type"] == "entry",
+            )
+            for result in applied
+        ])
+
+    for result in results:
+        result.setdefault("status", "error")
+    return results
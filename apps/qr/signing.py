@@ -0,0 +1,80 @@
+"""
+Подписанные ротируемые QR-токены.
+
+Для групп с rotating_qr на экране тренера показывается код, который меняется
+каждые QR_ROTATE_SECONDS секунд. Токен — «<session_id>.<режим>.<слот>.<подпись>»,
+где слот — номер интервала времени, а подпись — HMAC-SHA256 от первых трех
+частей на ключе из SECRET_KEY (salted_hmac).
+
+Проверка — чистые вычисления без обращения к БД и кэшу: поддельные и
+устаревшие коды (например, сфотографированные с экрана) отклоняются до
+любой работы с сессией. Отметка принимается в текущем слоте и в
+QR_ROTATE_GRACE_SLOTS предыдущих — на время между сканированием и
+отправкой отпечатка браузера.
+"""
+import base64
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+SALT = "apps.qr.signing"
+MODES = {"entry": "e", "exit": "x"}
+MODES_BY_CODE = {code: mode for mode, code in MODES.items()}
+SIGNATURE_LENGTH = 16
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+def current_slot(now=None):
+    return int((time.time() if now is None else now) // settings.QR_ROTATE_SECONDS)
+
+
+def seconds_left(now=None):
+    """Сколько секунд осталось до смены кода"""
+    now = time.time() if now is None else now
+    return settings.QR_ROTATE_SECONDS - now % settings.QR_ROTATE_SECONDS
+
+
+def _signature(value):
+    digest = salted_hmac(SALT, value, algorithm="sha256").digest()[:SIGNATURE_LENGTH]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def make_token(session_id, mode, slot=None):
+    slot = current_slot() if slot is None else slot
+    value = f"{session_id}.{MODES[mode]}.{slot}"
+    return f"{value}.{_signature(value)}"
+
+
+def is_signed(token):
+    return "." in str(token)
+
+
+def unsign(token, check_slot=True, now=None):
+    """
+    Проверяет подпись (и свежесть слота) и возвращает (session_id, mode).
+    Бросает InvalidToken для подделки и ExpiredToken для устаревшего кода.
+    """
+    try:
+        session_id, mode_code, slot, signature = str(token).split(".")
+        session_id, slot = int(session_id), int(slot)
+        mode = MODES_BY_CODE[mode_code]
+    except (ValueError, KeyError):
+        raise InvalidToken(token)
+
+    if not constant_time_compare(signature, _signature(f"{session_id}.{mode_code}.{slot}")):
+        raise InvalidToken(token)
+
+    if check_slot:
+        current = current_slot(now)
+        if not current - settings.QR_ROTATE_GRACE_SLOTS <= slot <= current:
+            raise ExpiredToken(token)
+
+    return session_id, mode
@@ -0,0 +1,38 @@
+import logging
+
+from celery import shared_task
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext as _
+
+from apps.participants.models import PersonProfile
+from apps.qr import idempotency
+from apps.qr.admission import store_ticket_result
+from apps.qr.services import mark_attendance
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def process_scan_ticket(ticket, profile_id, token, fingerprint_hash, user_agent, mode, scanned_at=None):
+    """
+    Отметка из очереди допуска. Результат кладется в кэш по номеру тикета.
+    scanned_at — время скана (ISO 8601) из enqueue_scan; без него (сообщения,
+    поставленные до обновления) — время обработки.
+    """
+    try:
+        profile = PersonProfile.objects.get(id=profile_id)
+        success, result, status = mark_attendance(
+            profile=profile,
+            token=token,
+            fingerprint_hash=fingerprint_hash,
+            user_agent=user_agent,
+            mode=mode,
+            event_time=parse_datetime(scanned_at) if scanned_at else None,
+        )
+        idempotency.store_outcome(profile_id, token, mode, success, result, status)
+    except Exception as e:
+        logger.error(f"Error in queued scan {ticket}: {str(e)}")
+        success, status = False, None
+        result = _("Произошла техническая ошибка. Пожалуйста, попробуйте еще раз или обратитесь к администратору.")
+
+    store_ticket_result(ticket, profile_id, mode, success, result, status)
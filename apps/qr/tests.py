@@ -1,3 +1,253 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.attendance.models import Attendance, AttendanceSummary, TrustLog
+from apps.groups.models import Group, Session
+from apps.participants.models import PersonProfile
+from apps.qr import idempotency, signing
+from apps.qr.services import _get_session_by_token, manual_mark_batch
+
+# Тесты не зависят от Redis: кэш, сессии и счетчики — в памяти процесса
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def create_session(group, **kwargs):
+    # QR-файлы при создании сессии тестам не нужны
+    with mock.patch("apps.groups.signals.generate_session_qr_files"):
+        return Session.objects.create(group=group, date=timezone.localdate(), **kwargs)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QrTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.participant = PersonProfile.objects.create(iin="100000000001", full_name="Участник")
+        cls.trainer = PersonProfile.objects.create(
+            iin="100000000002", full_name="Тренер", role=PersonProfile.Role.TRAINER,
+        )
+        today = timezone.localdate()
+        cls.group = Group.objects.create(
+            external_id=1, code="G1", course_name="Курс", supervisor_name="Тренер",
+            supervisor_iin="100000000002", start_date=today, end_date=today, track_exit=True,
+        )
+        cls.group.participants.add(cls.participant)
+        cls.group.trainers.add(cls.trainer)
+        cls.session = create_session(cls.group)
+
+    def login(self, profile):
+        session = self.client.session
+        session["user_id"] = profile.id
+        session.save()
+
+
+class IdempotencyTests(QrTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_claim_is_exclusive_until_release(self):
+        self.assertTrue(idempotency.claim(1, "token", "entry"))
+        self.assertFalse(idempotency.claim(1, "token", "entry"))
+        # Другой режим и другой профиль — другие ключи
+        self.assertTrue(idempotency.claim(1, "token", "exit"))
+        self.assertTrue(idempotency.claim(2, "token", "entry"))
+
+        idempotency.release(1, "token", "entry")
+        self.assertTrue(idempotency.claim(1, "token", "entry"))
+
+    def test_only_completed_marks_are_stored(self):
+        idempotency.store_outcome(1, "token", "entry", False, "Слишком рано", None)
+        self.assertIsNone(idempotency.get_outcome(1, "token", "entry"))
+
+        idempotency.store_outcome(1, "token", "entry", "already_marked", "attendance", "on_time")
+        self.assertEqual(idempotency.get_outcome(1, "token", "entry"), ("already_marked", "attendance", "on_time"))
+
+    def test_replay_is_served_from_cache_without_queries(self):
+        self.login(self.participant)
+        url = reverse("mark_qr", args=[self.session.qr_token_entry]) + "?fp=hash-1"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "qr/mark_success.html")
+        self.assertEqual(Attendance.objects.filter(session=self.session, profile=self.participant).count(), 1)
+
+        # Профиль — из снимка в сессии, итог и группа отметки — из кэша
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "qr/mark_success.html")
+
+    def test_parallel_attempt_gets_in_progress_page(self):
+        self.login(self.participant)
+        token = self.session.qr_token_entry
+        idempotency.claim(self.participant.id, token, "entry")
+
+        response = self.client.get(reverse("mark_qr", args=[token]) + "?fp=hash-1")
+        self.assertEqual(response.status_code, 202)
+        self.assertIn("Retry-After", response)
+        self.assertFalse(Attendance.objects.filter(session=self.session, profile=self.participant).exists())
+
+        # Чужой ключ попытка не снимает
+        self.assertFalse(idempotency.claim(self.participant.id, token, "entry"))
+
+
+@override_settings(QR_ROTATE_SECONDS=30, QR_ROTATE_GRACE_SLOTS=1)
+class RotatingTokenTests(QrTestCase):
+    NOW = 1_800_000_000
+
+    def test_token_round_trip(self):
+        token = signing.make_token(self.session.id, "exit", slot=signing.current_slot(self.NOW))
+        self.assertEqual(signing.unsign(token, now=self.NOW), (self.session.id, "exit"))
+
+    def test_previous_slot_is_accepted_within_grace(self):
+        slot = signing.current_slot(self.NOW)
+        token = signing.make_token(self.session.id, "entry", slot=slot - 1)
+        self.assertEqual(signing.unsign(token, now=self.NOW), (self.session.id, "entry"))
+
+        for stale_slot in (slot - 2, slot + 1):
+            with self.assertRaises(signing.ExpiredToken):
+                signing.unsign(signing.make_token(self.session.id, "entry", slot=stale_slot), now=self.NOW)
+
+    def test_old_slot_passes_without_slot_check(self):
+        token = signing.make_token(self.session.id, "entry", slot=signing.current_slot(self.NOW) - 100)
+        self.assertEqual(signing.unsign(token, check_slot=False, now=self.NOW), (self.session.id, "entry"))
+
+    def test_tampered_token_is_rejected(self):
+        slot = signing.current_slot(self.NOW)
+        token = signing.make_token(self.session.id, "entry", slot=slot)
+        session_id, mode, slot, signature = token.split(".")
+        forged = [
+            f"{int(session_id) + 1}.{mode}.{slot}.{signature}",
+            f"{session_id}.x.{slot}.{signature}",
+            f"{session_id}.{mode}.{int(slot) + 1}.{signature}",
+            f"{session_id}.{mode}.{slot}.{'A' * len(signature)}",
+            f"{session_id}.{mode}.{slot}",
+            "not-a-token",
+        ]
+        for token in forged:
+            with self.subTest(token=token), self.assertRaises(signing.InvalidToken):
+                signing.unsign(token, now=self.NOW)
+
+    def test_token_mode_must_match_scan_mode(self):
+        token = signing.make_token(self.session.id, "entry")
+        session, error = _get_session_by_token(token, "exit")
+        self.assertIsNone(session)
+        self.assertIsNotNone(error)
+
+    def test_printed_token_is_rejected_for_rotating_group(self):
+        Group.objects.filter(id=self.group.id).update(rotating_qr=True)
+        session, error = _get_session_by_token(str(self.session.qr_token_entry), "entry")
+        self.assertIsNone(session)
+        self.assertIsNotNone(error)
+
+        session, error = _get_session_by_token(signing.make_token(self.session.id, "entry"), "entry")
+        self.assertEqual(session, self.session)
+        self.assertIsNone(error)
+
+    def test_expired_code_is_rejected_before_marking(self):
+        self.login(self.participant)
+        token = signing.make_token(self.session.id, "entry", slot=signing.current_slot() - 2)
+
+        response = self.client.get(reverse("qr_mark_rotating", args=[token]) + "?fp=hash-1")
+        self.assertTemplateUsed(response, "qr/mark_invalid.html")
+        self.assertContains(response, "QR-код устарел")
+        self.assertFalse(Attendance.objects.filter(session=self.session).exists())
+
+
+class ManualMarkBatchTests(QrTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.second = PersonProfile.objects.create(iin="100000000003", full_name="Второй участник")
+        cls.outsider = PersonProfile.objects.create(iin="100000000004", full_name="Не в группе")
+        cls.group.participants.add(cls.second)
+
+    def statuses(self, results):
+        return [result["status"] for result in results]
+
+    def test_entry_and_exit_in_one_batch(self):
+        results = manual_mark_batch(self.trainer, self.session, [
+            {"participant_id": self.participant.id, "type": "entry"},
+            {"participant_id": self.participant.id, "type": "exit"},
+            {"participant_id": self.second.id, "type": "entry"},
+        ])
+        self.assertEqual(self.statuses(results), ["marked", "marked", "marked"])
+
+        attendance = Attendance.objects.get(session=self.session, profile=self.participant)
+        self.assertEqual(attendance.arrived_status, Attendance.TimeStatus.MANUAL)
+        self.assertEqual(attendance.left_status, Attendance.TimeStatus.MANUAL)
+        self.assertEqual(attendance.marked_entry_by_trainer, self.trainer)
+        self.assertEqual(TrustLog.objects.filter(attendance__session=self.session).count(), 3)
+
+        summary = AttendanceSummary.objects.get(session=self.session)
+        self.assertEqual((summary.arrived_count, summary.left_count), (2, 1))
+
+    def test_item_errors_do_not_fail_the_batch(self):
+        Attendance.objects.create(session=self.session, profile=self.second, arrived_at=timezone.now())
+
+        results = manual_mark_batch(self.trainer, self.session, [
+            {"participant_id": self.second.id, "type": "entry"},
+            {"participant_id": self.outsider.id, "type": "entry"},
+            {"participant_id": self.participant.id, "type": "lunch"},
+            {"participant_id": self.participant.id, "type": "exit"},
+            {"participant_id": self.participant.id, "type": "entry", "marked_at": "2026-02-30T10:00"},
+            {"participant_id": self.participant.id, "type": "entry"},
+        ])
+        self.assertEqual(
+            self.statuses(results),
+            ["already_marked", "error", "error", "error", "error", "marked"],
+        )
+        self.assertEqual([result["index"] for result in results], list(range(6)))
+        self.assertEqual(results[4]["error"], "Некорректное время отметки.")
+        self.assertTrue(Attendance.objects.filter(session=self.session, profile=self.participant).exists())
+
+    def test_offline_mark_keeps_its_time(self):
+        marked_at = timezone.localtime().replace(microsecond=0) - timedelta(seconds=1)
+        if marked_at.date() != self.session.date:
+            self.skipTest("Сессия только началась: секунда назад — еще вчера")
+
+        results = manual_mark_batch(self.trainer, self.session, [
+            {"participant_id": self.participant.id, "type": "entry", "marked_at": marked_at.isoformat()},
+        ])
+        self.assertEqual(self.statuses(results), ["marked"])
+        self.assertEqual(Attendance.objects.get(session=self.session, profile=self.participant).arrived_at, marked_at)
+
+    def test_not_a_trainer_of_the_group(self):
+        results = manual_mark_batch(self.second, self.session, [
+            {"participant_id": self.participant.id, "type": "entry"},
+        ])
+        self.assertEqual(self.statuses(results), ["error"])
+        self.assertFalse(Attendance.objects.filter(session=self.session).exists())
+
+    def test_conflict_with_concurrent_qr_mark(self):
+        bulk_create = Attendance.objects.bulk_create
+        qr_marked_at = timezone.now()
+
+        def bulk_create_after_qr_mark(objs, **kwargs):
+            # Отметка по QR успела вставить строку после select_for_update пакета
+            Attendance.objects.create(
+                session=self.session, profile=self.participant, arrived_at=qr_marked_at,
+                arrived_status=Attendance.TimeStatus.ON_TIME, fingerprint_hash="qr-hash",
+            )
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Attendance.objects, "bulk_create", side_effect=bulk_create_after_qr_mark):
+            results = manual_mark_batch(self.trainer, self.session, [
+                {"participant_id": self.participant.id, "type": "entry"},
+                {"participant_id": self.second.id, "type": "entry"},
+            ])
+
+        self.assertEqual(self.statuses(results), ["already_marked", "marked"])
+        self.assertFalse(results[0]["ok"])
+
+        # Строка отметки по QR не перезаписана, TrustLog — только для примененной отметки
+        attendance = Attendance.objects.get(session=self.session, profile=self.participant)
+        self.assertEqual((attendance.fingerprint_hash, attendance.arrived_at), ("qr-hash", qr_marked_at))
+        self.assertEqual(
+            list(TrustLog.objects.filter(attendance__session=self.session).values_list("attendance__profile", flat=True)),
+            [self.second.id],
+        )
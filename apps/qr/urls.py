@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
-from .views import mark_qr_page, mark_qr_exit_page
+
+# В ASGI-режиме сканирование обслуживают async-представления
+if settings.QR_ASYNC_VIEWS:
+    mark_view, mark_exit_view = views.mark_qr_page_async, views.mark_qr_exit_page_async
+    mark_rotating_view = views.mark_rotating_qr_page_async
+else:
+    mark_view, mark_exit_view = views.mark_qr_page, views.mark_qr_exit_page
+    mark_rotating_view = views.mark_rotating_qr_page
 
 urlpatterns = [
-    path("mark/<uuid:token>/", mark_qr_page, name="mark_qr"),
-    path("leave/<uuid:token>/", mark_qr_exit_page, name="qr_mark_exit"),
+    path("mark/<uuid:token>/", mark_view, name="mark_qr"),
+    path("leave/<uuid:token>/", mark_exit_view, name="qr_mark_exit"),
+    path("r/<str:token>/", mark_rotating_view, name="qr_mark_rotating"),
+    path("result/<str:ticket>/", views.scan_result_view, name="qr_scan_result"),
     path("scan/", views.qr_scan_page, name="qr_scan"),
 ]
@@ -1,12 +1,62 @@
+import logging
+import math
+
 from django.shortcuts import render, redirect
 from django.conf import settings
 from django.utils.translation import gettext as _
 
 from apps.accounts.decorators import sso_login_required
+from apps.attendance.models import Attendance
+from apps.core import metrics
+from apps.core.concurrency import db_sync_to_async
+from apps.core.fastjson import FastJsonResponse
+from apps.qr import admission, idempotency, signing
 from apps.qr.services import mark_attendance
 
-@sso_login_required
-def mark_qr_page(request, token):
+logger = logging.getLogger(__name__)
+
+
+def _render_outcome(request, mode, success, result, status):
+    if success == "already_marked":
+        return render(request, "qr/mark_already.html", {
+            "attendance": result,
+            "status": status,
+            "group": result.session.group
+        })
+    elif success:
+        context = {
+            "attendance": result,
+            "status": status,
+            "group": result.session.group
+        }
+        if mode == 'exit':
+            context["is_exit"] = True
+        return render(request, "qr/mark_success.html", context)
+    else:
+        return render(request, "qr/mark_invalid.html", {"reason": result, "status": status})
+
+
+def _render_in_progress(request, mode):
+    """Параллельная попытка той же отметки еще выполняется: страница повторит запрос сама"""
+    metrics.scan_outcome(mode, "in_progress")
+    response = render(request, "qr/mark_processing.html", {
+        "mode": mode,
+        "retry": True,
+        "poll_interval": settings.QR_RESULT_POLL_MS,
+    }, status=202)
+    response["Retry-After"] = str(math.ceil(settings.QR_RESULT_POLL_MS / 1000))
+    return response
+
+
+def _render_technical_error(request):
+    return render(request, "qr/mark_invalid.html", {
+        "reason": _("Произошла техническая ошибка. Пожалуйста, попробуйте еще раз или обратитесь к администратору."),
+        "status": None
+    })
+
+
+def _handle_scan(request, token, mode):
+    """Общая обработка сканирования QR для sync- и async-представлений"""
     profile = getattr(request, "user_profile", None)
     fingerprint_hash = request.GET.get("fp")
 
@@ -14,93 +64,145 @@ def mark_qr_page(request, token):
         return redirect(settings.LOGIN_URL)
 
     if not fingerprint_hash:
-        return render(request, "qr/mark.html", {"token": token})
+        context = {"token": token}
+        if mode == 'exit':
+            context["mode"] = "exit"
+        return render(request, "qr/mark.html", context)
 
     user_agent = request.headers.get("User-Agent", "")
 
+    # Повтор уже состоявшейся отметки отдаем из кэша, не трогая БД
+    outcome = idempotency.get_outcome(profile.id, token, mode)
+    if outcome is not None:
+        return _render_outcome(request, mode, *outcome)
+    # Отмечает и снимает ключ только попытка, которая его заняла; остальные не
+    # ждут в потоке запроса (он нужен другим сканам) и не отмечают без ключа
+    if not idempotency.claim(profile.id, token, mode):
+        return _render_in_progress(request, mode)
+
+    # При перегрузке не ждем соединения с БД, а ставим отметку в очередь
+    admitted, slot_id = admission.acquire_slot()
+    if not admitted:
+        idempotency.release(profile.id, token, mode)
+        ticket = admission.enqueue_scan(profile, token, fingerprint_hash, user_agent, mode)
+        return redirect("qr_scan_result", ticket=ticket)
+
     try:
         success, result, status = mark_attendance(
             profile=profile,
             token=token,
             fingerprint_hash=fingerprint_hash,
             user_agent=user_agent,
-            mode='entry',
+            mode=mode,
         )
-
-        if success == "already_marked":
-            return render(request, "qr/mark_already.html", {
-                "attendance": result, 
-                "status": status, 
-                "group": result.session.group
-            })
-        elif success:
-            return render(request, "qr/mark_success.html", {
-                "attendance": result, 
-                "status": status, 
-                "group": result.session.group
-            })
-        else:
-            return render(request, "qr/mark_invalid.html", {"reason": result, "status": status})
+        idempotency.store_outcome(profile.id, token, mode, success, result, status)
+        return _render_outcome(request, mode, success, result, status)
     except Exception as e:
         # Логируем ошибку для отладки
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Error in mark_qr_page: {str(e)}")
-        
-        return render(request, "qr/mark_invalid.html", {
-            "reason": _("Произошла техническая ошибка. Пожалуйста, попробуйте еще раз или обратитесь к администратору."),
-            "status": None
-        })
+        logger.error(f"Error in scan ({mode}): {str(e)}")
+        return _render_technical_error(request)
+    finally:
+        idempotency.release(profile.id, token, mode)
+        admission.release_slot(slot_id)
+
+
+@sso_login_required
+def mark_qr_page(request, token):
+    return _handle_scan(request, token, 'entry')
 
 
 @sso_login_required
 def mark_qr_exit_page(request, token):
-    profile = getattr(request, "user_profile", None)
-    fingerprint_hash = request.GET.get("fp")
+    return _handle_scan(request, token, 'exit')
 
-    if not profile:
-        return redirect(settings.LOGIN_URL)
 
-    if not fingerprint_hash:
-        return render(request, "qr/mark.html", {"token": token, "mode": "exit"})
+# Async-версии для ASGI: поток пула ASYNC_DB_THREADS занимается только на время
+# отметки, медленные мобильные клиенты обслуживаются циклом событий. Пропускную
+# способность это не увеличивает: синхронные хуки middleware (MiddlewareMixin —
+# вся цепочка MIDDLEWARE) под ASGI выполняются через sync_to_async(thread_sensitive=True),
+# то есть в одном потоке на процесс, последовательно для всех запросов. Замер
+# (scan_burst_scenario --asgi против режима в процессе): отметок/с одинаково,
+# все хуки middleware идут в одном потоке, ~3.4 мс на запрос — потолок около
+# 300 запросов/с на процесс независимо от ASYNC_DB_THREADS.
+@sso_login_required
+async def mark_qr_page_async(request, token):
+    return await db_sync_to_async(_handle_scan)(request, token, 'entry')
+
+
+@sso_login_required
+async def mark_qr_exit_page_async(request, token):
+    return await db_sync_to_async(_handle_scan)(request, token, 'exit')
 
-    user_agent = request.headers.get("User-Agent", "")
 
+def _check_rotating_token(request, token):
+    """Подпись и свежесть ротируемого кода — без БД. Возвращает (mode, error_response)"""
     try:
-        success, result, status = mark_attendance(
-            profile=profile,
-            token=token,
-            fingerprint_hash=fingerprint_hash,
-            user_agent=user_agent,
-            mode='exit',
-        )
+        session_id, mode = signing.unsign(token)
+    except signing.ExpiredToken:
+        metrics.scan_outcome("unknown", "expired_token")
+        return None, render(request, "qr/mark_invalid.html", {
+            "reason": _("QR-код устарел. Отсканируйте актуальный код с экрана тренера."),
+            "status": None
+        })
+    except signing.InvalidToken:
+        metrics.scan_outcome("unknown", "invalid_token")
+        return None, render(request, "qr/mark_invalid.html", {
+            "reason": _("QR-код недействителен."),
+            "status": None
+        })
+    return mode, None
 
-        if success == "already_marked":
-            return render(request, "qr/mark_already.html", {
-                "attendance": result, 
-                "status": status, 
-                "group": result.session.group
-            })
-        elif success:
-            return render(request, "qr/mark_success.html", {
-                "attendance": result,
-                "is_exit": True,
-                "status": status,
-                "group": result.session.group
-            })
-        else:
-            return render(request, "qr/mark_invalid.html", {"reason": result, "status": status})
-    except Exception as e:
-        # Логируем ошибку для отладки
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Error in mark_qr_exit_page: {str(e)}")
-        
+
+@sso_login_required
+def mark_rotating_qr_page(request, token):
+    mode, error_response = _check_rotating_token(request, token)
+    if error_response:
+        return error_response
+    return _handle_scan(request, token, mode)
+
+
+@sso_login_required
+async def mark_rotating_qr_page_async(request, token):
+    mode, error_response = _check_rotating_token(request, token)
+    if error_response:
+        return error_response
+    return await db_sync_to_async(_handle_scan)(request, token, mode)
+
+
+@sso_login_required
+def scan_result_view(request, ticket):
+    """Результат отметки из очереди: страница ожидания с опросом или итог"""
+    profile = request.user_profile
+    data = admission.get_ticket(ticket)
+
+    if not data or data["profile_id"] != profile.id:
+        if request.GET.get("format") == "json":
+            return FastJsonResponse({"ready": True})
         return render(request, "qr/mark_invalid.html", {
-            "reason": _("Произошла техническая ошибка. Пожалуйста, попробуйте еще раз или обратитесь к администратору."),
+            "reason": _("Результат отметки не найден или устарел. Отсканируйте QR-код еще раз."),
             "status": None
         })
 
+    ready = data["state"] == "done"
+    if request.GET.get("format") == "json":
+        return FastJsonResponse({"ready": ready})
+
+    if not ready:
+        return render(request, "qr/mark_processing.html", {
+            "mode": data["mode"],
+            "poll_interval": settings.QR_RESULT_POLL_MS,
+        })
+
+    if not data["success"]:
+        return _render_outcome(request, data["mode"], False, data["reason"], data["status"])
+
+    try:
+        attendance = Attendance.objects.select_related("session__group").get(id=data["attendance_id"])
+    except Attendance.DoesNotExist:
+        return _render_technical_error(request)
+    return _render_outcome(request, data["mode"], data["success"], attendance, data["status"])
+
+
 @sso_login_required
 def qr_scan_page(request):
     profile = getattr(request, "user_profile", None)
@@ -112,4 +214,4 @@ def qr_scan_page(request):
     
     return render(request, "qr/scan.html", {
         "has_exit_groups": has_exit_groups
-    })
\ No newline at end of file
+    })
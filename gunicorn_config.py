@@ -1,8 +1,16 @@
 import multiprocessing
+import os
+
+# Метрики Prometheus в мультипроцессном режиме: воркеры пишут значения в файлы
+# каталога, /metrics суммирует их. Переменная должна быть задана до импорта Django
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/orleuqr-metrics")
+
+# ASGI_MODE=1 — async-режим: uvicorn-воркеры вместо gthread
+asgi_mode = os.getenv("ASGI_MODE", "0") == "1"
 
 bind = "127.0.0.1:8000"  # или 0.0.0.0:8001 если доступ через nginx
-workers = multiprocessing.cpu_count() * 2 + 1  # 4 * 2 + 1 = 9
-threads = 2  # каждый воркер может обслуживать до 2 потоков
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))  # 4 * 2 + 1 = 9
+threads = int(os.getenv("GUNICORN_THREADS", "2"))  # каждый воркер может обслуживать до 2 потоков
 worker_class = "gthread"  # или "sync" если у тебя нет I/O операций
 timeout = 120
 keepalive = 5
@@ -12,3 +20,52 @@ loglevel = "info"
 accesslog = "/var/log/gunicorn/access.log"
 errorlog = "/var/log/gunicorn/error.log"
 preload_app = True
+
+if asgi_mode:
+    wsgi_app = "orleuqr.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+    # Один цикл событий на ядро; работа с БД уходит в пул ASYNC_DB_THREADS
+    workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() + 1))
+
+# Соединений с БД максимум: workers * DB_POOL_MAX_SIZE (по умолчанию threads
+# или ASYNC_DB_THREADS). Сумма по всем хостам должна быть меньше max_connections
+# в Postgres (или default_pool_size в pgbouncer).
+
+
+def post_fork(server, worker):
+    # При preload_app мастер мог открыть соединение (или пул) до fork —
+    # сокет нельзя делить между процессами, каждый воркер открывает свои.
+    from django.db import connections
+
+    connections.close_all()
+    for conn in connections.all(initialized_only=True):
+        if hasattr(conn, "close_pool"):
+            conn.close_pool()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска дали бы завышенные счетчики. Файлы живых
+    # процессов (воркер Celery пишет в тот же каталог) не трогаем
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(metrics_dir, exist_ok=True)
+    for name in os.listdir(metrics_dir):
+        # counter_<pid>.db, gauge_livesum_<pid>.db и т.п.
+        pid = os.path.splitext(name)[0].rsplit("_", 1)[-1]
+        if not pid.isdigit() or not _pid_alive(int(pid)):
+            os.remove(os.path.join(metrics_dir, name))
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
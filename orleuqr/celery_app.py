@@ -6,6 +6,13 @@ import sys  # Добавляем sys для обхода конфликтов
 # Добавляем путь к проекту в sys.path, чтобы Python искал в нужном месте
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# Метрики Prometheus: воркер пишет исходы отметок из очереди в тот же мультипроцессный
+# каталог, что и gunicorn (общий хост или том), иначе они не попадают в /metrics.
+# Переменная должна быть задана до импорта prometheus_client (см. gunicorn_config.py)
+if "worker" in sys.argv:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/orleuqr-metrics")
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
 from celery import Celery  # Теперь импорт не конфликтует
 
 # Устанавливаем переменную окружения Django
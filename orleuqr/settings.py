@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    "apps.core.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -47,7 +48,9 @@ MIDDLEWARE = [
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
     "apps.accounts.middleware.AuthenticationMiddleware",
+    "apps.core.replica.PrimaryPinMiddleware",
     "apps.core.api_auth.APITokenMiddleware",
+    "apps.core.profiling.ProfilingMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -56,6 +59,50 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "orleuqr.urls"
 WSGI_APPLICATION = "orleuqr.wsgi.application"
+ASGI_APPLICATION = "orleuqr.asgi.application"
+
+# Режим развертывания: ASGI_MODE=1 — gunicorn с uvicorn-воркерами (см. gunicorn_config.py)
+ASGI_MODE = os.getenv("ASGI_MODE", "0") == "1"
+# Async-представления сканирования QR (по умолчанию включены в ASGI-режиме).
+# Не прирост пропускной способности: middleware под ASGI сериализуются (см. apps/qr/views.py)
+QR_ASYNC_VIEWS = os.getenv("QR_ASYNC_VIEWS", "1" if ASGI_MODE else "0") == "1"
+# Размер пула потоков для ORM-вызовов из async-представлений (на процесс)
+ASYNC_DB_THREADS = int(os.getenv("ASYNC_DB_THREADS", "8"))
+# Потоков на воркер gunicorn (gthread), читается и в gunicorn_config.py
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "2"))
+
+# Контроль допуска сканирований: сколько отметок одновременно идут в БД
+# (на весь кластер, 0 — без ограничения). Остальные уходят в очередь Celery.
+QR_ADMISSION_LIMIT = int(os.getenv("QR_ADMISSION_LIMIT", "0"))
+QR_ADMISSION_LEASE_SECONDS = int(os.getenv("QR_ADMISSION_LEASE_SECONDS", "30"))
+QR_TICKET_TTL = int(os.getenv("QR_TICKET_TTL", "600"))
+QR_RESULT_POLL_MS = int(os.getenv("QR_RESULT_POLL_MS", "1500"))
+
+# Идемпотентность повторных сканирований (профиль, токен, режим)
+QR_IDEMPOTENCY_TTL = int(os.getenv("QR_IDEMPOTENCY_TTL", "120"))
+QR_IDEMPOTENCY_CLAIM_SECONDS = 15
+
+# Пакетная ручная отметка (attendance:manual_mark_batch): максимум отметок в запросе
+MANUAL_MARK_BATCH_MAX = int(os.getenv("MANUAL_MARK_BATCH_MAX", "500"))
+# Автодополнение участника в ручной отметке: сколько строк возвращать
+ROSTER_SEARCH_LIMIT = int(os.getenv("ROSTER_SEARCH_LIMIT", "20"))
+# Поиск (apps/core/search.py): сколько id профилей/групп подставлять в фильтр связанных моделей
+SEARCH_MAX_RELATED_IDS = int(os.getenv("SEARCH_MAX_RELATED_IDS", "1000"))
+
+# Метрики Prometheus (apps/core/metrics.py, /metrics с API-токеном admin).
+# Мультипроцессный режим включает переменная PROMETHEUS_MULTIPROC_DIR (см. gunicorn_config.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_CELERY_QUEUES = [q for q in os.getenv("METRICS_CELERY_QUEUES", "celery").split(",") if q]
+
+# Профилирование запроса по заголовку X-Profile (apps/core/profiling.py)
+PROFILING_ROOT = os.getenv("PROFILING_ROOT", os.path.join(BASE_DIR, "profiles"))
+PROFILING_HEADER_MAX_AGE = int(os.getenv("PROFILING_HEADER_MAX_AGE", "3600"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "200"))
+
+# Ротируемые QR-коды (Group.rotating_qr, apps/qr/signing.py): период смены кода
+# и сколько предыдущих периодов код еще принимается
+QR_ROTATE_SECONDS = int(os.getenv("QR_ROTATE_SECONDS", "30"))
+QR_ROTATE_GRACE_SLOTS = int(os.getenv("QR_ROTATE_GRACE_SLOTS", "1"))
 
 # Templates
 TEMPLATES = [
@@ -94,9 +141,68 @@ else:
             "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
             "HOST": os.getenv("POSTGRES_HOST", "db"),
             "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            # Проверяем постоянное соединение перед повторным использованием
+            "CONN_HEALTH_CHECKS": True,
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "600")),
+            "OPTIONS": {},
         }
     }
 
+    # Пул соединений (DB_POOL_MODE):
+    #   persistent — постоянное соединение на поток (CONN_MAX_AGE), по умолчанию
+    #   native     — встроенный пул Django 5 (psycopg 3 + psycopg_pool)
+    #   pgbouncer  — внешний pgbouncer в режиме transaction pooling
+    DB_POOL_MODE = os.getenv("DB_POOL_MODE", "persistent")
+
+    # Размер пула на процесс: одновременно с БД работает не больше потоков,
+    # чем у воркера gunicorn (gthread) или пула async-представлений (ASGI).
+    # Всего соединений: workers * DB_POOL_MAX_SIZE (см. gunicorn_config.py).
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", ASYNC_DB_THREADS if ASGI_MODE else GUNICORN_THREADS))
+
+    if DB_POOL_MODE == "native":
+        from psycopg_pool import ConnectionPool
+
+        # Пул несовместим с CONN_MAX_AGE: соединения возвращаются в пул после запроса
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["CONN_HEALTH_CHECKS"] = False
+        DATABASES["default"]["OPTIONS"]["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            "max_size": DB_POOL_MAX_SIZE,
+            "timeout": int(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_idle": 300,
+            # Проверка соединения перед выдачей из пула
+            "check": ConnectionPool.check_connection,
+        }
+    elif DB_POOL_MODE == "pgbouncer":
+        DATABASES["default"]["HOST"] = os.getenv("PGBOUNCER_HOST", "pgbouncer")
+        DATABASES["default"]["PORT"] = os.getenv("PGBOUNCER_PORT", "6432")
+        # В transaction pooling серверные курсоры и подготовленные запросы не переживают транзакцию
+        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# Реплика для чтения отчетов и списков (см. apps/core/replica.py).
+# Не задана — все запросы идут в default.
+if USE_SQLITE:
+    if os.getenv("SQLITE_REPLICA_NAME"):
+        # Для локальной проверки: копия db.sqlite3 в роли реплики
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("SQLITE_REPLICA_NAME"),
+        }
+elif os.getenv("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST"),
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "OPTIONS": dict(DATABASES["default"]["OPTIONS"]),
+    }
+
+if "replica" in DATABASES:
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["apps.core.replica.ReplicaRouter"]
+# Сколько секунд после записи клиент читает с основной БД (задержка репликации)
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
 # if not USE_SQLITE:
 #     SECURE_SSL_REDIRECT = True
 #     SESSION_COOKIE_SECURE = True
@@ -187,14 +293,54 @@ CELERYD_TASK_TIME_LIMIT = 300  # секунды
 
 # Настройки периодических задач через Django-Celery-Beat
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers.DatabaseScheduler'
+CELERY_BEAT_SCHEDULE = {
+    "reconcile-dashboard-counters": {
+        "task": "apps.core.tasks.reconcile_counters",
+        "schedule": 600.0,
+    },
+    "ensure-trustlog-partitions": {
+        "task": "apps.attendance.tasks.ensure_trustlog_partitions",
+        "schedule": 86400.0,
+    },
+    "archive-finished-groups": {
+        "task": "apps.groups.tasks.archive_finished_groups",
+        "schedule": 86400.0,
+    },
+}
 
-CELERY_RESULT_BACKEND = os.getenv("REDIS_URL")
-CELERY_BROKER_URL = os.getenv("REDIS_URL")
+# Выгрузка посещаемости (apps/groups/exports.py): XLSX больше этого числа
+# ячеек (участники × сессии) собирается фоновой задачей
+EXPORT_SYNC_MAX_CELLS = int(os.getenv("EXPORT_SYNC_MAX_CELLS", "20000"))
+EXPORT_JOB_TTL = int(os.getenv("EXPORT_JOB_TTL", "3600"))
+EXPORT_POLL_MS = 2000
+# Файлы фоновых выгрузок (в них ИИН участников): вне MEDIA_ROOT, который раздается
+# публично, — отдаются только через export_job_view с проверкой владельца
+EXPORT_ROOT = os.getenv("EXPORT_ROOT", os.path.join(BASE_DIR, "exports"))
+
+# Архив выгруженных данных (старые секции TrustLog и т.п.)
+ARCHIVE_ROOT = os.getenv("ARCHIVE_ROOT", os.path.join(BASE_DIR, "archive"))
+# Секции TrustLog: сколько месяцев создавать наперед и сколько хранить
+TRUSTLOG_PARTITIONS_AHEAD = int(os.getenv("TRUSTLOG_PARTITIONS_AHEAD", "3"))
+TRUSTLOG_RETENTION_MONTHS = int(os.getenv("TRUSTLOG_RETENTION_MONTHS", "24"))
+# Архивация групп: через сколько дней после окончания и удалять ли сессии и отметки
+GROUP_ARCHIVE_AFTER_DAYS = int(os.getenv("GROUP_ARCHIVE_AFTER_DAYS", "180"))
+GROUP_ARCHIVE_PURGE = os.getenv("GROUP_ARCHIVE_PURGE", "0") == "1"
+
+# Счетчики главной страницы (apps/core/counters.py): время жизни в кэше, секунды
+COUNTERS_TTL = int(os.getenv("COUNTERS_TTL", "86400"))
+COUNTERS_PROFILE_TTL = int(os.getenv("COUNTERS_PROFILE_TTL", "300"))
+# Кэш доступа к группам (apps/groups/access.py): время жизни, секунды
+GROUP_ACCESS_CACHE_TTL = int(os.getenv("GROUP_ACCESS_CACHE_TTL", "86400"))
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+CELERY_RESULT_BACKEND = REDIS_URL
+CELERY_BROKER_URL = REDIS_URL
 
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
-        "LOCATION": os.getenv("REDIS_URL"),
+        "LOCATION": REDIS_URL,
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         },
@@ -202,80 +348,90 @@ CACHES = {
     }
 }
 
+# Живая таблица посещаемости (apps/attendance/live.py): SSE через Redis pub/sub
+# только в ASGI-режиме, под WSGI — короткий опрос журнала событий (Redis Stream)
+LIVE_SSE = os.getenv("LIVE_SSE", "1" if ASGI_MODE else "0") == "1"
+LIVE_POLL_MS = int(os.getenv("LIVE_POLL_MS", "5000"))
+LIVE_POLL_BATCH = int(os.getenv("LIVE_POLL_BATCH", "500"))
+LIVE_LOG_MAXLEN = int(os.getenv("LIVE_LOG_MAXLEN", "2000"))
+LIVE_LOG_TTL = int(os.getenv("LIVE_LOG_TTL", "86400"))
+LIVE_KEEPALIVE_SECONDS = int(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+LIVE_RETRY_MS = int(os.getenv("LIVE_RETRY_MS", "3000"))
+
 
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
+# Логи пишет отдельный поток процесса через очередь (apps/core/log.py), файлы — JSON
+# по строке, ротация — внешним logrotate. LOG_SAMPLING: доля записей ниже WARNING
+# для шумных логгеров, например "apps.core.api_auth=0.01,attendance=0.1"
+LOG_SAMPLING = {
+    name.strip(): float(rate)
+    for name, _, rate in (item.partition("=") for item in os.getenv("LOG_SAMPLING", "apps.core.api_auth=0.01").split(","))
+    if name.strip() and rate.strip()
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {
-            "format": "[{asctime}] [{levelname}] {name}:{lineno} — {message}",
-            "style": "{",
-        },
-        "simple": {
-            "format": "{levelname}: {message}",
-            "style": "{",
+    "filters": {
+        "sampling": {
+            "()": "apps.core.log.SamplingFilter",
+            "rates": LOG_SAMPLING,
         },
     },
     "handlers": {
-        "file": {
-            "level": "INFO",
-            "class": "logging.handlers.TimedRotatingFileHandler",
-            "filename": os.path.join(LOG_DIR, "django.log"),
-            "when": "midnight",
-            "backupCount": 7,
-            "formatter": "verbose",
-        },
-        "error_file": {
-            "level": "ERROR",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": os.path.join(LOG_DIR, "errors.log"),
-            "maxBytes": 1024 * 1024 * 5,  # 5 MB
-            "backupCount": 3,
-            "formatter": "verbose",
-        },
-        "console": {
-            "class": "logging.StreamHandler",
-            "formatter": "simple",
+        "queue": {
+            "()": "apps.core.log.QueueLogHandler",
+            "filters": ["sampling"],
+            "queue_size": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            "targets": [
+                {"filename": os.path.join(LOG_DIR, "django.log"), "level": "INFO"},
+                {"filename": os.path.join(LOG_DIR, "errors.log"), "level": "ERROR"},
+                {"filename": os.path.join(LOG_DIR, "accounts.log"), "level": "WARNING", "logger": "accounts"},
+                {
+                    "class": "logging.StreamHandler",
+                    "stream": "sys.stderr",
+                    "level": "DEBUG" if DEBUG else "INFO",
+                    "format": "{levelname}: {message}",
+                },
+            ],
         },
     },
     "loggers": {
         "django": {
-            "handlers": ["file", "console"],
+            "handlers": ["queue"],
             "level": "INFO",
-            "propagate": True,
-        },
-        "django.request": {
-            "handlers": ["error_file"],
-            "level": "ERROR",
-            "propagate": False,
-        },
-        "django.security": {
-            "handlers": ["error_file"],
-            "level": "ERROR",
             "propagate": False,
         },
         "django.server": {
-            "handlers": ["error_file"] if not DEBUG else [],
+            "handlers": ["queue"] if not DEBUG else [],
             "level": "WARNING",
             "propagate": False,
         },
         "celery": {
-            "handlers": ["file"],
+            "handlers": ["queue"],
             "level": "INFO",
             "propagate": False,
         },
         "apps": {
-            "handlers": ["file"],
+            "handlers": ["queue"],
             "level": "INFO",
-            "propagate": True,
+            "propagate": False,
+        },
+        "attendance": {
+            "handlers": ["queue"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "accounts": {
+            "handlers": ["queue"],
+            "level": "DEBUG" if DEBUG else "INFO",
+            "propagate": False,
         },
-
     },
     "root": {
-        "handlers": ["file", "console"],
+        "handlers": ["queue"],
         "level": "WARNING",
     }
 }
@@ -329,14 +485,18 @@ LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
+# apps/core/pagination.py: от этой оценки строк и выше вместо COUNT(*) отдается оценка
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv("PAGINATION_ESTIMATE_THRESHOLD", "100000"))
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'apps.groups.exceptions.custom_exception_handler',
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'apps.core.fastjson.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'apps.core.fastjson.ORJSONParser',
     ],
 }
 
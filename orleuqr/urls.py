@@ -6,6 +6,7 @@ from django.conf.urls.i18n import i18n_patterns
 from django.views.i18n import set_language
 from django.conf import settings
 from django.conf.urls.static import static
+from apps.core.api_views import metrics_view
 from apps.core.views import home_view
 
 urlpatterns = [
@@ -17,6 +18,7 @@ urlpatterns = [
     path("qr/", include("apps.qr.urls")),
     path("attendance/", include("apps.attendance.urls", namespace="attendance")),
     path("api/", include("apps.core.urls", namespace="api")),
+    path("metrics", metrics_view, name="metrics"),
     path("groups/", include("apps.groups.urls", namespace="groups")),
 ]
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)